@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""
+Benchmark: sync vs. async webhook, stats and email content views under ASGI.
+
+Each view is served through Django's ASGI handler, once routed to the sync view
+and once to the async one, with 1 to N requests in flight. Reports requests/s,
+latencies and the peak number of threads the process needed. The email content
+view reads from a local stand-in for the Resend API that answers after
+--upstream-latency ms.
+
+Webhook requests are signed with the sender's secret and queued with
+'bench-' delivery IDs, which are deleted again afterwards; the inline drainer
+is off while benchmarking. Run against a staging database.
+
+Usage: python benchmark_async_views.py [--sender KEY] [--requests N] [--concurrency 1,10,50,200]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'email_sender.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import clear_url_caches, path
+
+from email_app import views as app_views
+from email_monitor import provider
+from email_monitor import views
+from email_monitor.models import Contact, EmailEvent, WebhookDelivery
+from email_monitor.senders import sender_registry, webhook_endpoint
+from email_monitor.stats import async_contact_stats_api
+
+
+def make_urlconf(name, mode):
+    """URLconf module routing the benchmarked paths to the sync or async views"""
+    urlconf = types.ModuleType(name)
+    async_views = mode == 'async'
+    urlconf.urlpatterns = [
+        path('webhook<str:endpoint>/', views.async_webhook_handler_view if async_views else views.webhook_handler_view),
+        path('monitor/api/contact_stats/', async_contact_stats_api if async_views else views.contact_stats_api),
+        path('monitor/api/event_timeseries/', views.async_event_timeseries_api if async_views else views.event_timeseries_api),
+        path('monitor/api/contact_email_content/',
+             views.async_contact_email_content_api if async_views else views.contact_email_content_api),
+        path('api/contact_stats/', async_contact_stats_api if async_views else app_views.contact_stats_api),
+    ]
+    sys.modules[name] = urlconf
+    return name
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """Answers GET /emails/<id> like the Resend API, after the configured latency"""
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = json.dumps({'subject': 'Benchmark', 'html': '<p>Hi</p>', 'text': 'Hi', 'created_at': '2026-01-01'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UpstreamServer(ThreadingHTTPServer):
+    # Accept every benchmark connection at once instead of the default backlog of 5
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve_upstream(latency_ms, port):
+    UpstreamHandler.latency = latency_ms / 1000
+    server = UpstreamServer(('127.0.0.1', 0), UpstreamHandler)
+    port.put(server.server_port)
+    server.serve_forever()
+
+
+def start_upstream(latency_ms):
+    """Run the Resend API stand-in in its own process, returns (process, port)"""
+    port = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve_upstream, args=(latency_ms, port), daemon=True)
+    process.start()
+    return process, port.get(timeout=10)
+
+
+async def call(app, method, path_, query='', body=b'', headers=()):
+    """Run one request through the ASGI app, returns the response status"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path_, 'raw_path': path_.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'benchmark')] + [(k.encode(), v.encode()) for k, v in headers],
+        'server': ('benchmark', 80), 'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+def webhook_request(sender):
+    """Request args of a signed webhook delivery for the sender"""
+    secret = sender.webhook_secret[6:] if sender.webhook_secret.startswith('whsec_') else sender.webhook_secret
+    key = base64.b64decode(secret)
+    delivery_id = f'bench-{uuid.uuid4().hex}'
+    timestamp = str(int(time.time()))
+    body = json.dumps({
+        'type': 'email.delivered', 'created_at': '2026-01-01T00:00:00Z',
+        'data': {'email_id': delivery_id, 'from': sender.email, 'to': ['benchmark@example.com'], 'subject': 'Benchmark'}
+    })
+    signature = base64.b64encode(hmac.new(key, f'{delivery_id}.{timestamp}.{body}'.encode(), hashlib.sha256).digest()).decode()
+    return {
+        'method': 'POST', 'path_': f'/webhook{webhook_endpoint(sender.webhook_url)}/', 'body': body.encode(),
+        'headers': [('content-type', 'application/json'), ('svix-id', delivery_id),
+                    ('svix-timestamp', timestamp), ('svix-signature', f'v1,{signature}')],
+    }
+
+
+async def run_level(app, make_request, total, concurrency):
+    """Send `total` requests with `concurrency` in flight, returns (seconds, latencies, errors, peak threads)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            status = await call(app, **make_request())
+            latencies.append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                errors += 1
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    return elapsed, sorted(latencies), errors, peak_threads
+
+
+def benchmark(label, make_request, total, levels):
+    print(f"\n--- {label} ---")
+    print(f"{'mode':<6} {'in flight':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'threads':>8}")
+    for mode in ('sync', 'async'):
+        settings.ROOT_URLCONF = make_urlconf(f'benchmark_{mode}_urls', mode)
+        clear_url_caches()
+        app = ASGIHandler()
+        for concurrency in levels:
+            elapsed, latencies, errors, threads = asyncio.run(run_level(app, make_request, total, concurrency))
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            print(f"{mode:<6} {concurrency:>9} {total / elapsed:>9.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7} {threads:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sender', help='Sender key (default: the first active sender with a webhook URL)')
+    parser.add_argument('--requests', type=int, default=400, help='Requests per concurrency level (default: 400)')
+    parser.add_argument('--concurrency', default='1,10,50,200', help='Requests in flight (default: 1,10,50,200)')
+    parser.add_argument('--upstream-latency', type=float, default=50, help='Resend API stand-in latency in ms (default: 50)')
+    options = parser.parse_args()
+    levels = [int(level) for level in options.concurrency.split(',')]
+
+    senders = [sender for sender in sender_registry.active() if webhook_endpoint(sender.webhook_url)]
+    sender = sender_registry.get(options.sender) if options.sender else (senders[0] if senders else None)
+    if not sender:
+        sys.exit('No active sender found - create one (with a webhook URL) or pass --sender')
+
+    settings.WEBHOOK_INLINE_DRAIN = False
+    upstream, upstream_port = start_upstream(options.upstream_latency)
+    settings.RESEND_API_URL = f'http://127.0.0.1:{upstream_port}'
+    provider._clients.clear()
+
+    print(f"=== ASYNC VIEWS BENCHMARK ({options.requests} requests per level, sender {sender.key}) ===")
+    try:
+        if webhook_endpoint(sender.webhook_url) and sender.webhook_secret:
+            benchmark('webhook (verify + queue)', lambda: webhook_request(sender), options.requests, levels)
+        else:
+            print("\nSkipping webhooks: the sender has no webhook URL or secret")
+
+        stats_query = urlencode({'sender': sender.key})
+        benchmark('contact stats (cached)', lambda: {
+            'method': 'GET', 'path_': '/monitor/api/contact_stats/', 'query': stats_query
+        }, options.requests, levels)
+        benchmark('event time series', lambda: {
+            'method': 'GET', 'path_': '/monitor/api/event_timeseries/', 'query': stats_query
+        }, options.requests, levels)
+
+        event = EmailEvent.from_sender(sender.email).filter(
+            email_id__isnull=False, sender=sender, to_email__in=Contact.objects.values('email')
+        ).order_by('-id').first()
+        if event:
+            content_query = urlencode({'sender': sender.key, 'email': event.to_email})
+            benchmark(f'contact email content ({options.upstream_latency:.0f} ms upstream)', lambda: {
+                'method': 'GET', 'path_': '/monitor/api/contact_email_content/', 'query': content_query
+            }, options.requests, levels)
+        else:
+            print("\nSkipping email content: no event with an email ID for a contact of this sender")
+    finally:
+        deleted = WebhookDelivery.objects.filter(delivery_id__startswith='bench-').delete()[0]
+        upstream.terminate()
+        print(f"\n🧹 Removed {deleted} queued benchmark deliveries")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Microbenchmark: compiled templates vs. the per-contact regex/replace loop.
+
+Usage: python benchmark_templates.py [contacts]
+"""
+import os
+import re
+import sys
+import time
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'email_sender.settings')
+django.setup()
+
+from email_monitor.models import Contact
+from email_monitor.templating import compile_template
+
+TEMPLATE = """<html><body>
+<p>Hi {prospect_first_name},</p>
+
+<p>{tailored_tone_first_line}</p>
+
+<p>I noticed {company_name} is doing great work in {company_industry} out of {prospect_location_city}.
+As {job_title}, you might find this interesting: <a href="{company_website}">see how</a>.</p>
+
+
+<p>Best regards,<br>The team</p>
+<p>P.S. {tailored_tone_ps_statement}</p>
+</body></html>"""
+
+
+def legacy_render(template, contact):
+    """The loop the campaign sender ran for every contact before templates were compiled"""
+    contact_data = {
+        'prospect_first_name': contact.first_name or '',
+        'prospect_last_name': contact.last_name or '',
+        'company_name': contact.company_name or '',
+        'job_title': contact.job_title or '',
+        'prospect_location_city': contact.location_city or '',
+        'prospect_location_country': contact.location_country or '',
+        'company_industry': contact.company_industry or '',
+        'company_website': contact.company_website or '',
+        'linkedin_url': contact.linkedin_url or '',
+        'linkedin_headline': contact.linkedin_headline or '',
+        'phone_number': contact.phone_number or '',
+        'tailored_tone_first_line': contact.tailored_tone_first_line or '',
+        'tailored_tone_ps_statement': contact.tailored_tone_ps_statement or '',
+        'tailored_tone_subject': contact.tailored_tone_subject or '',
+        'custom_ai_1': contact.custom_ai_1 or '',
+        'custom_ai_2': contact.custom_ai_2 or '',
+        'company_description': contact.company_description or '',
+        'websitecontent': contact.websitecontent or '',
+        'full_name': contact.full_name,
+    }
+    email_html_content = template
+    placeholders = re.findall(r'\{(.*?)\}', template)
+    for placeholder in placeholders:
+        value = contact_data.get(placeholder, f'[{placeholder} not found]')
+        email_html_content = email_html_content.replace(f'{{{placeholder}}}', str(value))
+    email_text_content = re.sub(r'<[^>]+>', '', email_html_content)
+    email_text_content = re.sub(r'\n\s*\n', '\n\n', email_text_content.strip())
+    return email_html_content, email_text_content
+
+
+def make_contacts(count):
+    return [
+        Contact(
+            id=i,
+            email=f'contact{i}@example.com',
+            first_name=f'First{i}',
+            last_name=f'Last{i}',
+            company_name=f'Company {i}',
+            company_industry='Software',
+            location_city='Berlin',
+            job_title='CTO',
+            company_website=f'https://company{i}.example.com',
+            tailored_tone_first_line=f'Loved your recent post number {i}.',
+            # Every tenth contact has an empty field, which takes the slower text path
+            tailored_tone_ps_statement='' if i % 10 == 0 else 'Happy to share a case study.',
+        )
+        for i in range(count)
+    ]
+
+
+def timed(label, render, contacts):
+    start = time.perf_counter()
+    for contact in contacts:
+        render(contact)
+    elapsed = time.perf_counter() - start
+    per_contact = elapsed / len(contacts) * 1_000_000
+    print(f"{label:<12} {elapsed * 1000:9.1f} ms total  {per_contact:7.2f} µs/contact")
+    return elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    contacts = make_contacts(count)
+    compiled = compile_template(TEMPLATE)
+
+    # Both renderers must produce identical emails
+    mismatches = sum(1 for contact in contacts if compiled.render(contact) != legacy_render(TEMPLATE, contact))
+    print(f"=== TEMPLATE RENDERING BENCHMARK ({count} contacts) ===")
+    print(f"Output mismatches: {mismatches}")
+
+    legacy = timed('legacy', lambda contact: legacy_render(TEMPLATE, contact), contacts)
+    fast = timed('compiled', compiled.render, contacts)
+    print(f"Speedup: {legacy / fast:.1f}x")
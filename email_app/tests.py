@@ -1,3 +1,84 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from email_monitor.models import CampaignJob, Contact, ContactSenderStatus, EmailCampaign, EmailEvent, EmailSender
+from email_monitor.senders import sender_registry
+from email_monitor.stats import async_contact_stats_api
+
+from .views import contact_stats_api
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EmailAppTestCase(TestCase):
+    """Starts each test without the cached stats and senders of the previous one"""
+
+    def setUp(self):
+        cache.clear()
+        sender_registry.invalidate()
+        EmailSender.objects.create(
+            key='s1', email='team@example.com', name='Team', domain='example.com', api_key='re_s1',
+            webhook_url='https://example.com/webhooks1/', webhook_secret='whsec_MDEyMzQ1Njc4OWFiY2RlZg=='
+        )
+        for contact_id in range(1, 6):
+            Contact.objects.create(category_id='1', category_name='Leads', contact_id=contact_id,
+                                   email=f'Lead{contact_id}@Example.com')
+        # Lead1 was already emailed by this sender
+        ContactSenderStatus.record_events([
+            EmailEvent(event_type='email.delivered', created_at=timezone.now(), email_id='em_1',
+                       from_email='Team <team@example.com>', to_email='lead1@example.com')
+        ])
+
+
+@override_settings(CAMPAIGN_INLINE_WORKER=False, CAMPAIGN_CHUNK_SIZE=2)
+class SendEmailsTests(EmailAppTestCase):
+    def send(self, **data):
+        return self.client.post('/send_emails/', json.dumps({
+            'sender': 's1', 'template': '<p>Hi {prospect_first_name} {nickname}</p>', 'session_id': 'c1', **data
+        }), content_type='application/json')
+
+    def test_queues_the_contacts_not_sent_to_in_chunks(self):
+        response = self.send(contact_filter='not_sent')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_contacts'], 4)
+        self.assertEqual(response.json()['unknown_placeholders'], ['nickname'])
+        jobs = CampaignJob.objects.filter(campaign__session_id='c1').order_by('start_index')
+        self.assertEqual([(job.start_index, len(job.contact_ids)) for job in jobs], [(0, 2), (2, 2)])
+        queued = Contact.objects.filter(id__in=[contact_id for job in jobs for contact_id in job.contact_ids])
+        self.assertNotIn('Lead1@Example.com', queued.values_list('email', flat=True))
+        self.assertTrue(EmailCampaign.objects.get(session_id='c1').jobs_enqueued)
+
+    def test_status_filter_matches_addresses_regardless_of_case(self):
+        response = self.send(contact_filter='delivered')
+
+        self.assertEqual(response.json()['total_contacts'], 1)
+
+    def test_unknown_sender_is_rejected(self):
+        response = self.send(sender='nobody')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EmailCampaign.objects.exists())
+
+
+class ContactStatsApiTests(EmailAppTestCase):
+    async def test_async_view_matches_the_sync_view(self):
+        for query in ({'sender': 's1'}, {'sender': 's1', 'category': '1'}):
+            request = RequestFactory().get('/api/contact_stats/', query)
+            with self.subTest(query=query):
+                expected = json.loads((await sync_to_async(contact_stats_api)(request)).content)
+                response = await async_contact_stats_api(request)
+                self.assertEqual(json.loads(response.content), expected)
+
+    def test_counts_contacts_by_their_latest_status(self):
+        response = self.client.get('/api/contact_stats/', {'sender': 's1'})
+
+        stats = response.json()
+        self.assertEqual((stats['total_contacts'], stats['not_sent'], stats['delivered']), (5, 4, 1))
+
+    def test_sender_is_required(self):
+        self.assertEqual(self.client.get('/api/contact_stats/').status_code, 400)
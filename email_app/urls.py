@@ -1,11 +1,13 @@
+from django.conf import settings
 from django.urls import path
+from email_monitor.stats import async_contact_stats_api
 from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('sender-management/', views.sender_management, name='sender_management'),
     path('send_emails/', views.send_emails, name='send_emails'),
-    path('api/contact_stats/', views.contact_stats_api, name='contact_stats_api'),
+    path('api/contact_stats/', async_contact_stats_api if settings.ASYNC_VIEWS else views.contact_stats_api, name='contact_stats_api'),
     path('api/campaign_status/', views.get_campaign_status, name='get_campaign_status'),
     path('api/campaign_history/', views.get_campaign_history, name='get_campaign_history'),
     path('api/campaign_control/', views.campaign_control, name='campaign_control'),
@@ -6,9 +6,14 @@ import pandas as pd
 import re
 import os
 import json
-import resend
+import logging
+from email_monitor.db_routing import read_from_replica
 from email_monitor.models import Contact, EmailTemplate
 from email_monitor.views import get_sender_email
+from email_monitor.sending import RESEND_BATCH_SIZE
+from email_monitor.senders import sender_registry
+
+logger = logging.getLogger(__name__)
 
 # Store CSV data in memory (for simplicity; could use database or session for persistence)
 csv_data = None
@@ -17,21 +22,8 @@ csv_columns = []
 def get_email_senders():
     """Get email senders from database with fallback to settings"""
     try:
-        from email_monitor.models import EmailSender
-        
-        # Get active senders from database
-        db_senders = EmailSender.objects.filter(is_active=True)
-        senders_dict = {}
-        
-        for sender in db_senders:
-            senders_dict[sender.key] = {
-                'email': sender.email,
-                'name': sender.name,
-                'api_key': sender.api_key,
-                'domain': sender.domain,
-                'webhook_url': sender.webhook_url,
-                'webhook_secret': sender.webhook_secret
-            }
+        # Get active senders from the in-process registry
+        senders_dict = {sender.key: sender.as_config() for sender in sender_registry.active()}
         
         # If no database senders, fallback to settings
         if not senders_dict:
@@ -101,13 +93,14 @@ def save_template(request):
 
 def send_emails(request):
     """Send emails using Resend API with click and open tracking enabled and real-time WebSocket progress"""
-    from email_monitor.models import Contact, EmailCampaign
-    import uuid
+    from email_monitor.models import CampaignJob, Contact, EmailCampaign
+    from email_monitor.campaign_runner import enqueue_campaign_contacts, run_campaign_job
+    from email_monitor.templating import compile_template
+    from django.db import close_old_connections
+    import socket
     import time
+    import uuid
     import threading
-    from asgiref.sync import async_to_sync
-    from channels.layers import get_channel_layer
-    from django.utils import timezone
     
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST method allowed'}, status=405)
@@ -128,22 +121,9 @@ def send_emails(request):
     sender_key = data.get('sender')  # Which sender to use
     session_id = data.get('session_id') or str(uuid.uuid4())  # WebSocket session ID
     email_timeout = data.get('email_timeout', 1)  # Timeout per email (adjustable, default 1 second)
-    
-    # Initialize WebSocket broadcasting
-    channel_layer = get_channel_layer()
-    room_group_name = f'email_progress_{session_id}'
-    
-    def broadcast_progress(message_type, data_dict):
-        """Broadcast progress update via WebSocket"""
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                room_group_name,
-                {
-                    'type': 'progress_update',
-                    'message_type': message_type,
-                    'data': data_dict
-                }
-            )
+    send_mode = data.get('send_mode', 'single')  # 'single' = one request per email, 'batch' = Resend batch endpoint, 'concurrent' = paced parallel sends
+    send_rate = data.get('send_rate')  # Sends per second for concurrent mode (defaults to one per email_timeout)
+    concurrency = data.get('concurrency', getattr(settings, 'EMAIL_SEND_CONCURRENCY', 4))  # Requests in flight for concurrent mode
     
     if not sender_key:
         return JsonResponse({
@@ -159,10 +139,23 @@ def send_emails(request):
     
     sender_config = email_senders[sender_key]
     api_key = sender_config['api_key']
-    from_email = sender_config['email']
-    sender_name = sender_config['name']
     
     # Validation
+    if send_mode not in ('single', 'batch', 'concurrent'):
+        return JsonResponse({
+            'error': f'Invalid send mode: {send_mode}'
+        }, status=400)
+    
+    try:
+        max_rate = getattr(settings, 'EMAIL_SEND_MAX_RATE', 10)
+        send_rate = float(send_rate) if send_rate else 1.0 / max(float(email_timeout), 0.1)
+        send_rate = max(0.1, min(max_rate, send_rate))
+        concurrency = max(1, min(50, int(concurrency)))
+    except (ValueError, TypeError):
+        return JsonResponse({
+            'error': 'send_rate and concurrency must be numbers'
+        }, status=400)
+    
     if not template:
         return JsonResponse({
             'error': 'Missing email template'
@@ -173,14 +166,19 @@ def send_emails(request):
             'error': 'Resend API key not configured in environment'
         }, status=500)
     
+    # Parse the template once up front so unknown placeholders are reported before anything is sent
+    unknown_placeholders = compile_template(template).unknown_placeholders
+    
     # Get contacts based on selection method
     # Get sender email using the dynamic system
     sender_email = get_sender_email(sender_key)
     
+    limit = None  # Legacy contact_limit, applied while the contacts are streamed
     if selected_contact_ids:
         # Custom selection: get contacts by IDs (no sender filtering needed)
         contacts = Contact.objects.filter(id__in=selected_contact_ids)
-        if not contacts.exists():
+        total_contacts = contacts.count()
+        if not total_contacts:
             return JsonResponse({
                 'error': 'No contacts found with the selected IDs'
             }, status=400)
@@ -192,46 +190,35 @@ def send_emails(request):
         # Get ALL contacts first (contacts are independent of senders)
         contacts = Contact.objects.all()
         
-        # Filter by email status based on LATEST EmailEvent records only
+        # Filter by email status based on the LATEST status from this sender
         if contact_filter != 'all':
-            from email_monitor.models import EmailEvent
-            from django.db.models import Exists, OuterRef, Subquery
+            from django.db.models.functions import Lower
+            from email_monitor.models import ContactSenderStatus
             
+            # Statuses are keyed by the lowercased recipient address
+            contacts = contacts.alias(email_lower=Lower('email'))
             if contact_filter == 'not_sent':
-                # Contacts with no email events from this sender at all
-                any_events = EmailEvent.objects.filter(
-                    to_email=OuterRef('email'),
-                    from_email__icontains=sender_email
+                # Contacts this sender never emailed
+                contacts = contacts.exclude(
+                    email_lower__in=ContactSenderStatus.for_sender(sender_email).values('email')
                 )
-                contacts = contacts.filter(~Exists(any_events))
             else:
-                # For all other filters, we need to check the latest event type
-                # Get the most recent email event for each contact from this sender
-                latest_event_subquery = EmailEvent.objects.filter(
-                    to_email=OuterRef('email'),
-                    from_email__icontains=sender_email
-                ).order_by('-created_at').values('event_type')[:1]
-                
-                # Annotate contacts with their latest event type from this sender
-                contacts = contacts.annotate(
-                    latest_event_type=Subquery(latest_event_subquery)
-                )
-                
-                # Filter based on the specific event type
-                if contact_filter == 'sent':
-                    contacts = contacts.filter(latest_event_type='email.sent')
-                elif contact_filter == 'delivered':
-                    contacts = contacts.filter(latest_event_type='email.delivered')
-                elif contact_filter == 'opened':
-                    contacts = contacts.filter(latest_event_type='email.opened')
-                elif contact_filter == 'clicked':
-                    contacts = contacts.filter(latest_event_type='email.clicked')
-                elif contact_filter == 'bounced':
-                    contacts = contacts.filter(latest_event_type='email.bounced')
-                elif contact_filter == 'failed':
-                    contacts = contacts.filter(latest_event_type='email.failed')
-                elif contact_filter == 'complained':
-                    contacts = contacts.filter(latest_event_type='email.complained')
+                # Filter on the latest event type from this sender
+                event_type_map = {
+                    'sent': 'email.sent',
+                    'delivered': 'email.delivered',
+                    'opened': 'email.opened',
+                    'clicked': 'email.clicked',
+                    'bounced': 'email.bounced',
+                    'failed': 'email.failed',
+                    'complained': 'email.complained',
+                }
+                if contact_filter in event_type_map:
+                    contacts = contacts.filter(
+                        email_lower__in=ContactSenderStatus.for_sender(sender_email).filter(
+                            latest_event_type=event_type_map[contact_filter]
+                        ).values('email')
+                    )
         
         # Apply category filter if specified
         if category_filter:
@@ -251,12 +238,13 @@ def send_emails(request):
         
         # Apply legacy limit if specified and no range is used (for backward compatibility)
         elif contact_limit and isinstance(contact_limit, int) and contact_limit > 0:
-            contacts = contacts[:contact_limit]
+            limit = contact_limit
         
-        # Order by category_id and contact_id for consistent results
-        contacts = contacts.order_by('category_id', 'contact_id')
+        total_contacts = contacts.count()
+        if limit is not None:
+            total_contacts = min(total_contacts, limit)
         
-        if not contacts.exists():
+        if not total_contacts:
             range_info = ""
             if contact_range_start or contact_range_end:
                 if contact_range_start and contact_range_end:
@@ -272,21 +260,8 @@ def send_emails(request):
                 'error': f'No contacts found with status "{contact_filter}"{category_info}{range_info}'
             }, status=400)
     
-    # Configure Resend
-    resend.api_key = api_key
-    
     try:
-        contacts_list = list(contacts)
-        total_contacts = len(contacts_list)
-        
-        print(f"🔍 EMAIL CAMPAIGN DEBUG:")
-        print(f"   📊 Total contacts found: {total_contacts}")
-        print(f"   🎯 Filter: {contact_filter}")
-        print(f"   📂 Category: {category_filter}")
-        print(f"   🆔 Range: {contact_range_start}-{contact_range_end}")
-        print(f"   📧 Sender: {sender_key}")
-        
-        # Create campaign record for persistence
+        # Create campaign record; its jobs (chunks of contacts) are added as the contacts are read
         campaign = EmailCampaign.objects.create(
             session_id=session_id,
             sender_key=sender_key,
@@ -294,6 +269,10 @@ def send_emails(request):
             template=template,
             total_contacts=total_contacts,
             email_timeout=email_timeout,
+            send_mode=send_mode,
+            send_rate=send_rate,
+            concurrency=concurrency,
+            jobs_enqueued=False,
             contact_selection={
                 'contact_filter': contact_filter,
                 'category_filter': category_filter,
@@ -302,223 +281,49 @@ def send_emails(request):
                 'selected_contact_ids': selected_contact_ids
             }
         )
-        campaign.mark_as_running()
         
-        # Broadcast campaign start
-        broadcast_progress('campaign_start', {
-            'total_contacts': total_contacts,
-            'sender': f"{sender_name} <{from_email}>",
-            'subject': subject,
-            'session_id': session_id,
-            'filter_info': f"{contact_filter} contacts" + (f" from category {category_filter}" if category_filter else "")
+        if getattr(settings, 'CAMPAIGN_INLINE_WORKER', True):
+            # No separate worker process - send the chunks one after another from a thread in this process
+            def process_emails_background():
+                """Background function to process emails without blocking the HTTP request"""
+                worker_id = f"{socket.gethostname()}:{os.getpid()}:inline"
+                while True:
+                    claimed_job = CampaignJob.claim_next(worker_id, campaign_id=campaign.id)
+                    if not claimed_job:
+                        # Later chunks may still be on their way from the request thread
+                        if EmailCampaign.objects.filter(id=campaign.id, jobs_enqueued=False).exists():
+                            time.sleep(0.1)
+                            continue
+                        break
+                    run_campaign_job(claimed_job, worker_id)
+                close_old_connections()
+            
+            # Start background processing; it picks up the first chunk as soon as it is committed
+            email_thread = threading.Thread(target=process_emails_background, daemon=True)
+            email_thread.start()
+        
+        # Freeze the recipients on the jobs so the campaign can be resumed after a restart.
+        # Only IDs are read, a chunk at a time, and each chunk can be sent while the next is read.
+        try:
+            total_contacts = enqueue_campaign_contacts(campaign, contacts, limit=limit)
+        except Exception:
+            campaign.mark_as_failed()
+            CampaignJob.objects.filter(campaign=campaign, status='queued').update(status='cancelled')
+            raise
+        
+        logger.info(f"Campaign {session_id}: queued {total_contacts} contacts from sender {sender_key}", extra={
+            'category': 'campaign', 'campaign': session_id, 'sender': sender_key, 'contacts': total_contacts,
+            'send_mode': send_mode, 'send_rate': send_rate, 'concurrency': concurrency,
+            'unknown_placeholders': unknown_placeholders,
         })
         
-        # Start email processing in background thread
-        def process_emails_background():
-            """Background function to process emails without blocking the HTTP request"""
-            try:
-                emails_sent = 0
-                failed_emails = []
-                
-                # Process contacts sequentially
-                for i, contact in enumerate(contacts_list):
-                    contact_index = i + 1
-                    
-                    recipient_email = contact.email.strip()
-                    if not recipient_email:
-                        continue
-
-                    # Calculate progress based on contacts processed so far (not including current)
-                    progress_percent = round((i / total_contacts) * 100) if total_contacts > 0 else 0
-
-                    # Validate email format
-                    import re
-                    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                    if not re.match(email_pattern, recipient_email):
-                        failed_emails.append(f"{recipient_email}: Invalid email format")
-                        broadcast_progress('email_error', {
-                            'contact_email': recipient_email,
-                            'contact_name': contact.full_name,
-                            'error': 'Invalid email format',
-                            'progress_percent': progress_percent
-                        })
-                        continue
-
-                    # Broadcast email start
-                    broadcast_progress('email_start', {
-                        'contact_email': recipient_email,
-                        'contact_name': contact.full_name,
-                        'contact_id': contact.id,
-                        'progress_percent': progress_percent
-                    })
-
-                    # Check if campaign has been paused or stopped
-                    campaign.refresh_from_db()  # Get latest status from database
-                    
-                    if campaign.status == 'paused':
-                        # Wait while paused, check every 5 seconds
-                        while campaign.status == 'paused':
-                            print(f"⏸️ Campaign paused, waiting...")
-                            broadcast_progress('campaign_paused', {
-                                'message': 'Campaign is paused',
-                                'contact_email': recipient_email,
-                                'progress_percent': progress_percent
-                            })
-                            time.sleep(5)
-                            campaign.refresh_from_db()
-                    
-                    if campaign.status in ['completed', 'failed']:
-                        # Campaign has been stopped
-                        print(f"🛑 Campaign stopped with status: {campaign.status}")
-                        broadcast_progress('campaign_stopped', {
-                            'message': f'Campaign stopped ({campaign.status})',
-                            'emails_sent': emails_sent,
-                            'total_contacts': total_contacts,
-                            'session_id': session_id
-                        })
-                        return  # Exit the background function
-
-                    # Create contact data dictionary for template replacement
-                    contact_data = {
-                        'prospect_first_name': contact.first_name or '',
-                        'prospect_last_name': contact.last_name or '',
-                        'company_name': contact.company_name or '',
-                        'job_title': contact.job_title or '',
-                        'prospect_location_city': contact.location_city or '',
-                        'prospect_location_country': contact.location_country or '',
-                        'company_industry': contact.company_industry or '',
-                        'company_website': contact.company_website or '',
-                        'linkedin_url': contact.linkedin_url or '',
-                        'linkedin_headline': contact.linkedin_headline or '',
-                        'phone_number': contact.phone_number or '',
-                        'tailored_tone_first_line': contact.tailored_tone_first_line or '',
-                        'tailored_tone_ps_statement': contact.tailored_tone_ps_statement or '',
-                        'tailored_tone_subject': contact.tailored_tone_subject or '',
-                        'custom_ai_1': contact.custom_ai_1 or '',
-                        'custom_ai_2': contact.custom_ai_2 or '',
-                        'company_description': contact.company_description or '',
-                        'websitecontent': contact.websitecontent or '',
-                        # Add full name for convenience
-                        'full_name': contact.full_name,
-                    }
-
-                    # Replace placeholders in template (HTML content)
-                    email_html_content = template
-
-                    # Find placeholders in template
-                    placeholders = re.findall(r'\{(.*?)\}', template)
-                    
-                    for placeholder in placeholders:
-                        value = contact_data.get(placeholder, f'[{placeholder} not found]')
-                        email_html_content = email_html_content.replace(f'{{{placeholder}}}', str(value))
-                    
-                    # Create simple plain text version by removing basic HTML tags
-                    email_text_content = re.sub(r'<[^>]+>', '', email_html_content)
-                    # Clean up extra whitespace
-                    email_text_content = re.sub(r'\n\s*\n', '\n\n', email_text_content.strip())
-                    
-                    try:
-                        # Send email with Resend API
-                        params = {
-                            "from": f"{sender_name} <{from_email}>" if sender_name else from_email,
-                            "to": [recipient_email],
-                            "subject": subject,
-                            "html": email_html_content,
-                            "text": email_text_content,
-                            # Enable tracking
-                            "tags": [
-                                {"name": "campaign", "value": "email_campaign"},
-                                {"name": "environment", "value": "production"},
-                                {"name": "contact_id", "value": str(contact.id)}
-                            ],
-                            "headers": {
-                                "X-Entity-Ref-ID": f"contact-{contact.id}"
-                            }
-                        }
-                        
-                        # Send the email
-                        response = resend.Emails.send(params)
-                        
-                        if response and 'id' in response:
-                            emails_sent += 1
-                            campaign.increment_sent()  # Update campaign progress
-                            
-                            # Calculate progress after completing this email
-                            completed_progress = round((contact_index / total_contacts) * 100)
-                            
-                            # Broadcast email success
-                            broadcast_progress('email_success', {
-                                'contact_email': recipient_email,
-                                'contact_name': contact.full_name,
-                                'contact_id': contact.id,
-                                'resend_id': response['id'],
-                                'progress_percent': completed_progress
-                            })
-                            
-                            print(f"✅ EMAIL SENT: Successfully sent to {recipient_email} with Resend ID {response['id']}")
-                        else:
-                            failed_emails.append(recipient_email)
-                            campaign.increment_failed()  # Update campaign progress
-                            
-                            # Calculate progress after completing this email
-                            completed_progress = round((contact_index / total_contacts) * 100)
-                            
-                            broadcast_progress('email_error', {
-                                'contact_email': recipient_email,
-                                'contact_name': contact.full_name,
-                                'error': 'No response ID from Resend',
-                                'progress_percent': completed_progress
-                            })
-                            print(f"❌ EMAIL FAILED: No response ID for {recipient_email}")
-                            
-                    except Exception as email_error:
-                        failed_emails.append(f"{recipient_email}: {str(email_error)}")
-                        campaign.increment_failed()  # Update campaign progress
-                        
-                        # Calculate progress after completing this email
-                        completed_progress = round((contact_index / total_contacts) * 100)
-                        
-                        broadcast_progress('email_error', {
-                            'contact_email': recipient_email,
-                            'contact_name': contact.full_name,
-                            'error': str(email_error),
-                            'progress_percent': completed_progress
-                        })
-                        print(f"❌ EMAIL ERROR: {recipient_email}: {str(email_error)}")
-                    
-                    # Add delay between emails (respecting timeout setting)
-                    time.sleep(email_timeout)  # Use the actual timeout setting
-                
-                # Mark campaign as completed
-                campaign.mark_as_completed()
-                
-                # Broadcast campaign complete
-                success_rate = round((emails_sent / total_contacts) * 100) if total_contacts > 0 else 0
-                broadcast_progress('campaign_complete', {
-                    'emails_sent': emails_sent,
-                    'total_contacts': total_contacts,
-                    'success_rate': success_rate,
-                    'failed_count': len(failed_emails),
-                    'session_id': session_id
-                })
-                
-                # Save the template as the last used template
-                try:
-                    EmailTemplate.save_last_used_template(sender_key, subject, template)
-                except Exception as e:
-                    print(f"Failed to save template: {e}")  # Log but don't fail the email sending
-                    
-            except Exception as e:
-                campaign.mark_as_failed()
-                broadcast_progress('campaign_error', {
-                    'error': str(e),
-                    'session_id': session_id
-                })
-                print(f"❌ CAMPAIGN ERROR: {str(e)}")
-        
-        # Start background processing
-        email_thread = threading.Thread(target=process_emails_background, daemon=True)
-        email_thread.start()
+        # In batch mode the timeout is applied once per batch instead of once per email
+        if send_mode == 'batch':
+            estimated_seconds = -(-total_contacts // RESEND_BATCH_SIZE) * email_timeout
+        elif send_mode == 'concurrent':
+            estimated_seconds = total_contacts / send_rate
+        else:
+            estimated_seconds = total_contacts * email_timeout
         
         # Return immediately with campaign started confirmation
         return JsonResponse({
@@ -526,7 +331,9 @@ def send_emails(request):
             'campaign_started': True,
             'session_id': session_id,
             'total_contacts': total_contacts,
-            'estimated_duration_minutes': round((total_contacts * email_timeout) / 60, 1)
+            'send_mode': send_mode,
+            'unknown_placeholders': unknown_placeholders,
+            'estimated_duration_minutes': round(estimated_seconds / 60, 1)
         })
         
     except Exception as e:
@@ -565,6 +372,9 @@ def get_campaign_status(request):
                 'subject': campaign.subject,
                 'sender_key': campaign.sender_key,
                 'email_timeout': campaign.email_timeout,
+                'send_mode': campaign.send_mode,
+                'send_rate': campaign.send_rate,
+                'concurrency': campaign.concurrency,
                 'created_at': campaign.created_at.isoformat(),
                 'started_at': campaign.started_at.isoformat() if campaign.started_at else None,
             }
@@ -576,9 +386,10 @@ def get_campaign_status(request):
         }, status=500)
 
 
+@read_from_replica
 def get_campaign_history(request):
     """API endpoint to get campaign history"""
-    from email_monitor.models import EmailCampaign
+    from email_monitor.models import EmailCampaign, EmailEventRollup
     from django.utils import timezone
     from datetime import timedelta
     
@@ -592,6 +403,9 @@ def get_campaign_history(request):
             created_at__gte=thirty_days_ago
         ).order_by('-created_at')[:50]  # Limit to 50 most recent
         
+        # Webhook event counts of all these campaigns from the daily rollups, in one query
+        event_totals = EmailEventRollup.campaign_totals([campaign.id for campaign in campaigns])
+        
         campaign_list = []
         for campaign in campaigns:
             # Calculate duration if campaign has start and end times
@@ -612,10 +426,17 @@ def get_campaign_history(request):
                 'progress_percentage': campaign.progress_percentage,
                 'success_rate': campaign.success_rate,
                 'email_timeout': campaign.email_timeout,
+                'send_mode': campaign.send_mode,
+                'send_rate': campaign.send_rate,
+                'concurrency': campaign.concurrency,
                 'created_at': campaign.created_at.isoformat(),
                 'started_at': campaign.started_at.isoformat() if campaign.started_at else None,
                 'completed_at': campaign.completed_at.isoformat() if campaign.completed_at else None,
                 'duration_minutes': duration_minutes,
+                'events': {
+                    event_type.replace('email.', ''): count
+                    for event_type, count in event_totals[campaign.id].items()
+                },
             })
         
         return JsonResponse({
@@ -649,6 +470,12 @@ def mark_stuck_campaigns_finished(request):
         
         marked_count = 0
         for campaign in stuck_campaigns:
+            # Long campaigns are not stuck while a worker is still reporting on their job
+            if any(job.is_alive for job in campaign.jobs.filter(status__in=['queued', 'running'])):
+                continue
+            
+            campaign.jobs.filter(status__in=['queued', 'running']).update(status='cancelled', finished_at=timezone.now())
+            
             # Mark as completed if any emails were sent, otherwise mark as failed
             if campaign.emails_sent > 0:
                 campaign.status = 'completed'
@@ -661,7 +488,9 @@ def mark_stuck_campaigns_finished(request):
             campaign.save()
             marked_count += 1
             
-            print(f"🔧 Marked stuck campaign {campaign.session_id} as {campaign.status}")
+            logger.info(f"Marked stuck campaign {campaign.session_id} as {campaign.status}", extra={
+                'category': 'campaign', 'campaign': campaign.session_id, 'campaign_status': campaign.status
+            })
         
         return JsonResponse({
             'message': f'Marked {marked_count} stuck campaigns as finished',
@@ -677,6 +506,7 @@ def mark_stuck_campaigns_finished(request):
 def campaign_control(request):
     """API endpoint to control campaign (pause/resume/stop)"""
     from email_monitor.models import EmailCampaign
+    from email_monitor.control import send_control
     from django.utils import timezone
     
     if request.method != 'POST':
@@ -701,9 +531,12 @@ def campaign_control(request):
                 return JsonResponse({'error': 'Campaign is not running'}, status=400)
             
             campaign.status = 'paused'
-            campaign.save()
+            campaign.save(update_fields=['status'])
+            send_control(campaign.session_id, status=campaign.status)
             
-            print(f"⏸️ Campaign {campaign.session_id} paused")
+            logger.info(f"Campaign {campaign.session_id} paused", extra={
+                'category': 'campaign', 'campaign': campaign.session_id, 'campaign_status': campaign.status
+            })
             return JsonResponse({
                 'message': 'Campaign paused successfully',
                 'status': campaign.status
@@ -714,9 +547,12 @@ def campaign_control(request):
                 return JsonResponse({'error': 'Campaign is not paused'}, status=400)
             
             campaign.status = 'running'
-            campaign.save()
+            campaign.save(update_fields=['status'])
+            send_control(campaign.session_id, status=campaign.status)
             
-            print(f"▶️ Campaign {campaign.session_id} resumed")
+            logger.info(f"Campaign {campaign.session_id} resumed", extra={
+                'category': 'campaign', 'campaign': campaign.session_id, 'campaign_status': campaign.status
+            })
             return JsonResponse({
                 'message': 'Campaign resumed successfully',
                 'status': campaign.status
@@ -733,9 +569,15 @@ def campaign_control(request):
                 campaign.status = 'failed'
             
             campaign.completed_at = timezone.now()
-            campaign.save()
+            campaign.save(update_fields=['status', 'completed_at'])
+            send_control(campaign.session_id, status=campaign.status)
             
-            print(f"🛑 Campaign {campaign.session_id} stopped and marked as {campaign.status}")
+            # A job no worker has picked up yet will never need to run
+            campaign.jobs.filter(status='queued').update(status='cancelled', finished_at=timezone.now())
+            
+            logger.info(f"Campaign {campaign.session_id} stopped and marked as {campaign.status}", extra={
+                'category': 'campaign', 'campaign': campaign.session_id, 'campaign_status': campaign.status
+            })
             return JsonResponse({
                 'message': f'Campaign stopped and marked as {campaign.status}',
                 'status': campaign.status,
@@ -751,10 +593,10 @@ def campaign_control(request):
         }, status=500)
 
 
+@read_from_replica
 def contact_stats_api(request):
     """API endpoint to get contact statistics"""
-    from email_monitor.models import Contact, EmailEvent
-    from django.db.models import Subquery, OuterRef
+    from email_monitor.stats import contact_stats_response, sender_status_histogram
     
     try:
         # Get sender parameter to filter stats by sender
@@ -768,82 +610,11 @@ def contact_stats_api(request):
         # Get sender email using the dynamic system (same as used in email sending)
         sender_email = get_sender_email(sender)
         
-        # Get ALL contacts (contacts are independent of senders)
-        sender_contacts = Contact.objects.all()
-        
-        # Apply category filter if specified
-        if category_filter and category_filter != 'all':
-            print(f"📊 STATS DEBUG: Filtering by category_id = '{category_filter}'")
-            sender_contacts = sender_contacts.filter(category_id=category_filter)
-            print(f"📊 STATS DEBUG: Contacts after category filter = {sender_contacts.count()}")
-        else:
-            print(f"📊 STATS DEBUG: No category filter applied, total contacts = {sender_contacts.count()}")
-        
-        total_contacts = sender_contacts.count()
-        
-        # Count contacts by their LATEST email status using EmailEvent records
-        # Note: EmailEvent.from_email may contain full sender format like "Name <email@domain.com>"
-        # so we need to use icontains to match the email part
-        
-        from django.db.models import Subquery
-        
-        # Get the most recent email event for each contact from this sender
-        latest_event_subquery = EmailEvent.objects.filter(
-            to_email=OuterRef('email'),
-            from_email__icontains=sender_email
-        ).order_by('-created_at').values('event_type')[:1]
-        
-        # Annotate contacts with their latest event type from this sender
-        contacts_with_latest_event = sender_contacts.annotate(
-            latest_event_type=Subquery(latest_event_subquery)
-        )
-        
-        # Count contacts based on their latest email event type
-        not_sent_count = contacts_with_latest_event.filter(latest_event_type__isnull=True).count()
-        sent_count = contacts_with_latest_event.filter(latest_event_type='email.sent').count()
-        delivered_count = contacts_with_latest_event.filter(latest_event_type='email.delivered').count()
-        opened_count = contacts_with_latest_event.filter(latest_event_type='email.opened').count()
-        clicked_count = contacts_with_latest_event.filter(latest_event_type='email.clicked').count()
-        bounced_count = contacts_with_latest_event.filter(latest_event_type='email.bounced').count()
-        failed_count = contacts_with_latest_event.filter(latest_event_type='email.failed').count()
-        complained_count = contacts_with_latest_event.filter(latest_event_type='email.complained').count()
-        
-        # Debug: Check what EmailEvents exist for this sender
-        total_events = EmailEvent.objects.filter(from_email__icontains=sender_email).count()
-        recent_events = EmailEvent.objects.filter(from_email__icontains=sender_email).order_by('-created_at')[:5]
-        
-        print(f"📊 STATS DEBUG: Stats for category '{category_filter or 'All'}': Total={total_contacts}, NotSent={not_sent_count}, Sent={sent_count}")
-        print(f"📊 STATS DEBUG: Total EmailEvents for sender '{sender_email}': {total_events}")
-        print(f"📊 STATS DEBUG: Recent EmailEvents:")
-        for event in recent_events:
-            print(f"  - {event.event_type} to {event.to_email} at {event.created_at}")
-        
-        # Debug: Show sample contact with latest event
-        sample_contact = contacts_with_latest_event.first()
-        if sample_contact:
-            print(f"📊 STATS DEBUG: Sample contact '{sample_contact.email}' has latest_event_type: {sample_contact.latest_event_type}")
-        
-        return JsonResponse({
-            'total_contacts': total_contacts,
-            'total_email_events': contacts_with_latest_event.exclude(latest_event_type__isnull=True).count(),
-            'not_sent': not_sent_count,
-            'sent': sent_count,
-            'delivered': delivered_count,
-            'opened': opened_count,
-            'clicked': clicked_count,
-            'bounced': bounced_count,
-            'failed': failed_count,
-            'complained': complained_count,
-            'sender': sender,
-            'sender_email': sender_email,
-            'category_filter': category_filter,
-            'stats_explanation': {
-                'total_contacts': f'Total number of contact records {"in category " + category_filter if category_filter else "(all categories)"}',
-                'total_email_events': 'Number of contacts with email events from this sender',
-                'status_counts': 'Contact counts based on their latest email status from this sender only',
-                'category_filtered': bool(category_filter)
-            }
-        })
+        # Count ALL contacts (contacts are independent of senders) by their LATEST email
+        # status from this sender, in total and per category (cached until the next
+        # event from this sender or contact change)
+        histogram = sender_status_histogram(sender_email)
+        return contact_stats_response(histogram, sender, sender_email, category_filter)
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -852,21 +623,14 @@ def contact_stats_api(request):
 def get_senders_api(request):
     """Get all active email senders"""
     try:
-        from email_monitor.models import EmailSender
-        
-        # Get active senders from database
-        senders = EmailSender.objects.filter(is_active=True).values(
-            'key', 'email', 'name', 'domain'
-        )
-        
         # Convert to dictionary format expected by frontend
         senders_dict = {}
-        for sender in senders:
-            senders_dict[sender['key']] = {
-                'name': sender['name'],  # Use the actual name
-                'email': sender['email'],
-                'domain': sender['domain'],
-                'display_name': f"{sender['name']} ({sender['email']})" if sender['name'] != sender['email'] else sender['email']
+        for sender in sender_registry.active():
+            senders_dict[sender.key] = {
+                'name': sender.name,  # Use the actual name
+                'email': sender.email,
+                'domain': sender.domain,
+                'display_name': f"{sender.name} ({sender.email})" if sender.name != sender.email else sender.email
             }
         
         return JsonResponse({'senders': senders_dict})
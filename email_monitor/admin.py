@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EmailEvent, EmailCampaign, Contact, EmailTemplate, EmailSender
+from .models import EmailEvent, EmailCampaign, CampaignJob, Category, Contact, ContactSenderStatus, EmailEventArchive, EmailEventRollup, EmailTemplate, EmailSender, WebhookDelivery
 
 # Register your models here.
 
@@ -17,6 +17,14 @@ class EmailCampaignAdmin(admin.ModelAdmin):
     search_fields = ['session_id', 'campaign_name']
     readonly_fields = ['created_at', 'started_at', 'completed_at']
 
+@admin.register(CampaignJob)
+class CampaignJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'campaign', 'status', 'worker_id', 'attempts', 'heartbeat_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['campaign__session_id', 'worker_id']
+    readonly_fields = ['created_at', 'claimed_at', 'heartbeat_at', 'finished_at']
+    exclude = ['contact_ids']
+
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
     list_display = ['id', 'email', 'first_name', 'last_name', 'company_name', 'category_name', 'created_at']
@@ -24,6 +32,30 @@ class ContactAdmin(admin.ModelAdmin):
     search_fields = ['email', 'first_name', 'last_name', 'company_name']
     readonly_fields = ['created_at']
 
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'contact_count', 'last_contact_id', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at']
+
+@admin.register(ContactSenderStatus)
+class ContactSenderStatusAdmin(admin.ModelAdmin):
+    list_display = ['email', 'sender_email', 'latest_event_type', 'last_event_at', 'sent_count', 'opened_count', 'clicked_count']
+    list_filter = ['latest_event_type', 'sender_email']
+    search_fields = ['email', 'sender_email']
+    readonly_fields = ['updated_at']
+
+@admin.register(EmailEventRollup)
+class EmailEventRollupAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'granularity', 'sender_email', 'category_id', 'campaign_id', 'event_type', 'count']
+    list_filter = ['granularity', 'event_type', 'sender_email']
+    date_hierarchy = 'bucket'
+
+@admin.register(EmailEventArchive)
+class EmailEventArchiveAdmin(admin.ModelAdmin):
+    list_display = ['month', 'event_count', 'size_bytes', 'path', 'archived_at']
+    readonly_fields = ['archived_at']
+
 @admin.register(EmailTemplate)
 class EmailTemplateAdmin(admin.ModelAdmin):
     list_display = ['id', 'template_type', 'sender', 'subject', 'updated_at']
@@ -48,3 +80,9 @@ class EmailSenderAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'sender_key', 'received_at', 'attempts', 'last_error']
+    list_filter = ['sender_key', 'attempts']
+    readonly_fields = ['received_at']
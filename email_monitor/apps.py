@@ -1,15 +1,35 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def create_search_extensions(sender, using, **kwargs):
+    """
+    Create the pg_trgm extension the contact search index needs, before the
+    (generated) migrations that add it run.
+    """
+    from django.db import connections
+    
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
 class EmailMonitorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'email_monitor'
 
     def ready(self):
         """This method is called when Django starts up - CSV import disabled"""
+        pre_migrate.connect(create_search_extensions, sender=self)
+        
+        # Connect the sender registry's post_save/post_delete invalidation
+        from . import senders  # noqa: F401
+        
         logger.info("Email Monitor app ready - UI-only contact management enabled")
         
         # CSV import functionality has been disabled
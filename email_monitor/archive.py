@@ -0,0 +1,84 @@
+"""
+Cold storage for old email events.
+
+archive_email_events moves whole months of EmailEvent rows into gzipped JSON
+lines files under EVENT_ARCHIVE_DIR, one event per line in the order they
+happened. EmailEvent then only holds the recent months that webhooks, contact
+pages and the stats read, and an archived month is dropped by deleting its file.
+"""
+
+import datetime
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from .models import EmailEvent, EmailEventArchive
+
+# Every column of an event, foreign keys by ID
+ARCHIVE_FIELDS = [field.attname for field in EmailEvent._meta.concrete_fields]
+DATETIME_FIELDS = ('created_at', 'received_at')
+
+
+def month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month):
+    return month_start(month_start(month) + datetime.timedelta(days=32))
+
+
+def archive_path(month, part=1):
+    """File of an archived month; events that arrive for it later go to further parts"""
+    suffix = '' if part == 1 else f'.{part}'
+    return os.path.join(str(settings.EVENT_ARCHIVE_DIR), f'email_events-{month:%Y-%m}{suffix}.jsonl.gz')
+
+
+def _encode(value):
+    # Full precision, DjangoJSONEncoder cuts datetimes to milliseconds
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_archive(events, path, batch_size=2000):
+    """
+    Write a queryset of events to a new archive file, complete or not at all.
+    Returns the number of events and the file size.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.partial'
+    count = 0
+    with open(partial, 'wb') as raw:
+        with gzip.open(raw, 'wt', encoding='utf-8') as f:
+            for row in events.order_by('created_at', 'id').values(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+                f.write(json.dumps(row, default=_encode, separators=(',', ':')) + '\n')
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    return count, os.path.getsize(path)
+
+
+def read_archive(path):
+    """Events of an archive file as dicts of ARCHIVE_FIELDS, in the order they happened"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            for field in DATETIME_FIELDS:
+                if row.get(field):
+                    row[field] = parse_datetime(row[field])
+            yield row
+
+
+def delete_archives():
+    """Delete every archive file and its record, returns how many events they held"""
+    deleted = 0
+    for archive in EmailEventArchive.objects.all():
+        if os.path.exists(archive.path):
+            os.remove(archive.path)
+        deleted += archive.event_count
+    EmailEventArchive.objects.all().delete()
+    return deleted
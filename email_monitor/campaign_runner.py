@@ -0,0 +1,558 @@
+"""
+Runs queued email campaigns.
+
+A campaign's contacts are frozen into CampaignJob chunks when it is created,
+streamed from the database a chunk at a time so sending starts with the first
+chunk instead of after the whole selection has been read.
+
+Workers on any node claim chunks, send them and checkpoint progress on the
+job, so a chunk that is interrupted (restart, deploy, crash) is claimed again
+and resumed where it stopped, and each contact is sent by one worker only.
+"""
+
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+
+from .control import CampaignControlListener
+from .models import CampaignJob, Contact, EmailSender, EmailTemplate
+from .progress import CampaignProgress, ProgressBroadcaster
+from .provider import get_resend_client
+from .sending import RESEND_BATCH_SIZE, ConcurrentCampaignSender, build_email_params, idempotency_key, send_batch
+from .templating import compile_template
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Contacts are loaded from the job's ID list this many at a time
+CONTACT_FETCH_SIZE = 500
+
+# Contact fields the send loop reads besides the template's placeholders
+CONTACT_SEND_FIELDS = ('id', 'email', 'first_name', 'last_name')
+
+
+def get_sender_config(sender_key):
+    """Get sender configuration from database with fallback to settings"""
+    config = EmailSender.get_sender_config(sender_key)
+    if config:
+        return config
+    return getattr(settings, 'EMAIL_SENDERS', {}).get(sender_key)
+
+
+def iter_contact_id_pages(contacts, page_size, limit=None):
+    """
+    Yield the IDs of a contact queryset in pages of `page_size`, in
+    (category_id, contact_id) order, stopping after `limit` contacts.
+
+    Pages are read with keyset pagination on the unique (category_id,
+    contact_id) pair, so every page is an index range scan no matter how deep
+    into the selection it is, and only IDs are held in memory.
+    """
+    contacts = contacts.order_by('category_id', 'contact_id')
+    remaining = limit
+    last = None
+    while remaining is None or remaining > 0:
+        page = contacts
+        if last is not None:
+            category_id, contact_id = last
+            page = page.filter(Q(category_id__gt=category_id) | Q(category_id=category_id, contact_id__gt=contact_id))
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = list(page.values_list('id', 'category_id', 'contact_id')[:size])
+        if rows:
+            yield [row[0] for row in rows]
+        if len(rows) < size:
+            return
+        if remaining is not None:
+            remaining -= len(rows)
+        last = rows[-1][1:]
+
+
+def enqueue_campaign_contacts(campaign, contacts, limit=None, chunk_size=None):
+    """
+    Split a campaign's contacts into queued jobs as they are read.
+
+    Each chunk is committed as soon as its page is read, so workers can start
+    sending it while later pages are still being read. The campaign can't
+    complete until the last chunk exists. Returns the number of contacts.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CAMPAIGN_CHUNK_SIZE', 1000)
+    total = 0
+    for contact_ids in iter_contact_id_pages(contacts, chunk_size, limit):
+        CampaignJob.create_chunks(campaign, contact_ids, chunk_size, start_index=total)
+        total += len(contact_ids)
+    if not total:
+        # Nothing matched (any more) - one empty job lets the campaign complete
+        CampaignJob.create_chunks(campaign, [])
+
+    campaign.finish_enqueueing(total)
+    # The chunks may all have been sent already while the last page was read
+    if campaign.complete_if_finished():
+        broadcaster = ProgressBroadcaster(campaign.session_id)
+        announce_completion(campaign, broadcaster.send)
+        broadcaster.close()
+    return total
+
+
+def announce_completion(campaign, broadcast):
+    """Broadcast that a campaign completed and remember its template"""
+    total_contacts = campaign.total_contacts
+    success_rate = round((campaign.emails_sent / total_contacts) * 100) if total_contacts > 0 else 0
+    broadcast('campaign_complete', {
+        'emails_sent': campaign.emails_sent,
+        'total_contacts': total_contacts,
+        'success_rate': success_rate,
+        'failed_count': campaign.emails_failed,
+        'session_id': campaign.session_id
+    })
+
+    # Save the template as the last used template
+    try:
+        EmailTemplate.save_last_used_template(campaign.sender_key, campaign.subject, campaign.template)
+    except Exception as e:
+        logger.warning(f"Failed to save template: {e}", extra={'category': 'campaign', 'campaign': campaign.session_id})  # Log but don't fail the email sending
+
+
+def iter_job_contacts(contact_ids, start, fields=None):
+    """
+    Yield (position, contact) for the job's contacts from `start`, skipping deleted ones.
+
+    With `fields`, only those columns are loaded, which keeps large columns
+    (website content, summaries, CSV data) the template doesn't use out of memory.
+    """
+    queryset = Contact.objects.only(*fields) if fields else Contact.objects.all()
+    for offset in range(start, len(contact_ids), CONTACT_FETCH_SIZE):
+        chunk_ids = contact_ids[offset:offset + CONTACT_FETCH_SIZE]
+        contacts = queryset.in_bulk(chunk_ids)
+        for position, contact_id in enumerate(chunk_ids, offset):
+            yield position, contacts.get(contact_id)
+
+
+class CheckpointTracker:
+    """
+    Tracks which job positions have finished and exposes the contiguous prefix.
+
+    Batch and concurrent sends can finish out of order; only positions before the
+    first unfinished one are safe to skip when the job is resumed.
+    """
+
+    def __init__(self, start):
+        self.position = start
+        self.finished = set()
+
+    def finish(self, position):
+        self.finished.add(position)
+        while self.position in self.finished:
+            self.finished.discard(self.position)
+            self.position += 1
+        return self.position
+
+
+def run_campaign_job(job, worker_id, stop_event=None):
+    """
+    Send one claimed chunk of a campaign, resuming from its last checkpoint.
+
+    Returns when the chunk is done, the campaign is stopped from the UI or fails,
+    the job is lost to another worker, or `stop_event` is set (worker shutdown) -
+    in that case the job is released back to the queue so it can be resumed.
+    """
+    campaign = job.campaign
+    session_id = campaign.session_id
+    contact_ids = job.contact_ids or []
+    total_contacts = campaign.total_contacts
+    start_position = min(job.next_index, len(contact_ids))
+
+    progress = None
+    listener = None
+    # Paced parallel sender, only used in concurrent mode
+    concurrent_sender = None
+
+    def campaign_progress():
+        return round((progress.contacts_processed / total_contacts) * 100) if total_contacts > 0 else 0
+
+    def progress_snapshot():
+        if progress is None:
+            return {}
+        return {
+            'emails_sent': progress.emails_sent,
+            'emails_failed': campaign.emails_failed + progress.failed,
+            'contacts_processed': progress.contacts_processed,
+            'total_contacts': total_contacts,
+            'progress_percent': campaign_progress(),
+            'status': campaign.status
+        }
+
+    # Per-email events are sent to the WebSocket in throttled batches
+    broadcaster = ProgressBroadcaster(session_id, snapshot=progress_snapshot)
+    broadcast = broadcaster.send
+
+    try:
+        if campaign.status in ['completed', 'failed']:
+            # Stopped from the UI before a worker picked it up
+            job.finish('cancelled')
+            return
+
+        sender_config = get_sender_config(campaign.sender_key)
+        if not sender_config or not sender_config.get('api_key'):
+            raise ValueError(f'Sender "{campaign.sender_key}" not found or has no API key')
+
+        from_email = sender_config['email']
+        sender_name = sender_config['name']
+        from_header = f"{sender_name} <{from_email}>" if sender_name else from_email
+
+        # The sender's own pooled client; other campaigns in this process may use other keys
+        client = get_resend_client(campaign.sender_key, sender_config['api_key'])
+
+        started = campaign.mark_as_running()
+        # Pause/resume/stop and rate changes are pushed to this listener as they happen
+        listener = CampaignControlListener(session_id).start()
+        selection = campaign.contact_selection or {}
+        contact_filter = selection.get('contact_filter')
+        category_filter = selection.get('category_filter')
+
+        logger.info(
+            f"Campaign {session_id}: worker {worker_id} starting chunk {job.id} "
+            f"at contact {job.start_index + start_position + 1}/{total_contacts}",
+            extra={'category': 'campaign', 'campaign': session_id, 'job': job.id, 'worker': worker_id}
+        )
+
+        if started or job.attempts > 1:
+            # Broadcast campaign start
+            broadcast('campaign_start', {
+                'total_contacts': total_contacts,
+                'sender': from_header,
+                'subject': campaign.subject,
+                'session_id': session_id,
+                'resumed': not started,
+                'already_processed': campaign.current_contact_index,
+                'filter_info': f"{contact_filter} contacts" + (f" from category {category_filter}" if category_filter else "")
+            })
+
+        # Parse the template once for the whole chunk
+        compiled_template = compile_template(campaign.template)
+        contact_fields = [*CONTACT_SEND_FIELDS, *compiled_template.contact_fields]
+        checkpoint = CheckpointTracker(start_position)
+        # Counters and checkpoint are written every few emails instead of per email
+        progress = CampaignProgress(campaign, job)
+        # Fallback re-read of status, timeout and rate for control messages that can't reach this process
+        state_poll_seconds = getattr(settings, 'CAMPAIGN_STATE_POLL_MS', 5000) / 1000
+        state_polled_at = time.monotonic()
+        # Set when the job was requeued as stale and may now belong to another worker
+        lease_lost = False
+        # Chunks of the same campaign running side by side share its send rate
+        parallel_chunks = job.running_chunks()
+        parallel_checked_at = time.monotonic()
+        # Messages waiting to go out in the next batch: (position, contact, recipient_email, params)
+        pending_batch = []
+        if campaign.send_mode == 'concurrent':
+            concurrent_sender = ConcurrentCampaignSender(
+                client,
+                campaign.sender_key,
+                campaign.id,
+                campaign.send_rate or 1.0 / max(campaign.email_timeout, 1),
+                parallel_chunks,
+                campaign.concurrency
+            )
+
+        def count(position, sent=0, failed=0):
+            nonlocal lease_lost
+            if not progress.add(sent=sent, failed=failed, checkpoint=checkpoint.finish(position)):
+                lease_lost = True
+
+        def flush_progress():
+            nonlocal lease_lost
+            if not progress.flush():
+                lease_lost = True
+
+        def record_success(position, contact, recipient_email, resend_id):
+            count(position, sent=1)  # Update campaign progress
+
+            # Broadcast email success
+            broadcast('email_success', {
+                'contact_email': recipient_email,
+                'contact_name': contact.full_name,
+                'contact_id': contact.id,
+                'resend_id': resend_id,
+                'progress_percent': campaign_progress()
+            })
+
+            logger.info(f"Email sent to {recipient_email} with Resend ID {resend_id}", extra={
+                'category': 'email_send', 'campaign': session_id, 'status': 'sent', 'resend_id': resend_id
+            })
+
+        def record_failure(position, contact, recipient_email, error):
+            count(position, failed=1)  # Update campaign progress
+
+            broadcast('email_error', {
+                'contact_email': recipient_email,
+                'contact_name': contact.full_name,
+                'error': error,
+                'progress_percent': campaign_progress()
+            })
+            logger.warning(f"Email to {recipient_email} failed: {error}", extra={
+                'category': 'email_send', 'campaign': session_id, 'status': 'failed', 'error': error
+            })
+
+        def record_skip(position):
+            count(position)
+
+        def flush_batch():
+            """Send all pending messages in one Resend batch request"""
+            if not pending_batch:
+                return
+            logger.info(f"Sending a batch of {len(pending_batch)} emails in one request", extra={
+                'category': 'email_send', 'campaign': session_id, 'batch_size': len(pending_batch)
+            })
+            # A resumed chunk rebuilds the same batch from its checkpoint, so the key matches on retry
+            batch_key = f"campaign-{campaign.id}/job-{job.id}/{pending_batch[0][0]}-{pending_batch[-1][0]}"
+            results = send_batch(client, [params for _, _, _, params in pending_batch], idempotency_key=batch_key)
+            for (position, contact, recipient_email, _), (resend_id, error) in zip(pending_batch, results):
+                if resend_id:
+                    record_success(position, contact, recipient_email, resend_id)
+                else:
+                    record_failure(position, contact, recipient_email, error)
+            pending_batch.clear()
+
+            # Add delay between batches (respecting timeout setting)
+            wait(campaign.email_timeout * parallel_chunks)
+
+        def collect_concurrent_results(wait=False):
+            """Record results of concurrent sends that have finished"""
+            if not concurrent_sender:
+                return
+            results = concurrent_sender.drain() if wait else concurrent_sender.completed()
+            for (position, contact, recipient_email), resend_id, error in results:
+                if resend_id:
+                    record_success(position, contact, recipient_email, resend_id)
+                else:
+                    record_failure(position, contact, recipient_email, error)
+
+        def finish_in_flight():
+            flush_batch()
+            collect_concurrent_results(wait=True)
+            flush_progress()
+
+        def wait(seconds):
+            """
+            Sleep between sends while keeping the job's heartbeat fresh.
+
+            Returns early when a control message changes the campaign's status.
+            """
+            nonlocal lease_lost
+            status = campaign.status
+            deadline = time.monotonic() + seconds
+            while not (stop_event is not None and stop_event.is_set()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if listener.wait(min(remaining, 1)):
+                    listener.apply(campaign)
+                    if campaign.status != status:
+                        return
+                if not job.heartbeat():
+                    lease_lost = True
+                    return
+
+        for position, contact in iter_job_contacts(contact_ids, start_position, contact_fields):
+            if lease_lost:
+                break
+
+            if stop_event is not None and stop_event.is_set():
+                # Worker is shutting down - checkpoint and hand the job back
+                finish_in_flight()
+                if lease_lost:
+                    break
+                job.release()
+                logger.info(
+                    f"Campaign {session_id}: released chunk {job.id} at contact {job.start_index + checkpoint.position}/{total_contacts}",
+                    extra={'category': 'campaign', 'campaign': session_id, 'job': job.id, 'worker': worker_id}
+                )
+                return
+
+            if contact is None:
+                # Contact was deleted after the campaign was created
+                record_skip(position)
+                continue
+
+            recipient_email = (contact.email or '').strip()
+            if not recipient_email:
+                record_skip(position)
+                continue
+
+            # Calculate progress based on contacts processed so far (not including current)
+            progress_percent = campaign_progress()
+
+            # Validate email format
+            if not EMAIL_PATTERN.match(recipient_email):
+                record_skip(position)
+                broadcast('email_error', {
+                    'contact_email': recipient_email,
+                    'contact_name': contact.full_name,
+                    'error': 'Invalid email format',
+                    'progress_percent': progress_percent
+                })
+                continue
+
+            # Broadcast email start
+            broadcast('email_start', {
+                'contact_email': recipient_email,
+                'contact_name': contact.full_name,
+                'contact_id': contact.id,
+                'progress_percent': progress_percent
+            })
+
+            # Check if campaign has been paused or stopped
+            listener.apply(campaign)
+            if time.monotonic() - state_polled_at >= state_poll_seconds:
+                campaign.refresh_state()  # Get latest status from database
+                state_polled_at = time.monotonic()
+            if not job.heartbeat():
+                lease_lost = True
+                break
+
+            # Re-split the send rate when chunks on other workers start or finish
+            if time.monotonic() - parallel_checked_at >= CampaignJob.HEARTBEAT_INTERVAL:
+                parallel_chunks = job.running_chunks()
+                parallel_checked_at = time.monotonic()
+
+            # Pick up rate changes made from another process
+            if concurrent_sender and campaign.send_rate:
+                concurrent_sender.set_rate(campaign.send_rate, parallel_chunks)
+
+            if campaign.status == 'paused':
+                # Send what is already queued before waiting
+                finish_in_flight()
+                # Wait while paused until a resume/stop arrives (re-checking the database every 5 seconds)
+                logger.info(f"Campaign {session_id} paused, waiting", extra={'category': 'campaign', 'campaign': session_id})
+                while campaign.status == 'paused' and not lease_lost:
+                    if stop_event is not None and stop_event.is_set():
+                        job.release()
+                        return
+                    broadcast('campaign_paused', {
+                        'message': 'Campaign is paused',
+                        'contact_email': recipient_email,
+                        'emails_sent': progress.emails_sent,
+                        'progress_percent': progress_percent
+                    })
+                    wait(5)
+                    if campaign.status == 'paused':
+                        campaign.refresh_state()
+
+            if campaign.status in ['completed', 'failed']:
+                # Campaign has been stopped - queued batch messages are dropped unsent,
+                # requests already in flight are allowed to finish and be counted
+                collect_concurrent_results(wait=True)
+                flush_progress()
+                logger.info(f"Campaign {session_id} stopped with status: {campaign.status}", extra={
+                    'category': 'campaign', 'campaign': session_id, 'campaign_status': campaign.status
+                })
+                broadcast('campaign_stopped', {
+                    'message': f'Campaign stopped ({campaign.status})',
+                    'emails_sent': campaign.emails_sent,
+                    'total_contacts': total_contacts,
+                    'session_id': session_id
+                })
+                job.finish('cancelled')
+                return
+
+            email_html_content, email_text_content = compiled_template.render(contact)
+            params = build_email_params(
+                contact, from_header, recipient_email, campaign.subject,
+                email_html_content, email_text_content, campaign_id=campaign.id
+            )
+            options = {'idempotency_key': idempotency_key(campaign.id, contact.id)}
+
+            if campaign.send_mode == 'batch':
+                # Queue the message and send once the batch is full
+                pending_batch.append((position, contact, recipient_email, params))
+                if len(pending_batch) >= RESEND_BATCH_SIZE:
+                    flush_batch()
+                continue
+
+            if concurrent_sender:
+                # Hand the message to the paced sender and record whatever has finished
+                concurrent_sender.submit(params, (position, contact, recipient_email), options)
+                collect_concurrent_results()
+                continue
+
+            try:
+                # Send the email
+                response = client.send_email(params, options)
+
+                if response and 'id' in response:
+                    record_success(position, contact, recipient_email, response['id'])
+                else:
+                    record_failure(position, contact, recipient_email, 'No response ID from Resend')
+
+            except Exception as email_error:
+                record_failure(position, contact, recipient_email, str(email_error))
+
+            # Add delay between emails (respecting timeout setting, which can change while running)
+            wait(campaign.email_timeout * parallel_chunks)
+
+        if not lease_lost:
+            # Send whatever is left in the last partial batch
+            finish_in_flight()
+
+        if lease_lost:
+            # Another worker resumes the chunk from its checkpoint; don't send anything more
+            pending_batch.clear()
+            collect_concurrent_results(wait=True)
+            logger.warning(f"Campaign {session_id}: lost chunk {job.id} to another worker, stopping", extra={
+                'category': 'campaign', 'campaign': session_id, 'job': job.id, 'worker': worker_id
+            })
+            return
+
+        job.finish('done')
+
+        # The worker that finishes the last chunk completes the campaign
+        if not campaign.complete_if_finished():
+            logger.info(f"Campaign {session_id}: chunk {job.id} done", extra={
+                'category': 'campaign', 'campaign': session_id, 'job': job.id, 'worker': worker_id
+            })
+            return
+
+        announce_completion(campaign, broadcast)
+
+    except Exception as e:
+        logger.exception(f"Campaign {session_id} failed: {str(e)}", extra={
+            'category': 'campaign', 'campaign': session_id, 'job': job.id, 'worker': worker_id
+        })
+        campaign.mark_as_failed()
+        job.finish('failed', error=str(e))
+        broadcast('campaign_error', {
+            'error': str(e),
+            'session_id': session_id
+        })
+    finally:
+        if listener is not None:
+            listener.stop()
+        if concurrent_sender is not None:
+            concurrent_sender.close()
+        broadcaster.close()
+
+
+def run_worker(worker_id, stop_event, poll_interval=2, once=False):
+    """Claim and run queued campaign jobs until `stop_event` is set"""
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            job = CampaignJob.claim_next(worker_id)
+        except Exception as e:
+            # Database hiccup - keep the worker alive and try again on the next poll
+            logger.error(f"Worker {worker_id} could not claim a job: {str(e)}")
+            stop_event.wait(poll_interval)
+            continue
+        if job is None:
+            if once:
+                return
+            stop_event.wait(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} claimed job {job.id} for campaign {job.campaign.session_id}")
+        run_campaign_job(job, worker_id, stop_event)
+    close_old_connections()
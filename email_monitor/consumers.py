@@ -8,6 +8,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.conf import settings
 
+from .control import send_control_async
+
 
 class EmailProgressConsumer(AsyncWebsocketConsumer):
     """
@@ -55,16 +57,25 @@ class EmailProgressConsumer(AsyncWebsocketConsumer):
                 }))
             
             elif message_type == 'update_timeout':
-                # Update email sending timeout
-                new_timeout = data.get('timeout', 30)
-                await self.update_email_timeout(new_timeout)
+                # Update email sending timeout (and send rate for concurrent campaigns)
+                new_timeout, new_rate = await self.update_email_timeout(
+                    data.get('timeout', 30),
+                    data.get('rate')
+                )
+                
+                # Push the new values to the workers sending this campaign
+                control = {'email_timeout': new_timeout}
+                if new_rate is not None:
+                    control['send_rate'] = new_rate
+                await send_control_async(self.session_id, **control)
                 
                 # Broadcast timeout update to all clients in this session
                 await self.channel_layer.group_send(
                     self.room_group_name,
                     {
                         'type': 'timeout_updated',
-                        'timeout': new_timeout
+                        'timeout': new_timeout,
+                        'rate': new_rate
                     }
                 )
                 
@@ -85,6 +96,15 @@ class EmailProgressConsumer(AsyncWebsocketConsumer):
             'data': event['data']
         }))
     
+    async def progress_batch(self, event):
+        """Send a throttled batch of per-email events with a snapshot of the campaign counters"""
+        await self.send(text_data=json.dumps({
+            'message_type': 'progress_batch',
+            'snapshot': event['snapshot'],
+            'events': event['events'],
+            'dropped': event.get('dropped', 0)
+        }))
+    
     async def email_send_complete(self, event):
         """Send campaign completion notification"""
         await self.send(text_data=json.dumps(event))
@@ -98,19 +118,47 @@ class EmailProgressConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'timeout_updated',
             'timeout': event['timeout'],
+            'rate': event.get('rate'),
             'message': f'Email timeout updated to {event["timeout"]} seconds'
         }))
     
     @database_sync_to_async
-    def update_email_timeout(self, timeout):
-        """Update email sending timeout in settings (in-memory for this session)"""
-        # Store timeout in cache or session for this specific sending session
-        # For now, we'll just validate and return the timeout
+    def update_email_timeout(self, timeout, rate=None):
+        """
+        Apply a new timeout / send rate to the running campaign of this session.
+        
+        The values are stored on the EmailCampaign row and pushed straight into the
+        sender's token bucket when chunks run in this process; workers elsewhere get
+        them through the campaign's control group.
+        Without a rate, the campaign keeps its send rate. Returns the validated
+        (timeout, rate) pair, rate None when it wasn't changed.
+        """
+        from .models import EmailCampaign
+        from .sending import set_sender_rate
+        
         try:
             timeout = max(5, min(300, int(timeout)))  # Between 5 and 300 seconds
-            return timeout
         except (ValueError, TypeError):
-            return 30  # Default timeout
+            timeout = 30  # Default timeout
+        
+        try:
+            rate = float(rate) if rate else None
+        except (ValueError, TypeError):
+            rate = None
+        if rate is not None:
+            max_rate = getattr(settings, 'EMAIL_SEND_MAX_RATE', 10)
+            rate = max(0.1, min(max_rate, rate))
+        
+        campaign = EmailCampaign.objects.filter(session_id=self.session_id).first()
+        if campaign:
+            if rate is None:
+                EmailCampaign.objects.filter(pk=campaign.pk).update(email_timeout=timeout)
+            else:
+                EmailCampaign.objects.filter(pk=campaign.pk).update(email_timeout=timeout, send_rate=rate)
+                # Chunks on other workers keep their part of the rate
+                set_sender_rate(campaign.sender_key, campaign.id, rate, campaign.jobs.filter(status='running').count())
+        
+        return timeout, rate
 
 
 class EmailStatsConsumer(AsyncWebsocketConsumer):
@@ -0,0 +1,149 @@
+"""
+Pause/resume/stop and settings changes pushed to running campaigns.
+
+Commands are handed directly to listeners in the same process, and sent to a
+channel layer group per campaign for workers in other processes, so they take
+effect within milliseconds instead of on the next send. Other processes are only
+reachable through a shared channel layer (Redis); workers still re-read the
+campaign row every CAMPAIGN_STATE_POLL_MS as a fallback.
+"""
+
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+
+from .sending import run_in_send_loop
+
+logger = logging.getLogger(__name__)
+
+# Campaign fields a control message can change
+CONTROL_FIELDS = ('status', 'email_timeout', 'send_rate')
+
+# Listeners running in this process, by campaign session ID
+_local_listeners = {}
+_local_listeners_lock = threading.Lock()
+
+
+def control_group(session_id):
+    return f'campaign_control_{session_id}'
+
+
+def control_message(session_id, **fields):
+    """Build a control message carrying new values for some of CONTROL_FIELDS"""
+    return {
+        'type': 'campaign.control',
+        'session_id': session_id,
+        **{field: value for field, value in fields.items() if field in CONTROL_FIELDS}
+    }
+
+
+def _shared_channel_layer():
+    """The channel layer if it reaches other processes (the in-memory layer doesn't)"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or isinstance(channel_layer, InMemoryChannelLayer):
+        return None
+    return channel_layer
+
+
+def _deliver_local(session_id, message):
+    with _local_listeners_lock:
+        listeners = list(_local_listeners.get(session_id, ()))
+    for listener in listeners:
+        listener.receive(message)
+
+
+def send_control(session_id, **fields):
+    """Push new campaign status/timeout/rate to the workers running the campaign"""
+    message = control_message(session_id, **fields)
+    _deliver_local(session_id, message)
+    channel_layer = _shared_channel_layer()
+    if channel_layer:
+        try:
+            async_to_sync(channel_layer.group_send)(control_group(session_id), message)
+        except Exception as e:
+            # Workers still pick the change up from the database
+            logger.error(f"Failed to send control message to campaign {session_id}: {str(e)}")
+
+
+async def send_control_async(session_id, **fields):
+    """send_control() for async code such as WebSocket consumers"""
+    message = control_message(session_id, **fields)
+    _deliver_local(session_id, message)
+    channel_layer = _shared_channel_layer()
+    if channel_layer:
+        try:
+            await channel_layer.group_send(control_group(session_id), message)
+        except Exception as e:
+            logger.error(f"Failed to send control message to campaign {session_id}: {str(e)}")
+
+
+class CampaignControlListener:
+    """
+    Receives control messages for one campaign, from this process directly and
+    from other processes through the channel layer (on the process's send loop).
+
+    The sending thread calls apply() to copy received values onto its campaign
+    instance, and wait() to sleep until the next message or a timeout.
+    """
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.group = control_group(session_id)
+        self.changed = threading.Event()
+        self._updates = {}
+        self._lock = threading.Lock()
+        self._future = None
+
+    def start(self):
+        with _local_listeners_lock:
+            _local_listeners.setdefault(self.session_id, set()).add(self)
+        channel_layer = _shared_channel_layer()
+        if channel_layer is not None:
+            self._future = run_in_send_loop(self._listen(channel_layer))
+        return self
+
+    def stop(self):
+        with _local_listeners_lock:
+            listeners = _local_listeners.get(self.session_id)
+            if listeners is not None:
+                listeners.discard(self)
+                if not listeners:
+                    del _local_listeners[self.session_id]
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def receive(self, message):
+        """Record the values carried by a control message and wake the sending thread"""
+        with self._lock:
+            self._updates.update({field: message[field] for field in CONTROL_FIELDS if field in message})
+        self.changed.set()
+
+    async def _listen(self, channel_layer):
+        channel_name = await channel_layer.new_channel()
+        await channel_layer.group_add(self.group, channel_name)
+        try:
+            while True:
+                self.receive(await channel_layer.receive(channel_name))
+        except Exception as e:
+            logger.error(f"Control listener for {self.group} stopped: {str(e)}")
+        finally:
+            await channel_layer.group_discard(self.group, channel_name)
+
+    def apply(self, campaign):
+        """Copy received values onto the campaign, returns True if anything arrived"""
+        if not self.changed.is_set():
+            return False
+        with self._lock:
+            updates = self._updates
+            self._updates = {}
+            self.changed.clear()
+        for field, value in updates.items():
+            setattr(campaign, field, value)
+        return bool(updates)
+
+    def wait(self, timeout):
+        """Sleep until a control message arrives or `timeout` seconds pass"""
+        return self.changed.wait(timeout)
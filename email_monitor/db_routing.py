@@ -0,0 +1,93 @@
+"""
+Read replica routing for the analytics and export views.
+
+Views wrapped in @read_from_replica read from the READ_REPLICA_ALIAS database
+when it is configured, so exports, stats and contact list queries don't compete
+with webhook inserts and campaign writes on the primary. All writes, reads
+inside a transaction and every other view stay on the primary.
+
+Read-your-writes: an unsafe request (POST, DELETE, ...) sets a short-lived
+cookie, and requests that carry it read from the primary, so users see their
+own changes while the replica catches up. Stats payloads computed on the
+replica are cached like any other, so replica lag can reach the stats cache.
+"""
+
+import contextvars
+import functools
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+STICKY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Database the current view reads from, None for the primary
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    """The configured replica alias, or None when everything reads from the primary"""
+    alias = getattr(settings, 'READ_REPLICA_ALIAS', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def _alias_for(request):
+    if request.method not in SAFE_METHODS or request.COOKIES.get(STICKY_COOKIE):
+        return None
+    return replica_alias()
+
+
+def read_from_replica(view):
+    """Route the reads of a view to the replica, unless the user has just written"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _read_alias.set(_alias_for(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _read_alias.set(_alias_for(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads of @read_from_replica views go to the replica, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """Pin a user's reads to the primary for REPLICA_STICKY_SECONDS after they write"""
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and replica_alias():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, samesite='Lax')
+        return response
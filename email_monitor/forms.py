@@ -303,8 +303,8 @@ class CSVUploadForm(forms.Form):
         super().__init__(*args, **kwargs)
         # Get existing categories for the dropdown
         try:
-            from .models import Contact
-            existing_categories = Contact.objects.values_list('category_name', flat=True).distinct().exclude(category_name__isnull=True).exclude(category_name='')
+            from .models import Category
+            existing_categories = Category.objects.exclude(name='').order_by('name').values_list('name', flat=True)
             category_choices = [('', 'Select a category...')] + [(cat, cat) for cat in existing_categories]
             self.fields['existing_category'].widget.choices = category_choices
         except Exception as e:
@@ -0,0 +1,321 @@
+"""
+Webhook ingestion: from queued WebhookDelivery rows to stored EmailEvents.
+
+The webhook endpoint verifies a delivery and queues it. drain() then takes the
+oldest deliveries in batches, stores their events with one bulk insert and
+applies the downstream updates (contact statuses, rollups, stats cache) once
+per batch instead of once per event.
+
+Provider retries are stored once, by svix-id and event type: this process
+remembers the deliveries it queued recently, the queue drops a retry of a
+delivery still waiting, and the drainer skips deliveries already stored (the
+unique index on EmailEvent backs all of these up).
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ContactSenderStatus, EmailEvent, EmailEventRollup, WebhookDelivery, sender_address
+from .stats import invalidate_contact_stats
+
+logger = logging.getLogger(__name__)
+
+
+class RecentDeliveries:
+    """Bounded LRU of the (svix-id, event type) keys this process has queued"""
+
+    def __init__(self, size):
+        self.size = size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return True
+            return False
+
+    def add(self, key):
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.size:
+                self._keys.popitem(last=False)
+
+
+recent_deliveries = RecentDeliveries(settings.WEBHOOK_DEDUP_CACHE_SIZE)
+
+
+def queue_delivery(sender_key, delivery_id, payload):
+    """
+    Queue a verified delivery for the drainer, returns False for a retry of one
+    queued recently by this process.
+    """
+    key = (delivery_id, payload['type'])
+    if delivery_id and recent_deliveries.seen(key):
+        return False
+    # A retry of a delivery still in the queue is dropped by its unique index
+    WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(sender_key=sender_key, delivery_id=delivery_id, event_type=payload['type'], payload=payload)
+    ], ignore_conflicts=True)
+    if delivery_id:
+        recent_deliveries.add(key)
+    return True
+
+
+async def aqueue_delivery(sender_key, delivery_id, payload):
+    """queue_delivery() for async views"""
+    key = (delivery_id, payload['type'])
+    if delivery_id and recent_deliveries.seen(key):
+        return False
+    await WebhookDelivery.objects.abulk_create([
+        WebhookDelivery(sender_key=sender_key, delivery_id=delivery_id, event_type=payload['type'], payload=payload)
+    ], ignore_conflicts=True)
+    if delivery_id:
+        recent_deliveries.add(key)
+    return True
+
+
+def new_deliveries(deliveries):
+    """Deliveries whose event isn't stored yet, each (svix-id, event type) once"""
+    keys = {(delivery.delivery_id, delivery.event_type) for delivery in deliveries if delivery.delivery_id}
+    stored = set()
+    if keys:
+        stored = set(EmailEvent.objects.filter(
+            delivery_id__in={delivery_id for delivery_id, _ in keys}
+        ).values_list('delivery_id', 'event_type'))
+
+    new = []
+    for delivery in deliveries:
+        key = (delivery.delivery_id, delivery.event_type)
+        if delivery.delivery_id:
+            if key in stored:
+                continue
+            stored.add(key)
+        new.append(delivery)
+    return new
+
+
+def event_fields(payload, received_at=None):
+    """
+    EmailEvent fields of a Resend webhook payload, before linking sender,
+    contact and campaign. The event is dated when the webhook arrived
+    (received_at), not when the queue got to it.
+    """
+    event_type = payload.get('type')
+    data = payload.get('data', {})
+
+    # Extract event_id - Resend sends email_id in data object, not top-level id
+    event_id = data.get('email_id', '') or payload.get('id', '')
+
+    event_data = {
+        'event_id': event_id,
+        'event_type': event_type,
+        'created_at': received_at or timezone.now(),
+        'raw_data': payload,
+    }
+
+    if not event_type or not event_type.startswith('email.'):
+        return event_data
+
+    email_data = data
+    event_data.update({
+        'email_id': email_data.get('email_id'),
+        'from_email': email_data.get('from'),
+        'to_email': None,  # Will extract safely below
+        'subject': email_data.get('subject'),
+    })
+
+    # Safely extract to_email
+    to_field = email_data.get('to')
+    if to_field:
+        if isinstance(to_field, list) and len(to_field) > 0:
+            # Handle array format: ["email@example.com"] or [{"email": "email@example.com"}]
+            first_recipient = to_field[0]
+            if isinstance(first_recipient, dict):
+                event_data['to_email'] = first_recipient.get('email')
+            else:
+                event_data['to_email'] = str(first_recipient)
+        elif isinstance(to_field, str):
+            event_data['to_email'] = to_field
+
+    # Event-specific fields based on Resend webhook documentation
+    if event_type == 'email.clicked':
+        click_data = email_data.get('click', {})
+        if isinstance(click_data, dict):
+            event_data['click_url'] = click_data.get('link')  # Resend uses 'link' not 'url'
+
+    elif event_type == 'email.bounced':
+        bounce_data = email_data.get('bounce', {})
+        if isinstance(bounce_data, dict):
+            # Combine bounce type, subType and message for full context
+            bounce_parts = []
+            if bounce_data.get('type'):
+                bounce_parts.append(f"Type: {bounce_data['type']}")
+            if bounce_data.get('subType'):
+                bounce_parts.append(f"SubType: {bounce_data['subType']}")
+            if bounce_data.get('message'):
+                bounce_parts.append(f"Message: {bounce_data['message']}")
+            event_data['bounce_reason'] = ' | '.join(bounce_parts) if bounce_parts else None
+
+    elif event_type == 'email.complained':
+        # For complaints, Resend doesn't seem to provide specific feedback_type in their docs
+        # So we'll just mark it as a complaint
+        event_data['complaint_feedback_type'] = 'spam'
+
+    elif event_type == 'email.failed':
+        failed_data = email_data.get('failed', {})
+        if isinstance(failed_data, dict):
+            event_data['bounce_reason'] = failed_data.get('reason')  # Reuse bounce_reason field for failed reason
+
+    return event_data
+
+
+def build_events(deliveries):
+    """
+    Unsaved EmailEvents of deliveries, linked to their sender, contact and
+    campaign with one lookup per distinct address or tag in the batch.
+    """
+    senders, contacts, campaigns = {}, {}, {}
+
+    def resolve(cache, resolver, value):
+        if value not in cache:
+            cache[value] = resolver(value)
+        return cache[value]
+
+    events = []
+    for delivery in deliveries:
+        event_data = event_fields(delivery.payload, delivery.received_at)
+        if event_data['event_type'] and event_data['event_type'].startswith('email.'):
+            # Link the event to its sender and contact by normalized address, so reads
+            # join on integer keys instead of matching the free-form addresses
+            tags = delivery.payload.get('data', {}).get('tags')
+            event_data['sender_id'] = resolve(senders, EmailEvent.resolve_sender_id, sender_address(event_data['from_email']))
+            event_data['contact_id'] = resolve(contacts, EmailEvent.resolve_contact_id, sender_address(event_data['to_email']))
+            event_data['campaign_id'] = resolve(
+                campaigns, lambda key: EmailEvent.resolve_campaign_id(json.loads(key)), json.dumps(tags, sort_keys=True)
+            ) if tags else None
+        events.append(EmailEvent(received_at=delivery.received_at, delivery_id=delivery.delivery_id, **event_data))
+    return events
+
+
+def store_events(deliveries):
+    """Store the events of deliveries and apply the downstream updates, returns the new events"""
+    events = EmailEvent.objects.bulk_create(build_events(new_deliveries(deliveries)))
+
+    # Move the recipients' statuses forward
+    try:
+        with transaction.atomic():
+            ContactSenderStatus.record_events(events)
+    except Exception as e:
+        # The events are stored; rebuild_contact_status can catch the statuses up
+        logger.error(f"Failed to update contact statuses for {len(events)} events: {str(e)}")
+
+    # Count them in the hourly and daily rollups
+    try:
+        with transaction.atomic():
+            EmailEventRollup.record_events(events)
+    except Exception as e:
+        # rebuild_event_rollups can catch the rollups up
+        logger.error(f"Failed to update event rollups for {len(events)} events: {str(e)}")
+
+    # Once the new statuses are visible to the requests that recompute the stats
+    for from_email in {sender_address(event.from_email) for event in events if event.from_email}:
+        transaction.on_commit(lambda from_email=from_email: invalidate_contact_stats(from_email))
+    return events
+
+
+def drain(batch_size=None):
+    """
+    Store one batch of the oldest queued deliveries, returns how many were taken.
+
+    Deliveries are claimed with SKIP LOCKED, so drainers in several processes
+    take different batches. When a batch fails, its deliveries are stored one
+    by one so a bad payload only holds back itself.
+    """
+    batch_size = batch_size or settings.WEBHOOK_DRAIN_BATCH_SIZE
+    max_attempts = settings.WEBHOOK_MAX_ATTEMPTS
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        deliveries = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True).filter(
+                attempts__lt=max_attempts
+            ).order_by('id')[:batch_size]
+        )
+        if not deliveries:
+            return 0
+        try:
+            with transaction.atomic():
+                events = store_events(deliveries)
+                WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in deliveries]).delete()
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.info(f"Stored {len(events)} webhook events in {duration_ms}ms", extra={
+                'category': 'webhook_drain', 'deliveries': len(deliveries), 'events': len(events), 'duration_ms': duration_ms
+            })
+            return len(deliveries)
+        except Exception as e:
+            logger.error(f"Failed to store a batch of {len(deliveries)} webhook deliveries, retrying one by one: {str(e)}")
+
+        for delivery in deliveries:
+            try:
+                with transaction.atomic():
+                    store_events([delivery])
+                    delivery.delete()
+            except Exception as e:
+                delivery.attempts += 1
+                delivery.last_error = str(e)
+                delivery.save(update_fields=['attempts', 'last_error'])
+                logger.error(f"Failed to store webhook delivery {delivery.id} (attempt {delivery.attempts}): {str(e)}")
+    return len(deliveries)
+
+
+def drain_all(batch_size=None):
+    """Drain until the queue is empty, returns how many deliveries were taken"""
+    total = 0
+    while True:
+        taken = drain(batch_size)
+        if not taken:
+            return total
+        total += taken
+
+
+# In-process drainer for deployments without a drain_webhooks process
+_inline_lock = threading.Lock()
+_inline_thread = None
+_inline_pending = False
+
+
+def _run_inline_drainer():
+    global _inline_thread, _inline_pending
+    while True:
+        with _inline_lock:
+            # Deliveries queued while draining start another round
+            if not _inline_pending:
+                _inline_thread = None
+                return
+            _inline_pending = False
+        try:
+            drain_all()
+        except Exception as e:
+            logger.error(f"Inline webhook drain failed: {str(e)}")
+        finally:
+            close_old_connections()
+
+
+def schedule_inline_drain():
+    """Drain the queue from a background thread of this process, one thread at a time"""
+    global _inline_thread, _inline_pending
+    with _inline_lock:
+        _inline_pending = True
+        if _inline_thread is None:
+            _inline_thread = threading.Thread(target=_run_inline_drainer, name='webhook-drainer', daemon=True)
+            _inline_thread.start()
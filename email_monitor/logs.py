@@ -0,0 +1,178 @@
+"""
+Structured, non-blocking logging.
+
+Handlers put records on a bounded in-memory queue and a background thread
+writes them, so a webhook or send never waits on the log file or the console;
+when the queue is full, records are dropped and counted instead. The file is
+JSON lines, rotated by size (LOG_FILE_MAX_BYTES, LOG_FILE_BACKUP_COUNT).
+
+High-volume records carry a `category` (request, webhook, resend_api,
+email_send, ...) and are sampled per category with LOG_SAMPLE_RATES. Each
+kept record stores its `sample_rate`, so analyze_logs can scale counts back
+up. Warnings and errors are always kept. A `payload` is only written with
+LOG_PAYLOADS on.
+
+This module is loaded by LOGGING before the apps are ready: no model imports.
+"""
+
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.utils.deprecation import MiddlewareMixin
+
+# LogRecord attributes that are not structured fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'sampled'}
+
+
+class _QueuedHandler(QueueHandler):
+    """Hands records to a background thread that writes them with self.target"""
+
+    def __init__(self, target, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = target
+        self.dropped = 0
+        # Stopped (and the queue written out) by close(), which logging.shutdown() calls at exit
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Records are formatted on the writer thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Render what can't be formatted later from another thread: the message
+        # arguments and the traceback
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+            self.target.close()
+        super().close()
+
+
+class AsyncRotatingFileHandler(_QueuedHandler):
+    """Size-rotated log file written from a background thread"""
+
+    def __init__(self, filename, maxBytes=10 * 1024 * 1024, backupCount=5, queue_size=10000):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(
+            RotatingFileHandler(filename, maxBytes=maxBytes, backupCount=backupCount, encoding='utf-8', delay=True),
+            queue_size
+        )
+
+
+class AsyncStreamHandler(_QueuedHandler):
+    """Console (stderr) output written from a background thread"""
+
+    def __init__(self, queue_size=10000):
+        super().__init__(logging.StreamHandler(), queue_size)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of the records of each category; warnings, errors and uncategorized records always pass"""
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        # A record reaches every handler; decide once
+        sampled = getattr(record, 'sampled', None)
+        if sampled is not None:
+            return sampled
+
+        rate = 1.0
+        category = getattr(record, 'category', None)
+        if category and record.levelno < logging.WARNING:
+            rate = self.rates.get(category, 1.0)
+        record.sample_rate = rate
+        record.sampled = rate >= 1.0 or random.random() < rate
+        return record.sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and the record's structured fields"""
+
+    def __init__(self, include_payloads=False):
+        super().__init__()
+        self.include_payloads = include_payloads
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key in _RECORD_ATTRS or key.startswith('_'):
+                continue
+            if key == 'payload' and not self.include_payloads:
+                continue
+            entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+request_logger = logging.getLogger('email_monitor.requests')
+
+
+class RequestLogMiddleware(MiddlewareMixin):
+    """
+    One structured record per request with its route, status and duration.
+    Webhooks are logged under the 'webhook' category, API calls under 'api',
+    pages under 'request'; views add fields through request.log_extra.
+    """
+
+    def process_request(self, request):
+        request._log_started = time.perf_counter()
+        request.log_extra = {}
+
+    def process_response(self, request, response):
+        started = getattr(request, '_log_started', None)
+        if started is None:
+            return response
+
+        match = getattr(request, 'resolver_match', None)
+        route = f'/{match.route}' if match else request.path
+        if match and match.url_name == 'webhook_handler':
+            category = 'webhook'
+        elif '/api/' in route:
+            category = 'api'
+        else:
+            category = 'request'
+
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        request_logger.log(level, f"{request.method} {request.path} {response.status_code} {duration_ms}ms", extra={
+            'category': category,
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': duration_ms,
+            **getattr(request, 'log_extra', {}),
+        })
+        return response
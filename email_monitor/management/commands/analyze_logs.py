@@ -0,0 +1,143 @@
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def weighted_percentile(samples, fraction):
+    """Value below which `fraction` of the total weight of (value, weight) samples falls"""
+    total = sum(weight for _, weight in samples)
+    if not total:
+        return None
+    running = 0
+    for value, weight in samples:
+        running += weight
+        if running >= fraction * total:
+            return value
+    return samples[-1][0]
+
+
+def is_error(entry):
+    status = entry.get('status')
+    return (
+        entry.get('level') in ('ERROR', 'CRITICAL')
+        or (isinstance(status, int) and status >= 500)
+        or status == 'failed'
+    )
+
+
+class Command(BaseCommand):
+    help = 'Summarize request and API latencies and error rates from the structured (JSON lines) logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=settings.LOG_FILE,
+            help=f'Log file, read together with its rotated backups (default: {settings.LOG_FILE})'
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help='Only records from the last this many hours (default: everything in the files)'
+        )
+        parser.add_argument(
+            '--category',
+            help='Only this category (request, api, webhook, resend_api, email_send, campaign, webhook_drain)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Most frequent error messages to list (default: 10)'
+        )
+
+    def log_files(self, path):
+        """The rotated backups oldest first, then the current file"""
+        backups = []
+        index = 1
+        while os.path.exists(f'{path}.{index}'):
+            backups.append(f'{path}.{index}')
+            index += 1
+        return [*reversed(backups), *([path] if os.path.exists(path) else [])]
+
+    def handle(self, *args, **options):
+        files = self.log_files(options['file'])
+        if not files:
+            self.stdout.write(self.style.WARNING(f"No log file at {options['file']}"))
+            return
+
+        since = None
+        if options['hours']:
+            since = datetime.now(timezone.utc) - timedelta(hours=options['hours'])
+
+        # (category, route) -> records, estimated count, estimated errors/4xx, (duration, weight) samples
+        groups = defaultdict(lambda: {'records': 0, 'count': 0.0, 'errors': 0.0, 'client_errors': 0.0, 'durations': []})
+        error_messages = Counter()
+        lines = skipped = 0
+
+        for path in files:
+            with open(path, encoding='utf-8', errors='replace') as log_file:
+                for line in log_file:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Lines written before the logs were structured
+                        skipped += 1
+                        continue
+                    if not isinstance(entry, dict):
+                        skipped += 1
+                        continue
+                    if since and datetime.fromisoformat(entry.get('ts', '1970-01-01T00:00:00+00:00')) < since:
+                        continue
+                    category = entry.get('category') or 'other'
+                    if options['category'] and category != options['category']:
+                        continue
+
+                    # A kept record stands for 1/sample_rate records
+                    weight = 1 / (entry.get('sample_rate') or 1.0)
+                    group = groups[(category, entry.get('route') or '')]
+                    group['records'] += 1
+                    group['count'] += weight
+                    status = entry.get('status')
+                    if is_error(entry):
+                        group['errors'] += weight
+                        error_messages[f"{entry.get('logger')}: {str(entry.get('message'))[:100]}"] += 1
+                    elif isinstance(status, int) and 400 <= status < 500:
+                        group['client_errors'] += weight
+                    if isinstance(entry.get('duration_ms'), (int, float)):
+                        group['durations'].append((entry['duration_ms'], weight))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 {lines} log lines in {len(files)} files{f' since {since:%Y-%m-%d %H:%M} UTC' if since else ''}"
+            f"{f', {skipped} unstructured lines skipped' if skipped else ''}"
+        ))
+        if not groups:
+            self.stdout.write("No structured records")
+            return
+
+        self.stdout.write(
+            f"\n{'category':<14} {'route':<42} {'count':>9} {'err %':>7} {'4xx %':>7} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+        )
+        for (category, route), group in sorted(groups.items(), key=lambda item: -item[1]['count']):
+            durations = sorted(group['durations'])
+            percentiles = [weighted_percentile(durations, fraction) for fraction in (0.5, 0.95, 0.99)]
+            latency = ' '.join(
+                f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+                for value in [*percentiles, durations[-1][0] if durations else None]
+            )
+            self.stdout.write(
+                f"{category:<14} {route[:42]:<42} {group['count']:>9.0f} "
+                f"{group['errors'] / group['count'] * 100:>7.2f} {group['client_errors'] / group['count'] * 100:>7.2f} {latency}"
+            )
+
+        if error_messages:
+            self.stdout.write(self.style.WARNING("\n❌ Most frequent errors"))
+            for message, count in error_messages.most_common(options['top']):
+                self.stdout.write(f"   {count:>6}  {message}")
+
+        self.stdout.write("\nCounts are scaled up from sampled records (LOG_SAMPLE_RATES); errors are never sampled.")
@@ -0,0 +1,102 @@
+import datetime
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from email_monitor.archive import archive_path, month_start, next_month, write_archive
+from email_monitor.models import EmailEvent, EmailEventArchive, EmailEventRollup
+
+
+class Command(BaseCommand):
+    help = 'Move email events older than the retention period into monthly compressed archives, keeping their counts in the rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.EVENT_RETENTION_DAYS,
+            help=f'Keep the months with events from the last DAYS days (default: {settings.EVENT_RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Events read and rollup rows written per query (default: 2000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the months that would be archived without writing or deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        # Whole months only, so an archived month is one file and one range of rows
+        cutoff = month_start(timezone.now() - datetime.timedelta(days=options['days']))
+
+        oldest = EmailEvent.objects.filter(created_at__lt=cutoff).order_by('created_at').values_list(
+            'created_at', flat=True
+        ).first()
+        if oldest is None:
+            self.stdout.write(self.style.SUCCESS(f'✅ No email events before {cutoff:%Y-%m} to archive'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'🔄 Archiving email events before {cutoff:%Y-%m}...'))
+
+        archived = 0
+        month = month_start(oldest)
+        while month < cutoff:
+            archived += self.archive_month(month, options['batch_size'], options['dry_run'])
+            month = next_month(month)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run - {archived} events would be archived'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Archived {archived} email events'))
+
+    def archive_month(self, month, batch_size, dry_run):
+        """Move the events of one month to an archive file, returns how many"""
+        events = EmailEvent.objects.filter(created_at__gte=month, created_at__lt=next_month(month))
+
+        # Events stored from here on stay for the next run
+        last_id = events.aggregate(last_id=Max('id'))['last_id']
+        if last_id is None:
+            return 0
+        events = events.filter(id__lte=last_id)
+
+        previous_parts = EmailEventArchive.objects.filter(month=month.date()).count()
+        if dry_run:
+            count = events.count()
+            self.stdout.write(f'   🗄️ {month:%Y-%m}: {count} events')
+            return count
+
+        # The counts of a month are rebuilt from its events the first time it is archived;
+        # events stored for it later were counted by their webhooks
+        rollups = None
+        if not previous_parts:
+            rollups = EmailEventRollup.count_events(events, batch_size)
+
+        path = archive_path(month, previous_parts + 1)
+        count, size_bytes = write_archive(events, path, batch_size)
+
+        try:
+            with transaction.atomic():
+                if rollups is not None:
+                    EmailEventRollup.objects.filter(bucket__gte=month, bucket__lt=next_month(month)).delete()
+                    EmailEventRollup.objects.bulk_create(rollups, batch_size=batch_size)
+                deleted, _ = events.delete()
+                if deleted != count:
+                    raise RuntimeError(f'{count} events written to {path} but {deleted} deleted')
+                EmailEventArchive.objects.create(
+                    month=month.date(), path=path, event_count=count, size_bytes=size_bytes
+                )
+        except Exception:
+            os.remove(path)
+            raise
+
+        self.stdout.write(f'   🗄️ {month:%Y-%m}: {count} events -> {path} ({size_bytes // 1024} KB)')
+        return count
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+from email_monitor.models import Contact, EmailEvent, EmailSender
+from email_monitor.views import extract_email_from_sender_string
+
+
+class Command(BaseCommand):
+    help = 'Link stored email events to their sender and contact by normalized address'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Events read and updated per query (default: 2000)'
+        )
+        parser.add_argument(
+            '--relink',
+            action='store_true',
+            help='Resolve events that are already linked again (e.g. after changing sender addresses)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Few senders - resolve them all up front, active ones first as at ingest
+        sender_ids = {}
+        for sender_id, email in EmailSender.objects.order_by('-is_active', 'id').values_list('id', 'email'):
+            sender_ids.setdefault(email.lower(), sender_id)
+
+        events = EmailEvent.objects.filter(event_type__startswith='email.')
+        if not options['relink']:
+            events = events.filter(Q(sender__isnull=True) | Q(contact__isnull=True))
+
+        self.stdout.write(self.style.SUCCESS('🔗 Linking email events to senders and contacts...'))
+
+        last_id = 0
+        scanned = linked = 0
+        while True:
+            rows = list(events.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'from_email', 'to_email', 'sender_id', 'contact_id'
+            )[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            # Contacts of this chunk in one query, first contact per address as at ingest
+            addresses = {
+                (extract_email_from_sender_string(to_email) or '').upper()
+                for _, _, to_email, _, _ in rows
+            }
+            addresses.discard('')
+            contact_ids = {}
+            for contact_id, email in Contact.objects.annotate(email_upper=Upper('email')).filter(
+                email_upper__in=addresses
+            ).order_by('category_id', 'contact_id').values_list('id', 'email_upper'):
+                contact_ids.setdefault(email, contact_id)
+
+            updates = []
+            for event_id, from_email, to_email, sender_id, contact_id in rows:
+                new_sender_id = sender_ids.get((extract_email_from_sender_string(from_email) or '').lower())
+                new_contact_id = contact_ids.get((extract_email_from_sender_string(to_email) or '').upper())
+                if (new_sender_id, new_contact_id) != (sender_id, contact_id):
+                    updates.append(EmailEvent(id=event_id, sender_id=new_sender_id, contact_id=new_contact_id))
+
+            EmailEvent.objects.bulk_update(updates, ['sender', 'contact'], batch_size=batch_size)
+            linked += len(updates)
+            self.stdout.write(f'   📨 {scanned} events scanned, {linked} updated')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Linked {linked} of {scanned} events'))
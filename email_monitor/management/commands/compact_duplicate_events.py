@@ -0,0 +1,76 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+
+from email_monitor.models import EmailEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete duplicate email events left by webhook retries, keeping the first copy of each'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Event IDs checked per DELETE statement and transaction (default: 50000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the duplicates without deleting anything'
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help="Don't rebuild the contact statuses and event rollups after deleting duplicates"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        bounds = EmailEvent.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS('✅ No email events'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🔄 Looking for duplicate email events in IDs {bounds['first']}-{bounds['last']}..."
+        ))
+
+        # A retry repeats the event type, email, recipient and the payload's own
+        # timestamp; the copy with the lowest ID is kept, so every later copy has
+        # an earlier one to match and chunks can be compacted independently
+        earlier_copies = EmailEvent.objects.filter(
+            id__lt=OuterRef('id'),
+            event_type=OuterRef('event_type'),
+            email_id=OuterRef('email_id'),
+            to_email=OuterRef('to_email'),
+            raw_data__created_at=OuterRef('raw_data__created_at'),
+        )
+        duplicates = EmailEvent.objects.filter(email_id__isnull=False).filter(Exists(earlier_copies))
+
+        found = 0
+        start = bounds['first']
+        while start <= bounds['last']:
+            chunk = duplicates.filter(id__gte=start, id__lt=start + chunk_size)
+            if options['dry_run']:
+                count = chunk.count()
+            else:
+                with transaction.atomic():
+                    count = chunk.delete()[0]
+            if count:
+                self.stdout.write(f'   🧹 IDs {start}-{start + chunk_size - 1}: {count} duplicates')
+            found += count
+            start += chunk_size
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run - {found} duplicate events would be deleted'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Deleted {found} duplicate email events'))
+
+        # The statuses' counters and the rollups counted the duplicates too
+        if found and not options['no_rebuild']:
+            call_command('rebuild_contact_status', stdout=self.stdout)
+            call_command('rebuild_event_rollups', stdout=self.stdout)
@@ -0,0 +1,62 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from email_monitor.ingest import drain
+
+
+class Command(BaseCommand):
+    help = 'Store queued webhook deliveries as email events in batches and apply their status, rollup and stats updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.WEBHOOK_DRAIN_BATCH_SIZE,
+            help=f'Deliveries stored per bulk insert (default: {settings.WEBHOOK_DRAIN_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.WEBHOOK_DRAIN_POLL_INTERVAL,
+            help='Seconds between queue polls when there is nothing to do'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new deliveries'
+        )
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write("🛑 Stopping webhook drainer after the current batch")
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f"🚀 Draining webhook deliveries in batches of {options['batch_size']}")
+
+        stored = 0
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                taken = drain(options['batch_size'])
+            except Exception as e:
+                # Database hiccup - keep the drainer alive and try again on the next poll
+                self.stderr.write(f"❌ Webhook drain failed: {str(e)}")
+                stop_event.wait(options['poll_interval'])
+                continue
+            stored += taken
+            if not taken:
+                if options['once']:
+                    break
+                stop_event.wait(options['poll_interval'])
+
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f"✅ Webhook drainer stopped after {stored} deliveries"))
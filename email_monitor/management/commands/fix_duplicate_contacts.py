@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from email_monitor.models import Contact, EmailEvent
-from collections import defaultdict
+from email_monitor.models import Category, Contact, EmailEvent
+from email_monitor.stats import invalidate_contact_stats
+from collections import Counter, defaultdict
 
 
 class Command(BaseCommand):
@@ -80,15 +81,19 @@ class Command(BaseCommand):
                             # Events are already correctly linked by email address
                             pass
                     
-                    # Remove duplicate contacts
-                    for contact in contacts_to_remove:
-                        contact.delete()
-                        total_duplicates_removed += 1
+                    # Remove duplicate contacts and take them off their categories' counts
+                    Contact.objects.filter(id__in=[contact.id for contact in contacts_to_remove]).delete()
+                    for category_id, removed in Counter(contact.category_id for contact in contacts_to_remove).items():
+                        Category.adjust_count(category_id, -removed)
+                    total_duplicates_removed += len(contacts_to_remove)
                 
                 self.stdout.write(self.style.SUCCESS(f'   ✅ Merged successfully'))
             else:
                 self.stdout.write('   ℹ️  DRY RUN - No changes made')
         
+        if total_duplicates_removed:
+            invalidate_contact_stats()
+        
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(f'\n🔍 DRY RUN COMPLETE - Found {total_duplicates_removed} duplicates that would be removed')
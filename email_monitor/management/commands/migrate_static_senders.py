@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from email_monitor.models import EmailSender
+from email_monitor.senders import sender_registry
 
 
 class Command(BaseCommand):
@@ -60,6 +61,8 @@ class Command(BaseCommand):
         # If replace option is enabled, deactivate all existing senders
         if options['replace']:
             EmailSender.objects.all().update(is_active=False)
+            # update() sends no post_save, so reload the sender registry here
+            sender_registry.invalidate()
             self.stdout.write(
                 self.style.WARNING('Deactivated all existing senders')
             )
@@ -0,0 +1,82 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from email_monitor.archive import read_archive
+from email_monitor.models import ContactSenderStatus, EmailEvent, EmailEventArchive, sender_address
+from email_monitor.stats import invalidate_contact_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-sender contact status table from the stored email events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Events read and statuses written per query (default: 2000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Replay the events and report the counts without writing anything'
+        )
+
+    def with_archived_events(self, events, batch_size):
+        """Events of the archived months, oldest first, then the stored events"""
+        fields = ['to_email', 'from_email', 'event_type', 'created_at', 'email_id']
+        for archive in EmailEventArchive.objects.all():
+            if not os.path.exists(archive.path):
+                self.stdout.write(self.style.WARNING(
+                    f'   ⚠️ Archive {archive.path} is missing, skipping its {archive.event_count} events'
+                ))
+                continue
+            for row in read_archive(archive.path):
+                if row['event_type'] in ContactSenderStatus.STATUS_PRECEDENCE and row['to_email']:
+                    yield tuple(row[field] for field in fields)
+        yield from events.iterator(chunk_size=batch_size)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        self.stdout.write(self.style.SUCCESS('🔄 Replaying email events...'))
+
+        # Replay in the order the events happened, exactly as webhooks apply them
+        events = EmailEvent.objects.filter(
+            event_type__in=list(ContactSenderStatus.STATUS_PRECEDENCE),
+            to_email__isnull=False
+        ).exclude(to_email='').order_by('created_at', 'id').values_list(
+            'to_email', 'from_email', 'event_type', 'created_at', 'email_id'
+        )
+
+        statuses = {}
+        replayed = 0
+        for to_email, from_email, event_type, created_at, email_id in self.with_archived_events(events, batch_size):
+            key = (sender_address(to_email), sender_address(from_email))
+            status = statuses.get(key)
+            if status is None:
+                status = statuses[key] = ContactSenderStatus(
+                    email=key[0], sender_email=key[1], latest_event_type='',
+                    email_started_at=created_at, last_event_at=created_at
+                )
+            status.apply(event_type, created_at, email_id)
+            replayed += 1
+
+        self.stdout.write(f'   📨 Replayed {replayed} events into {len(statuses)} statuses')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run - nothing written'))
+            return
+
+        # Webhooks arriving meanwhile wait for the new rows, then apply on top of them
+        with transaction.atomic():
+            deleted, _ = ContactSenderStatus.objects.all().delete()
+            ContactSenderStatus.objects.bulk_create(statuses.values(), batch_size=batch_size)
+        # Only reaches a cache shared with the web processes; theirs expire on the TTL
+        invalidate_contact_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt contact statuses: {len(statuses)} written, {deleted} replaced'
+        ))
@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from email_monitor.campaign_runner import run_worker
+from email_monitor.models import CampaignJob
+
+
+class Command(BaseCommand):
+    help = 'Run workers that claim queued email campaigns and resume interrupted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of campaigns to send in parallel (default: 1)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'CAMPAIGN_WORKER_POLL_INTERVAL', 2),
+            help='Seconds between queue polls when there is nothing to do'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=getattr(settings, 'CAMPAIGN_JOB_STALE_SECONDS', 120),
+            help='Requeue running jobs that have not sent a heartbeat for this many seconds'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs'
+        )
+
+    def handle(self, *args, **options):
+        worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write("🛑 Stopping workers - running campaigns will be checkpointed and requeued")
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        # Jobs left running by a worker that died are resumed from their checkpoint
+        requeued = CampaignJob.requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"♻️ Requeued {requeued} interrupted campaign job(s)")
+
+        self.stdout.write(f"🚀 Starting {options['workers']} campaign worker(s) as {worker_prefix}")
+
+        threads = []
+        for number in range(options['workers']):
+            thread = threading.Thread(
+                target=run_worker,
+                args=(f"{worker_prefix}:{number}", stop_event, options['poll_interval'], options['once']),
+                name=f'campaign-worker-{number}',
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        # Keep requeueing jobs from workers on other hosts that stop reporting
+        while any(thread.is_alive() for thread in threads):
+            if stop_event.wait(options['poll_interval']):
+                break
+            requeued = CampaignJob.requeue_stale(options['stale_after'])
+            if requeued:
+                self.stdout.write(f"♻️ Requeued {requeued} stale campaign job(s)")
+
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(self.style.SUCCESS("✅ Campaign workers stopped"))
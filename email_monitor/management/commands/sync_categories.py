@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from email_monitor.models import Category, Contact
+
+
+class Command(BaseCommand):
+    help = 'Create missing categories from the contacts and recount the contacts of every category'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔄 Counting contacts per category...'))
+
+        rows = Contact.objects.order_by().values('category_id').annotate(
+            contact_count=Count('id'), last_contact_id=Max('contact_id'), category_name=Max('category_name')
+        )
+
+        created = updated = 0
+        with transaction.atomic():
+            existing = {category.id: category for category in Category.objects.select_for_update()}
+            names = {category.name for category in existing.values()}
+            counted = set()
+
+            for row in rows:
+                if not row['category_id'] or not row['category_id'].isdigit():
+                    self.stdout.write(self.style.WARNING(
+                        f"   ⚠️ Skipping {row['contact_count']} contacts with category ID '{row['category_id']}'"
+                    ))
+                    continue
+
+                category_id = int(row['category_id'])
+                counted.add(category_id)
+                category = existing.get(category_id)
+                if category is None:
+                    # Names are unique in the directory; keep clashing ones apart by their ID
+                    name = row['category_name'] or f'Category {category_id}'
+                    if name in names:
+                        name = f'{name} ({category_id})'
+                    names.add(name)
+                    Category.objects.create(
+                        id=category_id, name=name,
+                        contact_count=row['contact_count'], last_contact_id=row['last_contact_id'] or 0
+                    )
+                    created += 1
+                    continue
+
+                last_contact_id = max(category.last_contact_id, row['last_contact_id'] or 0)
+                if (category.contact_count, category.last_contact_id) != (row['contact_count'], last_contact_id):
+                    category.contact_count = row['contact_count']
+                    category.last_contact_id = last_contact_id
+                    category.save(update_fields=['contact_count', 'last_contact_id'])
+                    updated += 1
+
+            # Categories whose contacts were all deleted
+            emptied = Category.objects.exclude(id__in=counted).exclude(contact_count=0).update(contact_count=0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Categories synced: {created} created, {updated + emptied} recounted'
+        ))
@@ -1,8 +1,16 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Upper
 from django.utils import timezone
 import json
 
 
+# Resend tag carrying the EmailCampaign ID of every campaign email
+CAMPAIGN_TAG = 'campaign_id'
+
+
 class EmailEvent(models.Model):
     """Model to store email events from Resend webhooks"""
     
@@ -36,6 +44,15 @@ class EmailEvent(models.Model):
     to_email = models.EmailField(blank=True, null=True, help_text="Recipient email address")
     subject = models.TextField(blank=True, null=True, help_text="Email subject")
     
+    # Sender and contact resolved from from_email / to_email when the event is received
+    sender = models.ForeignKey('EmailSender', on_delete=models.SET_NULL, blank=True, null=True,
+                               related_name='events', db_index=False,  # Leads the composite index below
+                               help_text="Sender whose address matches from_email")
+    contact = models.ForeignKey('Contact', on_delete=models.SET_NULL, blank=True, null=True,
+                                related_name='email_events', help_text="Contact whose email matches to_email")
+    campaign = models.ForeignKey('EmailCampaign', on_delete=models.SET_NULL, blank=True, null=True,
+                                 related_name='events', help_text="Campaign named by the email's campaign_id tag")
+    
     # Event-specific data
     click_url = models.URLField(blank=True, null=True, help_text="URL clicked (for click events)")
     bounce_reason = models.TextField(blank=True, null=True, help_text="Reason for bounce")
@@ -43,19 +60,72 @@ class EmailEvent(models.Model):
     
     # Raw webhook data
     raw_data = models.JSONField(help_text="Complete webhook payload")
+    delivery_id = models.CharField(max_length=255, blank=True, null=True,
+                                   help_text="svix-id of the webhook delivery; retries of a delivery are stored once")
     
     class Meta:
         ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['delivery_id', 'event_type'],
+                condition=models.Q(delivery_id__isnull=False),
+                name='unique_event_delivery'
+            ),
+        ]
         indexes = [
             models.Index(fields=['event_type']),
             models.Index(fields=['to_email']),
             models.Index(fields=['created_at']),
             models.Index(fields=['email_id']),
+            models.Index(fields=['sender', 'to_email', 'created_at']),
+            models.Index(fields=['sender', 'created_at']),
         ]
     
     def __str__(self):
         return f"{self.event_type} - {self.to_email} ({self.created_at})"
     
+    @classmethod
+    def from_sender(cls, sender_email):
+        """Events sent from a sender address, by the sender key resolved when they were received"""
+        return cls.objects.filter(sender__in=EmailSender.objects.filter(email__iexact=sender_email).values('id'))
+    
+    @staticmethod
+    def resolve_sender_id(address):
+        """ID of the sender with this (normalized) address, case-insensitive, or None"""
+        if not address:
+            return None
+        from .senders import sender_registry
+        sender = sender_registry.by_email(address)
+        if sender:
+            return sender.id
+        # Events can still arrive for a deactivated sender
+        return EmailSender.objects.filter(email__iexact=address).order_by('-is_active', 'id').values_list('id', flat=True).first()
+    
+    @staticmethod
+    def resolve_contact_id(address):
+        """ID of the first contact with this email address, case-insensitive, or None"""
+        if not address:
+            return None
+        return Contact.objects.filter(email__iexact=address).order_by('category_id', 'contact_id').values_list('id', flat=True).first()
+    
+    @staticmethod
+    def resolve_campaign_id(tags):
+        """
+        ID of the campaign named by an email's campaign_id tag, or None.
+        Webhooks carry the tags as {"name": "value"}, the send API as [{"name": ..., "value": ...}].
+        """
+        if isinstance(tags, list):
+            tags = {tag.get('name'): tag.get('value') for tag in tags if isinstance(tag, dict)}
+        if not isinstance(tags, dict):
+            return None
+        try:
+            campaign_id = int(tags.get(CAMPAIGN_TAG) or 0)
+        except (TypeError, ValueError):
+            return None
+        if not campaign_id:
+            return None
+        return EmailCampaign.objects.filter(id=campaign_id).values_list('id', flat=True).first()
+    
     @property
     def is_positive_event(self):
         """Returns True for positive events (sent, delivered, opened, clicked)"""
@@ -138,13 +208,34 @@ class Contact(models.Model):
     # Store raw CSV data
     csv_data = models.JSONField(blank=True, null=True, help_text="Complete CSV row data")
     
+    # Search columns kept up to date by the database (see search.py): words and
+    # email for full-text prefix search, and the same text for trigram matching
+    search_vector = models.GeneratedField(
+        expression=SearchVector('first_name', 'last_name', 'email', 'company_name', config='simple'),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+    search_text = models.GeneratedField(
+        expression=Concat(
+            'first_name', Value(' '), 'last_name', Value(' '), 'email', Value(' '), 'company_name',
+            output_field=models.TextField()
+        ),
+        output_field=models.TextField(),
+        db_persist=True
+    )
+    
     class Meta:
         ordering = ['category_id', 'contact_id']
         indexes = [
             models.Index(fields=['category_id', 'contact_id']),
             models.Index(fields=['email']),
+            # Serves case-insensitive email lookups (email__iexact)
+            models.Index(Upper('email'), name='contact_email_upper_idx'),
             models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['category_name']),
+            GinIndex(fields=['search_vector'], name='contact_search_vector_idx'),
+            # Needs the pg_trgm extension, created before migrating (apps.py)
+            GinIndex(OpClass('search_text', name='gin_trgm_ops'), name='contact_search_trgm_idx'),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -167,6 +258,510 @@ class Contact(models.Model):
         """Returns the full name of the contact"""
         return f"{self.first_name} {self.last_name}".strip()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        contact = super().from_db(db, field_names, values)
+        # Deferred when not loaded; then save() can't tell a move between categories
+        contact._loaded_category_id = contact.__dict__.get('category_id')
+        return contact
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # A contact moved to another category takes its count along (queryset
+        # updates don't come through here; sync_categories catches those up)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category_id' not in update_fields:
+            return
+        loaded_category_id = getattr(self, '_loaded_category_id', None)
+        if loaded_category_id is not None and loaded_category_id != self.category_id:
+            Category.adjust_count(loaded_category_id, -1)
+            Category.adjust_count(self.category_id, 1)
+        self._loaded_category_id = self.category_id
+
+
+class Category(models.Model):
+    """
+    Directory of contact categories with their contact counts.
+
+    The ID is the number stored as a string in Contact.category_id. Counts and
+    contact IDs are kept up to date as contacts are added, imported and deleted,
+    so nothing has to scan Contact to list categories or hand out IDs;
+    sync_categories rebuilds the table from the contacts.
+    """
+
+    id = models.PositiveIntegerField(primary_key=True, help_text="Category number (Contact.category_id)")
+    name = models.CharField(max_length=200, unique=True, help_text="Human-readable category name")
+    contact_count = models.PositiveIntegerField(default=0)
+    last_contact_id = models.PositiveIntegerField(default=0, help_text="Highest contact_id handed out in this category")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "Categories"
+
+    def __str__(self):
+        return f"[{self.id}] {self.name} ({self.contact_count})"
+
+    @property
+    def category_id(self):
+        """The ID as stored on contacts"""
+        return str(self.id)
+
+    @classmethod
+    def for_name(cls, name):
+        """The category with this name, created with the next free ID if there is none"""
+        from django.db import IntegrityError, transaction
+        from django.db.models import Max
+
+        # A concurrent request may take the name or the ID first; then look again
+        for _ in range(5):
+            category = cls.objects.filter(name=name).first()
+            if category:
+                return category
+
+            # Contacts from before the directory existed keep their category's ID
+            legacy_id = Contact.objects.filter(category_name=name).values_list('category_id', flat=True).first()
+            if legacy_id and legacy_id.isdigit():
+                legacy = Contact.objects.filter(category_id=legacy_id).aggregate(
+                    contact_count=models.Count('id'), last_contact_id=Max('contact_id')
+                )
+                try:
+                    with transaction.atomic():
+                        return cls.objects.create(id=int(legacy_id), name=name, **legacy)
+                except IntegrityError:
+                    continue
+
+            next_id = (cls.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+            # Skip IDs still used by contacts of categories missing from the directory
+            while Contact.objects.filter(category_id=str(next_id)).exists():
+                next_id += 1
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(id=next_id, name=name)
+            except IntegrityError:
+                continue
+        raise RuntimeError(f'Could not allocate a category ID for "{name}"')
+
+    def allocate_contact_id(self):
+        """Hand out the next contact_id of this category"""
+        from django.db import transaction
+        from django.db.models import F
+
+        with transaction.atomic():
+            Category.objects.filter(pk=self.pk).update(last_contact_id=F('last_contact_id') + 1)
+            self.last_contact_id = Category.objects.filter(pk=self.pk).values_list('last_contact_id', flat=True).get()
+        return self.last_contact_id
+
+    @classmethod
+    def adjust_count(cls, category_id, delta):
+        """Add `delta` (negative for deletions) to a category's contact count"""
+        from django.db.models import F
+        from django.db.models.functions import Greatest
+
+        if not delta or not str(category_id).isdigit():
+            return
+        cls.objects.filter(pk=int(category_id)).update(contact_count=Greatest(F('contact_count') + delta, 0))
+
+
+def sender_address(from_email):
+    """Bare lowercase address from a sender or recipient string like 'Name <email@domain.com>'"""
+    if not from_email:
+        return ''
+    start, end = from_email.find('<'), from_email.find('>')
+    if 0 <= start < end:
+        from_email = from_email[start + 1:end]
+    return from_email.strip().lower()
+
+
+class ContactSenderStatus(models.Model):
+    """
+    Latest email status of a recipient address per sender, kept up to date from webhooks.
+
+    Replaces looking up the latest EmailEvent of every contact on every request.
+    Status only moves forward while events arrive for the same email (an open
+    that arrives after the click doesn't turn a click back into an open); a
+    later email from the same sender starts over from its own first event.
+    """
+
+    # Higher wins for events of the same email
+    STATUS_PRECEDENCE = {
+        'email.scheduled': 0,
+        'email.sent': 1,
+        'email.delivery_delayed': 2,
+        'email.delivered': 3,
+        'email.opened': 4,
+        'email.clicked': 5,
+        'email.failed': 6,
+        'email.bounced': 7,
+        'email.complained': 8,
+    }
+
+    # Events that happen when an email is sent, so a new email ID with one of
+    # these starts a new email; opens and clicks of older emails can come later
+    SEND_EVENTS = ('email.scheduled', 'email.sent', 'email.delivery_delayed', 'email.delivered', 'email.failed')
+
+    # Event type -> counter field
+    COUNTERS = {
+        'email.sent': 'sent_count',
+        'email.delivered': 'delivered_count',
+        'email.opened': 'opened_count',
+        'email.clicked': 'clicked_count',
+        'email.bounced': 'bounced_count',
+        'email.complained': 'complained_count',
+        'email.failed': 'failed_count',
+    }
+
+    email = models.EmailField(help_text="Lowercase recipient address (EmailEvent.to_email)")
+    sender_email = models.CharField(max_length=254, help_text="Lowercase sender address")
+
+    # Current status and the email it belongs to
+    latest_event_type = models.CharField(max_length=50, help_text="Status event type of the latest email")
+    latest_email_id = models.CharField(max_length=255, blank=True, null=True)
+    email_started_at = models.DateTimeField(help_text="First event of the latest email")
+
+    # Activity
+    last_event_at = models.DateTimeField()
+    last_sent = models.DateTimeField(blank=True, null=True)
+    last_opened = models.DateTimeField(blank=True, null=True)
+    last_clicked = models.DateTimeField(blank=True, null=True)
+
+    # Event counts
+    sent_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    opened_count = models.PositiveIntegerField(default=0)
+    clicked_count = models.PositiveIntegerField(default=0)
+    bounced_count = models.PositiveIntegerField(default=0)
+    complained_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Contact sender statuses"
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'sender_email'], name='unique_status_per_sender'),
+        ]
+        indexes = [
+            models.Index(fields=['sender_email', 'latest_event_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.email} from {self.sender_email}: {self.latest_event_type}"
+
+    def apply(self, event_type, created_at, email_id=None):
+        """Fold one email event into the status"""
+        if event_type not in self.STATUS_PRECEDENCE:
+            return
+
+        if not self.latest_event_type:
+            self.latest_event_type = event_type
+            self.latest_email_id = email_id
+            self.email_started_at = created_at
+        elif not email_id or not self.latest_email_id or email_id == self.latest_email_id:
+            # Same email: keep the furthest status
+            if self.STATUS_PRECEDENCE[event_type] > self.STATUS_PRECEDENCE[self.latest_event_type]:
+                self.latest_event_type = event_type
+            self.latest_email_id = self.latest_email_id or email_id
+            self.email_started_at = min(self.email_started_at, created_at)
+        elif event_type in self.SEND_EVENTS and created_at > self.email_started_at:
+            # A newer email from this sender
+            self.latest_event_type = event_type
+            self.latest_email_id = email_id
+            self.email_started_at = created_at
+
+        self.last_event_at = max(self.last_event_at, created_at) if self.last_event_at else created_at
+        if event_type == 'email.sent':
+            self.last_sent = max(self.last_sent, created_at) if self.last_sent else created_at
+        elif event_type == 'email.opened':
+            self.last_opened = max(self.last_opened, created_at) if self.last_opened else created_at
+        elif event_type == 'email.clicked':
+            self.last_clicked = max(self.last_clicked, created_at) if self.last_clicked else created_at
+
+        counter = self.COUNTERS.get(event_type)
+        if counter:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @classmethod
+    def record_events(cls, events):
+        """
+        Update the statuses of the events' recipients and senders, in the order
+        the events happened. Returns the number of statuses updated.
+        """
+        from django.db import transaction
+
+        grouped = {}
+        for event in sorted(events, key=lambda event: (event.created_at, event.id or 0)):
+            if event.event_type in cls.STATUS_PRECEDENCE and event.to_email:
+                grouped.setdefault((sender_address(event.to_email), sender_address(event.from_email)), []).append(event)
+
+        # Rows locked in key order, so concurrent drainers can't deadlock
+        with transaction.atomic():
+            for (email, sender_email), key_events in sorted(grouped.items()):
+                status, _ = cls.objects.select_for_update().get_or_create(
+                    email=email,
+                    sender_email=sender_email,
+                    defaults={'latest_event_type': '', 'email_started_at': key_events[0].created_at,
+                              'last_event_at': key_events[0].created_at}
+                )
+                for event in key_events:
+                    status.apply(event.event_type, event.created_at, event.email_id)
+                status.save()
+        return len(grouped)
+
+    @classmethod
+    def for_sender(cls, sender_email):
+        """Statuses of one sender, by sender address as returned by get_sender_email()"""
+        return cls.objects.filter(sender_email=sender_address(sender_email))
+
+    @classmethod
+    def annotate_contacts(cls, contacts, sender_email, **fields):
+        """
+        Annotate contacts with status fields of one sender, e.g.
+        annotate_contacts(contacts, sender_email, latest_event_type='latest_event_type').
+
+        Each annotation is a lookup on the (email, sender_email) unique index,
+        by the contact's lowercased address. Contacts the sender never emailed get None.
+        """
+        from django.db.models import OuterRef, Subquery
+        from django.db.models.functions import Lower
+
+        statuses = cls.for_sender(sender_email).filter(email=Lower(OuterRef('email')))
+        return contacts.annotate(**{
+            name: Subquery(statuses.values(field)[:1])
+            for name, field in fields.items()
+        })
+
+
+class EmailEventRollup(models.Model):
+    """
+    Email event counts per sender, contact category, campaign and event type over
+    one hour or one day, kept up to date from webhooks.
+
+    Time series read a few hundred of these rows instead of scanning EmailEvent;
+    rebuild_event_rollups recreates them from the stored events.
+    """
+
+    GRANULARITIES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITIES)
+    bucket = models.DateTimeField(help_text="Start of the hour or day")
+    sender_email = models.CharField(max_length=254, help_text="Lowercase sender address")
+    category_id = models.CharField(max_length=50, blank=True, default='',
+                                   help_text="Category of the recipient contact, empty when it isn't a contact")
+    campaign_id = models.BigIntegerField(default=0, help_text="EmailCampaign ID, 0 for emails outside a campaign")
+    event_type = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'sender_email', 'category_id', 'campaign_id', 'event_type'],
+                name='unique_event_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['sender_email', 'granularity', 'bucket']),
+            models.Index(fields=['campaign_id', 'granularity']),
+        ]
+
+    def __str__(self):
+        return f"{self.sender_email} {self.event_type} {self.granularity} {self.bucket}: {self.count}"
+
+    @staticmethod
+    def bucket_start(created_at, granularity):
+        """Start of the hour or day an event falls in"""
+        if granularity == 'day':
+            return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        return created_at.replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def keys_for(cls, event_type, created_at, sender_email, category_id=None, campaign_id=None):
+        """Unique keys of the hour and day rows an event counts in"""
+        dimensions = {
+            'sender_email': sender_address(sender_email),
+            'category_id': category_id or '',
+            'campaign_id': campaign_id or 0,
+            'event_type': event_type,
+        }
+        return [
+            {'granularity': granularity, 'bucket': cls.bucket_start(created_at, granularity), **dimensions}
+            for granularity, _ in cls.GRANULARITIES
+        ]
+
+    @classmethod
+    def count_events(cls, events, batch_size=2000):
+        """Rollup rows of a queryset of events, as unsaved EmailEventRollups"""
+        from collections import Counter
+
+        events = events.filter(event_type__startswith='email.', from_email__isnull=False).exclude(
+            from_email=''
+        ).order_by().values_list('event_type', 'created_at', 'from_email', 'contact__category_id', 'campaign_id')
+
+        counts = Counter()
+        for event_type, created_at, from_email, category_id, campaign_id in events.iterator(chunk_size=batch_size):
+            for key in cls.keys_for(event_type, created_at, from_email, category_id, campaign_id):
+                counts[tuple(key.items())] += 1
+        return [cls(count=count, **dict(key)) for key, count in counts.items()]
+
+    @classmethod
+    def record_events(cls, events):
+        """Count stored email events in their hour and day rows, one write per row"""
+        from collections import Counter
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+
+        events = [
+            event for event in events
+            if event.event_type and event.event_type.startswith('email.') and event.from_email
+        ]
+        contact_ids = {event.contact_id for event in events if event.contact_id}
+        category_ids = dict(Contact.objects.filter(id__in=contact_ids).values_list('id', 'category_id')) if contact_ids else {}
+
+        counts = Counter()
+        for event in events:
+            for key in cls.keys_for(event.event_type, event.created_at, event.from_email,
+                                    category_ids.get(event.contact_id), event.campaign_id):
+                counts[tuple(key.items())] += 1
+
+        for key, count in sorted(counts.items()):
+            key = dict(key)
+            if cls.objects.filter(**key).update(count=F('count') + count):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=count, **key)
+            except IntegrityError:
+                # Created by a concurrent drainer since the update
+                cls.objects.filter(**key).update(count=F('count') + count)
+
+    @classmethod
+    def series(cls, sender_email, granularity, start, end=None, category_id=None, campaign_id=None):
+        """
+        Event counts per bucket from `start` on, as
+        [{'bucket': datetime, 'email.sent': n, 'email.opened': n, ...}, ...] ordered by time
+        """
+        return cls._fold_series(cls._series_rows(sender_email, granularity, start, end, category_id, campaign_id))
+
+    @classmethod
+    async def aseries(cls, sender_email, granularity, start, end=None, category_id=None, campaign_id=None):
+        """series() for async views"""
+        rows = cls._series_rows(sender_email, granularity, start, end, category_id, campaign_id)
+        return cls._fold_series([row async for row in rows])
+
+    @classmethod
+    def _series_rows(cls, sender_email, granularity, start, end, category_id, campaign_id):
+        from django.db.models import Sum
+
+        rows = cls.objects.filter(
+            sender_email=sender_address(sender_email), granularity=granularity,
+            bucket__gte=cls.bucket_start(start, granularity)
+        )
+        if end:
+            rows = rows.filter(bucket__lt=end)
+        if category_id:
+            rows = rows.filter(category_id=category_id)
+        if campaign_id:
+            rows = rows.filter(campaign_id=campaign_id)
+        return rows.values('bucket', 'event_type').annotate(total=Sum('count')).order_by('bucket')
+
+    @staticmethod
+    def _fold_series(rows):
+        buckets = {}
+        for row in rows:
+            buckets.setdefault(row['bucket'], {'bucket': row['bucket']})[row['event_type']] = row['total']
+        return list(buckets.values())
+
+    @classmethod
+    def campaign_totals(cls, campaign_ids):
+        """Event counts of campaigns, as {campaign_id: {'email.sent': n, ...}}"""
+        from django.db.models import Sum
+
+        totals = {campaign_id: {} for campaign_id in campaign_ids}
+        rows = cls.objects.filter(campaign_id__in=list(totals), granularity='day').values(
+            'campaign_id', 'event_type'
+        ).annotate(total=Sum('count'))
+        for row in rows:
+            totals[row['campaign_id']][row['event_type']] = row['total']
+        return totals
+
+
+class EmailEventArchive(models.Model):
+    """
+    One month of email events moved out of EmailEvent into a compressed file by
+    archive_email_events.
+
+    EmailEvent only keeps the recent (hot) months; the counts of archived months
+    live on in EmailEventRollup, the raw events in the archive files.
+    """
+
+    month = models.DateField(help_text="First day of the archived month")
+    path = models.CharField(max_length=500, help_text="gzipped JSON lines file with the events")
+    event_count = models.PositiveIntegerField(default=0)
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['month', 'id']
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.event_count} events ({self.path})"
+
+    @classmethod
+    def hot_start(cls):
+        """Start of the first month still kept in EmailEvent, or None when nothing was archived"""
+        import datetime
+        from django.conf import settings
+
+        month = cls.objects.aggregate(latest=models.Max('month'))['latest']
+        if month is None:
+            return None
+        start = datetime.datetime.combine((month + datetime.timedelta(days=32)).replace(day=1), datetime.time.min)
+        return timezone.make_aware(start, datetime.timezone.utc) if settings.USE_TZ else start
+
+
+class WebhookDelivery(models.Model):
+    """
+    Verified webhook payload waiting to be stored as an EmailEvent.
+
+    The webhook endpoint only verifies and inserts one of these, so it answers
+    within the provider's delivery window however many events arrive at once;
+    drain_webhooks (or the web process, see WEBHOOK_INLINE_DRAIN) stores them in
+    batches and applies the status, rollup and cache updates.
+    """
+
+    sender_key = models.CharField(max_length=50, help_text="Sender whose webhook endpoint received it")
+    delivery_id = models.CharField(max_length=255, blank=True, null=True, help_text="svix-id header")
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(help_text="Complete webhook payload")
+    received_at = models.DateTimeField(default=timezone.now)
+
+    # Deliveries that fail to store are retried on later drains, up to WEBHOOK_MAX_ATTEMPTS
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "Webhook deliveries"
+        constraints = [
+            # A retry of a delivery that is still queued is dropped on insert
+            models.UniqueConstraint(
+                fields=['delivery_id', 'event_type'],
+                condition=models.Q(delivery_id__isnull=False),
+                name='unique_queued_delivery'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['attempts', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.sender_key}: {self.event_type} ({self.received_at})"
+
 
 class EmailTemplate(models.Model):
     """Model to store email templates for each sender"""
@@ -274,11 +869,25 @@ class EmailSender(models.Model):
     def __str__(self):
         return f"{self.name} <{self.email}>"
     
-    def increment_usage(self):
+    def increment_usage(self, count=1):
         """Increment usage counter and update last used timestamp"""
-        self.emails_sent += 1
-        self.last_used = timezone.now()
-        self.save(update_fields=['emails_sent', 'last_used'])
+        from django.db.models import F
+        
+        now = timezone.now()
+        type(self).objects.filter(id=self.id).update(emails_sent=F('emails_sent') + count, last_used=now)
+        self.emails_sent += count
+        self.last_used = now
+    
+    def as_config(self):
+        """Sender configuration in the format expected by the email sending code"""
+        return {
+            'email': self.email,
+            'name': self.name,
+            'api_key': self.api_key,
+            'domain': self.domain,
+            'webhook_url': self.webhook_url,
+            'webhook_secret': self.webhook_secret
+        }
     
     @classmethod
     def get_active_senders(cls):
@@ -288,33 +897,18 @@ class EmailSender(models.Model):
     @classmethod
     def get_sender_config(cls, sender_key):
         """Get sender configuration in the format expected by the email sending code"""
-        try:
-            sender = cls.objects.get(key=sender_key, is_active=True)
-            return {
-                'email': sender.email,
-                'name': sender.name,
-                'api_key': sender.api_key,
-                'domain': sender.domain,
-                'webhook_url': sender.webhook_url,
-                'webhook_secret': sender.webhook_secret
-            }
-        except cls.DoesNotExist:
+        from .senders import sender_registry
+        sender = sender_registry.get(sender_key)
+        if not sender:
             return None
+        return sender.as_config()
     
     @classmethod
     def get_all_sender_configs(cls):
         """Get all active sender configurations in the format expected by the email sending code"""
-        configs = {}
-        for sender in cls.get_active_senders():
-            configs[sender.key] = {
-                'email': sender.email,
-                'name': sender.name,
-                'api_key': sender.api_key,
-                'domain': sender.domain,
-                'webhook_url': sender.webhook_url,
-                'webhook_secret': sender.webhook_secret
-            }
-        return configs
+        from .senders import sender_registry
+        senders = sorted(sender_registry.active(), key=lambda sender: sender.name)
+        return {sender.key: sender.as_config() for sender in senders}
 
 
 class EmailCampaign(models.Model):
@@ -328,6 +922,12 @@ class EmailCampaign(models.Model):
         ('paused', 'Paused'),
     ]
     
+    SEND_MODES = [
+        ('single', 'One request per email'),
+        ('batch', 'Resend batch endpoint'),
+        ('concurrent', 'Concurrent paced requests'),
+    ]
+    
     # Campaign identification
     session_id = models.CharField(max_length=100, unique=True, help_text="WebSocket session ID")
     campaign_name = models.CharField(max_length=200, blank=True, null=True, help_text="Optional campaign name")
@@ -351,6 +951,13 @@ class EmailCampaign(models.Model):
     
     # Configuration
     email_timeout = models.IntegerField(default=30, help_text="Timeout between emails in seconds")
+    send_mode = models.CharField(max_length=20, choices=SEND_MODES, default='single',
+                                 help_text="Send one email per request, up to 100 per batch request, or concurrently")
+    send_rate = models.FloatField(null=True, blank=True,
+                                  help_text="Sends per second for concurrent mode (token bucket rate)")
+    concurrency = models.PositiveIntegerField(default=1, help_text="Requests in flight for concurrent mode")
+    jobs_enqueued = models.BooleanField(default=True,
+                                        help_text="False while the contacts are still being split into jobs")
     
     # Contact selection (JSON field to store the query parameters)
     contact_selection = models.JSONField(default=dict, help_text="Contact filter and selection criteria")
@@ -386,33 +993,248 @@ class EmailCampaign(models.Model):
         """Get the currently active campaign if any"""
         return cls.objects.filter(status__in=['preparing', 'running', 'paused']).first()
     
+    # Status changes and counters only write their own columns, so workers on
+    # several nodes can update the same campaign without overwriting each other
+    
     def mark_as_running(self):
-        """Mark campaign as running"""
-        self.status = 'running'
-        if not self.started_at:
-            self.started_at = timezone.now()
-        self.save()
+        """Mark a preparing campaign as running, returns True if this call started it"""
+        now = timezone.now()
+        started = type(self).objects.filter(id=self.id, status='preparing').update(
+            status='running', started_at=now
+        ) == 1
+        if started:
+            self.status = 'running'
+            self.started_at = now
+        return started
     
     def mark_as_completed(self):
         """Mark campaign as completed"""
         self.status = 'completed'
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'completed_at'])
     
     def mark_as_failed(self):
         """Mark campaign as failed"""
         self.status = 'failed'
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'completed_at'])
     
     def increment_sent(self):
         """Increment sent email count"""
-        self.emails_sent += 1
-        self.current_contact_index += 1
-        self.save()
+        self._increment(emails_sent=1, current_contact_index=1)
     
     def increment_failed(self):
         """Increment failed email count"""
-        self.emails_failed += 1
-        self.current_contact_index += 1
-        self.save()
+        self._increment(emails_failed=1, current_contact_index=1)
+    
+    def increment_skipped(self):
+        """Count a contact that was skipped without sending (deleted or missing email)"""
+        self._increment(current_contact_index=1)
+    
+    def _increment(self, **amounts):
+        from django.db.models import F
+        
+        type(self).objects.filter(id=self.id).update(
+            **{field: F(field) + amount for field, amount in amounts.items()}
+        )
+        for field, amount in amounts.items():
+            setattr(self, field, getattr(self, field) + amount)
+    
+    def refresh_state(self):
+        """Reload the fields that change while a campaign runs, without the template"""
+        fields = ['status', 'email_timeout', 'send_rate', 'emails_sent', 'emails_failed', 'current_contact_index']
+        row = type(self).objects.filter(id=self.id).values(*fields).first()
+        if row:
+            for field, value in row.items():
+                setattr(self, field, value)
+    
+    def finish_enqueueing(self, total_contacts):
+        """Record that all of the campaign's jobs exist, with the final contact count"""
+        type(self).objects.filter(id=self.id).update(jobs_enqueued=True, total_contacts=total_contacts)
+        self.jobs_enqueued = True
+        self.total_contacts = total_contacts
+    
+    def complete_if_finished(self):
+        """
+        Mark the campaign completed once none of its jobs are left to run.
+        
+        Returns True only for the caller that completed it, so the completion
+        is announced once even when the last chunks finish on different nodes.
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            campaign = type(self).objects.select_for_update().get(id=self.id)
+            if campaign.status not in ['running', 'paused'] or not campaign.jobs_enqueued:
+                return False
+            if campaign.jobs.filter(status__in=['queued', 'running']).exists():
+                return False
+            campaign.mark_as_completed()
+        self.refresh_from_db()
+        return True
+
+
+class CampaignJob(models.Model):
+    """
+    Durable chunk of work for sending a campaign.
+
+    A campaign's contacts are split into chunks when it is created, one job per
+    chunk. Workers on any node claim jobs with SELECT ... FOR UPDATE SKIP LOCKED,
+    keep the claim alive with heartbeats and checkpoint progress in `next_index`,
+    so a chunk is only ever sent by its current owner and resumes after a restart.
+    """
+    
+    JOB_STATUS = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    # Seconds between heartbeat writes while a job is running
+    HEARTBEAT_INTERVAL = 10
+    
+    campaign = models.ForeignKey(EmailCampaign, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=20, choices=JOB_STATUS, default='queued')
+    contact_ids = models.JSONField(default=list, help_text="Ordered contact IDs to send to")
+    start_index = models.IntegerField(default=0, help_text="Position of the chunk's first contact in the campaign")
+    next_index = models.IntegerField(default=0, help_text="Position in contact_ids to resume from")
+    
+    # Claim information
+    worker_id = models.CharField(max_length=200, blank=True, null=True, help_text="Worker that claimed the job")
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['created_at', 'start_index']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['campaign', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.id} for {self.campaign.session_id} - {self.status}"
+    
+    @classmethod
+    def create_chunks(cls, campaign, contact_ids, chunk_size=None, start_index=0):
+        """
+        Split contacts into queued jobs of `chunk_size` contacts.
+        
+        `start_index` is the campaign position of the first contact, for
+        contacts that are added to the campaign a page at a time.
+        """
+        from django.conf import settings
+        
+        chunk_size = chunk_size or getattr(settings, 'CAMPAIGN_CHUNK_SIZE', 1000)
+        return cls.objects.bulk_create([
+            cls(campaign=campaign, contact_ids=contact_ids[start:start + chunk_size], start_index=start_index + start)
+            for start in range(0, len(contact_ids), chunk_size)
+        ] or [cls(campaign=campaign, contact_ids=[], start_index=start_index)])
+    
+    @classmethod
+    def claim_next(cls, worker_id, campaign_id=None):
+        """
+        Claim the oldest queued job, skipping jobs locked by other workers.
+        
+        At most CAMPAIGN_MAX_PARALLEL_CHUNKS jobs of one campaign run at a time;
+        the campaign row is locked while counting so two nodes can't both take
+        the last slot.
+        """
+        from django.conf import settings
+        from django.db import transaction
+        
+        max_parallel = getattr(settings, 'CAMPAIGN_MAX_PARALLEL_CHUNKS', 2)
+        with transaction.atomic():
+            jobs = cls.objects.select_for_update(skip_locked=True).filter(status='queued')
+            if campaign_id is not None:
+                jobs = jobs.filter(campaign_id=campaign_id)
+            for job in jobs.order_by('created_at', 'start_index')[:20]:
+                EmailCampaign.objects.select_for_update().filter(id=job.campaign_id).first()
+                if cls.objects.filter(campaign_id=job.campaign_id, status='running').count() >= max_parallel:
+                    continue
+                now = timezone.now()
+                job.status = 'running'
+                job.worker_id = worker_id
+                job.attempts += 1
+                job.claimed_at = now
+                job.heartbeat_at = now
+                job.save(update_fields=['status', 'worker_id', 'attempts', 'claimed_at', 'heartbeat_at'])
+                break
+            else:
+                return None
+        return cls.objects.select_related('campaign').get(id=job.id)
+    
+    @classmethod
+    def requeue_stale(cls, stale_after_seconds):
+        """Put running jobs whose worker stopped sending heartbeats back in the queue"""
+        from datetime import timedelta
+        
+        cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+        return cls.objects.filter(status='running', heartbeat_at__lt=cutoff).update(
+            status='queued', worker_id=None
+        )
+    
+    @property
+    def is_alive(self):
+        """Whether a worker has reported on this job recently"""
+        from django.conf import settings
+        
+        if self.status == 'queued':
+            return True
+        if self.status != 'running' or not self.heartbeat_at:
+            return False
+        stale_after = getattr(settings, 'CAMPAIGN_JOB_STALE_SECONDS', 120)
+        return (timezone.now() - self.heartbeat_at).total_seconds() < stale_after
+    
+    def heartbeat(self):
+        """
+        Record that the worker is still alive (throttled to HEARTBEAT_INTERVAL).
+        
+        Returns False if the job was requeued and is no longer owned by this worker.
+        """
+        now = timezone.now()
+        if self.heartbeat_at and (now - self.heartbeat_at).total_seconds() < self.HEARTBEAT_INTERVAL:
+            return True
+        self.heartbeat_at = now
+        return type(self).objects.filter(
+            id=self.id, status='running', worker_id=self.worker_id
+        ).update(heartbeat_at=now) == 1
+    
+    def checkpoint(self, position):
+        """
+        Record the position to resume from, which also counts as a heartbeat.
+        
+        Returns False if the job is no longer owned by this worker.
+        """
+        now = timezone.now()
+        owned = type(self).objects.filter(
+            id=self.id, status='running', worker_id=self.worker_id
+        ).update(next_index=position, heartbeat_at=now) == 1
+        if owned:
+            self.next_index = position
+            self.heartbeat_at = now
+        return owned
+    
+    def running_chunks(self):
+        """Number of this campaign's jobs currently being sent (including this one)"""
+        return max(1, type(self).objects.filter(campaign_id=self.campaign_id, status='running').count())
+    
+    def release(self):
+        """Hand the job back to the queue so another worker can resume it"""
+        type(self).objects.filter(id=self.id, worker_id=self.worker_id).update(status='queued', worker_id=None)
+        self.status = 'queued'
+        self.worker_id = None
+    
+    def finish(self, status, error=None):
+        """Mark the job as done, failed or cancelled"""
+        self.status = status
+        self.last_error = error
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'last_error', 'finished_at'])
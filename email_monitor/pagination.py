@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination for the contact lists.
+
+A page is read as "the next rows after the last one shown" on the sort key and
+the ID, so page 4000 costs the same as page 1. Paginator's OFFSET reads and
+discards every row before the page, and its COUNT(*) evaluates the whole
+annotated queryset on every request.
+"""
+
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+
+# sort_by -> ordering; the ID is added as a tie-breaker so every key is unique
+CONTACT_SORTS = {
+    'name_asc': ('sort_first_name', 'sort_last_name'),
+    'name_desc': ('-sort_first_name', '-sort_last_name'),
+    'id_asc': ('id',),
+    'id_desc': ('-id',),
+    'date_asc': ('created_at',),
+    'date_desc': ('-created_at',),
+    'email_asc': ('email',),
+    'email_desc': ('-email',),
+    # Best match first, for querysets from search.search_contacts
+    'relevance': ('-search_rank',),
+}
+DEFAULT_CONTACT_SORT = 'date_desc'
+
+
+def sort_contacts(contacts, sort_by):
+    """
+    Order contacts by a sort_by choice for keyset pagination.
+
+    Returns the ordered queryset and its ordering, ending with the ID. Names are
+    compared with NULL as '', as a NULL would never match the cursor.
+    """
+    ordering = CONTACT_SORTS.get(sort_by) or CONTACT_SORTS[DEFAULT_CONTACT_SORT]
+    if ordering[0] == '-search_rank' and 'search_rank' not in contacts.query.annotations:
+        ordering = CONTACT_SORTS[DEFAULT_CONTACT_SORT]
+    if ordering[-1].lstrip('-') != 'id':
+        ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+    if 'sort_first_name' in (field.lstrip('-') for field in ordering):
+        contacts = contacts.annotate(
+            sort_first_name=Coalesce('first_name', Value('')),
+            sort_last_name=Coalesce('last_name', Value(''))
+        )
+    return contacts.order_by(*ordering), ordering
+
+
+def _encode_value(value):
+    # Full precision, DjangoJSONEncoder cuts datetimes to milliseconds
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def encode_cursor(values):
+    """Opaque URL-safe cursor for a row's key values"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Key values of a cursor, raises ValueError for a malformed one"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _beyond(ordering, values, backwards=False):
+    """Rows after the key `values` in `ordering` (before it when going backwards)"""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        descending = field.startswith('-') != backwards
+        step = Q(**{f"{field.lstrip('-')}__{'lt' if descending else 'gt'}": values[i]})
+        for previous_field, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{previous_field.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+class KeysetPage:
+    """One page of rows with cursors to the pages around it"""
+
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(self._key(object_list[-1], ordering)) if has_next and object_list else None
+        self.previous_cursor = encode_cursor(self._key(object_list[0], ordering)) if has_previous and object_list else None
+
+    @staticmethod
+    def _key(row, ordering):
+        names = [field.lstrip('-') for field in ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, ordering, after=None, before=None, per_page=50):
+    """
+    The page of an ordered queryset after the `after` cursor, before the
+    `before` cursor, or the first page. Rows from .values() must include the
+    ordering fields.
+    """
+    if before:
+        values = decode_cursor(before, ordering)
+        rows = list(queryset.filter(_beyond(ordering, values, backwards=True)).reverse()[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page]
+        rows.reverse()
+        return KeysetPage(rows, ordering, has_next=True, has_previous=has_previous)
+
+    if after:
+        queryset = queryset.filter(_beyond(ordering, decode_cursor(after, ordering)))
+    rows = list(queryset[:per_page + 1])
+    return KeysetPage(rows[:per_page], ordering, has_next=len(rows) > per_page, has_previous=bool(after))
+
+
+def estimated_count(queryset):
+    """The planner's row estimate for a queryset on PostgreSQL, None on other databases"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -2,18 +2,16 @@
 Completely permissive middleware to allow all requests through tunnel
 """
 
-class AllowAllMiddleware:
+from django.utils.deprecation import MiddlewareMixin
+
+
+class AllowAllMiddleware(MiddlewareMixin):
     """
-    Middleware that allows all requests to pass through without any restrictions
+    Middleware that allows all requests to pass through without any restrictions.
+    Sync and async capable, so async views are served without a thread hop.
     """
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
 
-    def __call__(self, request):
-        # Process request - allow everything
-        response = self.get_response(request)
-        
+    def process_response(self, request, response):
         # Add permissive headers to response
         response['Access-Control-Allow-Origin'] = '*'
         response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS, HEAD, PATCH'
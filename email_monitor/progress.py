@@ -0,0 +1,203 @@
+"""
+Coalesced progress counters and broadcasts for campaign sending
+"""
+
+import logging
+import threading
+import time
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailCampaign, EmailSender
+from .sending import call_later_in_send_loop, run_in_send_loop
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignProgress:
+    """
+    Counts a chunk's results in memory and writes them in one transaction every
+    `flush_every` contacts or `flush_ms` milliseconds.
+
+    Counters are written as F() increments, so chunks of the same campaign on
+    other workers can flush at the same time without losing updates. The job
+    checkpoint is written in the same transaction: if the worker dies before a
+    flush, the counters and the resume position roll back together and the
+    contacts are counted again when the chunk is resumed.
+    """
+
+    def __init__(self, campaign, job, flush_every=None, flush_ms=None):
+        self.campaign = campaign
+        self.job = job
+        self.flush_every = flush_every or getattr(settings, 'CAMPAIGN_PROGRESS_FLUSH_EVERY', 25)
+        self.flush_seconds = (flush_ms or getattr(settings, 'CAMPAIGN_PROGRESS_FLUSH_MS', 1000)) / 1000
+        self._reset()
+
+    def _reset(self):
+        self.sent = 0
+        self.failed = 0
+        self.processed = 0
+        self.checkpoint = None
+        self.flushed_at = time.monotonic()
+
+    @property
+    def emails_sent(self):
+        """Campaign-wide sent count including results not flushed yet"""
+        return self.campaign.emails_sent + self.sent
+
+    @property
+    def contacts_processed(self):
+        """Campaign-wide processed count including results not flushed yet"""
+        return self.campaign.current_contact_index + self.processed
+
+    def add(self, sent=0, failed=0, checkpoint=None):
+        """
+        Count one processed contact and flush if due.
+
+        Returns False if the flush found the job owned by another worker.
+        """
+        self.sent += sent
+        self.failed += failed
+        self.processed += 1
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        if self.processed >= self.flush_every or time.monotonic() - self.flushed_at >= self.flush_seconds:
+            return self.flush()
+        return True
+
+    def flush(self):
+        """Write pending counts; returns False (and writes nothing) if the job was lost"""
+        if not self.processed and self.checkpoint is None:
+            self.flushed_at = time.monotonic()
+            return True
+
+        with transaction.atomic():
+            if self.checkpoint is not None and self.checkpoint != self.job.next_index:
+                if not self.job.checkpoint(self.checkpoint):
+                    return False
+
+            EmailCampaign.objects.filter(id=self.campaign.id).update(
+                emails_sent=F('emails_sent') + self.sent,
+                emails_failed=F('emails_failed') + self.failed,
+                current_contact_index=F('current_contact_index') + self.processed
+            )
+            if self.sent:
+                EmailSender.objects.filter(key=self.campaign.sender_key).update(
+                    emails_sent=F('emails_sent') + self.sent,
+                    last_used=timezone.now()
+                )
+
+        self.campaign.emails_sent += self.sent
+        self.campaign.emails_failed += self.failed
+        self.campaign.current_contact_index += self.processed
+        self._reset()
+        return True
+
+
+class ProgressBroadcaster:
+    """
+    Sends a campaign's progress to its WebSocket group without flooding the channel layer.
+
+    Per-email events (email_start, email_success, email_error) are buffered and
+    sent together with a snapshot of the campaign counters as one
+    `progress_batch` message, at most `hz` times per second. At most
+    `max_events` of the latest events go in a batch; older ones are only
+    counted. Campaign-level events (start, paused, stopped, complete, error) go
+    out immediately, after any buffered events.
+
+    Messages are sent from the process's send loop, so the sending thread never
+    waits for the channel layer.
+    """
+
+    BATCHED_EVENTS = ('email_start', 'email_success', 'email_error')
+
+    def __init__(self, session_id, snapshot=None, hz=None, max_events=None):
+        self.group = f'email_progress_{session_id}'
+        self.snapshot = snapshot or dict
+        self.interval = 1.0 / (hz or getattr(settings, 'CAMPAIGN_PROGRESS_BROADCAST_HZ', 4))
+        self.max_events = max_events or getattr(settings, 'CAMPAIGN_PROGRESS_MAX_EVENTS', 50)
+        self._lock = threading.Lock()
+        self._events = []
+        self._dropped = 0
+        self._flush_scheduled = False
+        self._last_flush = 0.0
+        self._outbox = []
+        self._draining = False
+
+    def send(self, message_type, data):
+        """Queue a progress message; per-email events are batched, others sent right away"""
+        if message_type not in self.BATCHED_EVENTS:
+            with self._lock:
+                self._take_batch()
+                self._outbox.append(self._message(message_type, data))
+            self._kick()
+            return
+
+        with self._lock:
+            self._events.append({'message_type': message_type, 'data': data})
+            if len(self._events) > self.max_events:
+                self._events.pop(0)
+                self._dropped += 1
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+            delay = max(0.0, self._last_flush + self.interval - time.monotonic())
+        call_later_in_send_loop(delay, self._flush_batch)
+
+    def close(self):
+        """Send whatever is still buffered"""
+        with self._lock:
+            self._take_batch()
+        self._kick()
+
+    def _message(self, message_type, data):
+        return {'type': 'progress_update', 'message_type': message_type, 'data': data}
+
+    def _take_batch(self):
+        """Move buffered events into the outbox as one batch (caller holds the lock)"""
+        self._flush_scheduled = False
+        self._last_flush = time.monotonic()
+        if not self._events:
+            return
+        self._outbox.append({
+            'type': 'progress_batch',
+            'snapshot': self.snapshot(),
+            'events': self._events,
+            'dropped': self._dropped
+        })
+        self._events = []
+        self._dropped = 0
+
+    def _flush_batch(self):
+        with self._lock:
+            if not self._flush_scheduled:
+                return  # Already sent along with an immediate message
+            self._take_batch()
+        self._kick()
+
+    def _kick(self):
+        with self._lock:
+            if self._draining or not self._outbox:
+                return
+            self._draining = True
+        run_in_send_loop(self._drain())
+
+    async def _drain(self):
+        """Send outbox messages one at a time so they arrive in order"""
+        channel_layer = get_channel_layer()
+        while True:
+            with self._lock:
+                if not self._outbox:
+                    self._draining = False
+                    return
+                message = self._outbox.pop(0)
+            if channel_layer is None:
+                continue
+            try:
+                await channel_layer.group_send(self.group, message)
+            except Exception as e:
+                logger.error(f"Failed to broadcast progress to {self.group}: {str(e)}")
@@ -0,0 +1,175 @@
+"""
+Pooled, per-sender clients for the Resend API.
+
+The Resend SDK reads the API key from a process-wide global, so two campaigns
+for different senders in one process could send with each other's key. Each
+sender gets its own client instead, carrying its key in a requests Session
+whose keep-alive connection pool is shared by every thread sending for it, so
+calls after the first one skip the TCP and TLS handshake.
+
+Async views read through AsyncResendClient, which keeps an httpx connection
+pool per sender and event loop. Without httpx installed, it runs the pooled
+sync client in a worker thread instead.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from resend.exceptions import raise_for_code_and_type
+from resend.version import get_version
+
+logger = logging.getLogger(__name__)
+
+# Clients by sender key
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class ResendClient:
+    """
+    Resend API calls for one API key over a pooled, thread-safe connection.
+
+    Errors are raised as the SDK's ResendError subclasses, with the same
+    messages the SDK produced before.
+    """
+
+    def __init__(self, api_key, api_url=None, connect_timeout=None, read_timeout=None, pool_size=None):
+        self.api_key = api_key
+        self.api_url = (api_url or getattr(settings, 'RESEND_API_URL', 'https://api.resend.com')).rstrip('/')
+        self.timeout = (
+            connect_timeout or getattr(settings, 'RESEND_CONNECT_TIMEOUT', 5),
+            read_timeout or getattr(settings, 'RESEND_READ_TIMEOUT', 30)
+        )
+        pool_size = pool_size or getattr(settings, 'RESEND_POOL_SIZE', 32)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Authorization': f'Bearer {api_key}',
+            'User-Agent': f'resend-python:{get_version()}',
+        })
+
+    def request(self, method, path, json=None, headers=None, route=None):
+        """Make a raw API request and return the requests Response; `route` names the path in the logs"""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.api_url}{path}', json=json, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            log_api_call(method, route or path, started, error=str(e))
+            raise
+        log_api_call(method, route or path, started, response.status_code)
+        return response
+
+    def _post(self, path, payload, options=None):
+        headers = {}
+        if options and 'idempotency_key' in options:
+            headers['Idempotency-Key'] = str(options['idempotency_key'])
+        if options and 'batch_validation' in options:
+            headers['x-batch-validation'] = str(options['batch_validation'])
+
+        response = self.request('post', path, json=payload, headers=headers)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code >= 400 or not isinstance(data, (dict, list)):
+            raise_for_code_and_type(
+                code=response.status_code if response.status_code >= 400 else 500,
+                message=data.get('message', 'Unknown error') if isinstance(data, dict) else 'Unknown error',
+                error_type=data.get('name', 'InternalServerError') if isinstance(data, dict) else 'InternalServerError',
+                headers=dict(response.headers)
+            )
+        return data
+
+    def send_email(self, params, options=None):
+        """Send one email, returns the response dict with the email's 'id'"""
+        return self._post('/emails', params, options)
+
+    def send_batch(self, params_list, options=None):
+        """Send up to 100 emails in one request, returns the response dict with 'data' and 'errors'"""
+        return self._post('/emails/batch', params_list, options)
+
+    def get_email(self, email_id):
+        """Fetch a sent email (subject, bodies, dates), returns the requests Response"""
+        return self.request('get', f'/emails/{email_id}', route='/emails/{id}')
+
+
+def get_resend_client(sender_key, api_key):
+    """Get the client for a sender, replacing it if the sender's API key changed"""
+    with _clients_lock:
+        client = _clients.get(sender_key)
+        if client is None or client.api_key != api_key:
+            # A replaced client is left to finish requests already in flight
+            client = _clients[sender_key] = ResendClient(api_key)
+        return client
+
+
+def log_api_call(method, path, started, status=None, error=None):
+    """Sampled 'resend_api' log record of one API call, with its duration"""
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    level = logging.WARNING if error or status >= 500 else logging.INFO
+    logger.log(level, f"Resend {method.upper()} {path} {status or error} {duration_ms}ms", extra={
+        'category': 'resend_api',
+        'method': method.upper(),
+        'route': path,
+        'status': status,
+        'duration_ms': duration_ms,
+        **({'error': error} if error else {}),
+    })
+
+
+class AsyncResendClient:
+    """Resend API reads for one API key from async views, over an httpx connection pool"""
+
+    def __init__(self, sender_key, api_key):
+        self.api_key = api_key
+        self.sync_client = get_resend_client(sender_key, api_key)
+        try:
+            import httpx
+        except ImportError:
+            self.client = None
+            return
+
+        pool_size = getattr(settings, 'RESEND_POOL_SIZE', 32)
+        self.client = httpx.AsyncClient(
+            base_url=self.sync_client.api_url,
+            headers=dict(self.sync_client.session.headers),
+            timeout=httpx.Timeout(self.sync_client.timeout[1], connect=self.sync_client.timeout[0]),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def get_email(self, email_id):
+        """Fetch a sent email, returns a response with status_code, json() and text"""
+        if self.client is None:
+            return await sync_to_async(self.sync_client.get_email, thread_sensitive=False)(email_id)
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(f'/emails/{email_id}')
+        except Exception as e:
+            log_api_call('get', '/emails/{id}', started, error=str(e))
+            raise
+        log_api_call('get', '/emails/{id}', started, response.status_code)
+        return response
+
+
+# Async clients by event loop, then sender key: an httpx pool can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_resend_client(sender_key, api_key):
+    """Get the async client for a sender on the running event loop"""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(sender_key)
+    if client is None or client.api_key != api_key:
+        client = clients[sender_key] = AsyncResendClient(sender_key, api_key)
+    return client
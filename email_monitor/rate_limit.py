@@ -0,0 +1,57 @@
+"""
+Token bucket rate limiting for campaign sending
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket that paces sends to a fixed number per second.
+
+    Tokens refill continuously at `rate` per second up to `capacity`, and each
+    send takes one token. The rate can be changed at any time from another
+    thread (e.g. a WebSocket consumer) and takes effect on the next acquire.
+    """
+
+    # Longest single sleep while waiting for a token, so rate changes apply quickly
+    MAX_WAIT = 1.0
+
+    def __init__(self, rate, capacity=None):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def set_rate(self, rate, capacity=None):
+        """Change the refill rate (sends per second)"""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def try_acquire(self):
+        """Take a token if one is available, otherwise return seconds until the next one"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, self.MAX_WAIT))
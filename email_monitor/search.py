@@ -0,0 +1,71 @@
+"""
+Contact search for the contact list, the export and autocomplete.
+
+On PostgreSQL a query is answered from two generated, GIN-indexed columns on
+Contact: search_vector matches whole words and word prefixes of names, email
+and company, and search_text matches trigrams, for partial and misspelled
+words. Matches are ranked by both. Other databases fall back to unindexed
+icontains filters.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+
+from .models import Contact
+
+# Search terms: runs of characters that appear in names, emails and company names
+TERM_PATTERN = re.compile(r"[\w@.+-]+")
+
+# Autocomplete answers queries from this many characters on
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+
+def search_terms(query):
+    return TERM_PATTERN.findall(query or '')
+
+
+def search_contacts(contacts, query):
+    """
+    Contacts matching a search box query, annotated with `search_rank`
+    (higher is a better match).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return contacts.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connections[contacts.db].vendor != 'postgresql':
+        text = ' '.join(terms)
+        return contacts.filter(
+            Q(first_name__icontains=text) |
+            Q(last_name__icontains=text) |
+            Q(email__icontains=text) |
+            Q(company_name__icontains=text)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    # Every term as a word prefix: "jo smi" finds John Smith
+    words = SearchQuery(' & '.join(f"'{term}':*" for term in terms), search_type='raw', config='simple')
+    text = ' '.join(terms)
+    return contacts.filter(
+        Q(search_vector=words) | Q(search_text__trigram_word_similar=text)
+    ).annotate(
+        # As double precision, so the rank in a page cursor compares exactly
+        search_rank=Cast(
+            SearchRank(F('search_vector'), words) + TrigramWordSimilarity(text, 'search_text'),
+            output_field=FloatField()
+        )
+    )
+
+
+def autocomplete_contacts(query, limit=10):
+    """The best matching contacts for a partial query, as dicts"""
+    if len(query.strip()) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    return list(
+        search_contacts(Contact.objects.all(), query).order_by('-search_rank', 'id').values(
+            'id', 'first_name', 'last_name', 'email', 'company_name', 'category_id', 'category_name'
+        )[:limit]
+    )
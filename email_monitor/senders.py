@@ -0,0 +1,162 @@
+"""
+In-process registry of the active email senders.
+
+Senders are looked up by key, address and webhook endpoint on every request and
+webhook. The registry answers those from dicts built with one query and keeps
+each sender's webhook secret already decoded to HMAC key bytes.
+
+A snapshot is reloaded when a sender changes: post_save/post_delete (and the
+views that bulk-update senders) bump a version stamp in the cache, shared with
+the other processes when the cache is (see stats.py). SENDER_REGISTRY_TTL
+bounds how long a process with its own local memory cache can miss a change
+made in another one.
+
+The a-prefixed lookups are for async views: they only leave the event loop to
+reload a snapshot.
+"""
+
+import base64
+import binascii
+import logging
+import re
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EmailSender
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'sender_registry:version'
+
+# /webhook<endpoint>/ at the end of a sender's webhook URL
+ENDPOINT_PATTERN = re.compile(r'/webhook([^/]+)/$')
+
+
+def decode_webhook_secret(secret):
+    """HMAC key bytes of a Svix signing secret ('whsec_<base64>'), None if it isn't valid base64"""
+    if not secret:
+        return None
+    if secret.startswith('whsec_'):
+        secret = secret[6:]
+    try:
+        return base64.b64decode(secret.encode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+
+
+def webhook_endpoint(webhook_url):
+    """Endpoint of a webhook URL: '1' for https://example.com/webhook1/"""
+    match = ENDPOINT_PATTERN.search(webhook_url or '')
+    return match.group(1) if match else None
+
+
+class _Snapshot:
+    def __init__(self, senders, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_key = {sender.key: sender for sender in senders}
+        self.by_email = {}
+        self.by_endpoint = {}
+        self.webhook_keys = {}
+        for sender in senders:
+            # The oldest sender wins an address shared by several
+            self.by_email.setdefault(sender.email.strip().lower(), sender)
+            endpoint = webhook_endpoint(sender.webhook_url)
+            if endpoint:
+                self.by_endpoint.setdefault(endpoint, []).append(sender)
+            self.webhook_keys[sender.key] = decode_webhook_secret(sender.webhook_secret)
+
+
+class SenderRegistry:
+    """Active senders by key, address and webhook endpoint"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _fresh(self, version):
+        snapshot = self._snapshot
+        if (snapshot is not None and snapshot.version == version
+                and time.monotonic() - snapshot.loaded_at < settings.SENDER_REGISTRY_TTL):
+            return snapshot
+        return None
+
+    def _load(self, version):
+        with self._lock:
+            snapshot = self._fresh(version)
+            if snapshot is None:
+                senders = list(EmailSender.objects.filter(is_active=True).order_by('id'))
+                snapshot = self._snapshot = _Snapshot(senders, version)
+                self.loads += 1
+        return snapshot
+
+    def _current(self):
+        version = cache.get(VERSION_KEY)
+        return self._fresh(version) or self._load(version)
+
+    async def _acurrent(self):
+        # The version lives in the local memory or file cache, cheap enough to
+        # read on the event loop
+        version = cache.get(VERSION_KEY)
+        return self._fresh(version) or await sync_to_async(self._load)(version)
+
+    def get(self, key):
+        """Active sender with this key, or None"""
+        return self._current().by_key.get(key)
+
+    def by_email(self, email):
+        """Active sender with this address (case-insensitive), or None"""
+        return self._current().by_email.get((email or '').strip().lower())
+
+    def by_endpoint(self, endpoint):
+        """Active senders whose webhook URL ends with /webhook<endpoint>/"""
+        return self._current().by_endpoint.get(endpoint, [])
+
+    def webhook_key(self, key):
+        """Decoded webhook signing key of an active sender, or None"""
+        return self._current().webhook_keys.get(key)
+
+    def active(self):
+        """All active senders, oldest first"""
+        return list(self._current().by_key.values())
+
+    async def aget(self, key):
+        """get() for async views"""
+        return (await self._acurrent()).by_key.get(key)
+
+    async def aby_endpoint(self, endpoint):
+        """by_endpoint() for async views"""
+        return (await self._acurrent()).by_endpoint.get(endpoint, [])
+
+    async def awebhook_key(self, key):
+        """webhook_key() for async views"""
+        return (await self._acurrent()).webhook_keys.get(key)
+
+    async def aactive(self):
+        """active() for async views"""
+        return list((await self._acurrent()).by_key.values())
+
+    def invalidate(self):
+        """Reload on the next lookup, in this process and any sharing the cache"""
+        cache.set(VERSION_KEY, time.time_ns(), None)
+        self._snapshot = None
+
+
+sender_registry = SenderRegistry()
+
+
+@receiver(post_save, sender=EmailSender, dispatch_uid='sender_registry_save')
+@receiver(post_delete, sender=EmailSender, dispatch_uid='sender_registry_delete')
+def invalidate_sender_registry(**kwargs):
+    # Usage counters don't change anything the registry holds
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'emails_sent', 'last_used'}:
+        return
+    sender_registry.invalidate()
@@ -0,0 +1,253 @@
+"""
+Helpers for delivering campaign emails through the Resend API
+"""
+
+import asyncio
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .models import CAMPAIGN_TAG
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Resend accepts at most 100 messages per call to the batch endpoint
+RESEND_BATCH_SIZE = 100
+
+# Process-wide event loop and worker pool used by concurrent sending
+_send_loop = None
+_send_executor = None
+_send_loop_lock = threading.Lock()
+
+# Token bucket per sender key, shared by every campaign using that sender
+_sender_buckets = {}
+# Number of chunks of each campaign sending in this process, by campaign ID
+_campaign_chunks = {}
+_sender_buckets_lock = threading.Lock()
+
+
+def build_email_params(contact, from_header, recipient_email, subject, html_content, text_content, campaign_id=None):
+    """Build the Resend send parameters for a single personalized email"""
+    params = {
+        "from": from_header,
+        "to": [recipient_email],
+        "subject": subject,
+        "html": html_content,
+        "text": text_content,
+        # Enable tracking
+        "tags": [
+            {"name": "campaign", "value": "email_campaign"},
+            {"name": "environment", "value": "production"},
+            {"name": "contact_id", "value": str(contact.id)}
+        ],
+        "headers": {
+            "X-Entity-Ref-ID": f"contact-{contact.id}"
+        }
+    }
+    if campaign_id:
+        # Comes back on the webhooks, so events can be counted per campaign
+        params["tags"].append({"name": CAMPAIGN_TAG, "value": str(campaign_id)})
+    return params
+
+
+def idempotency_key(campaign_id, contact_id):
+    """
+    Resend idempotency key for one campaign email.
+
+    If a worker dies after Resend accepted an email but before the job was
+    checkpointed, the worker that resumes the chunk sends it again with the same
+    key and Resend returns the original email instead of delivering a duplicate.
+    """
+    return f"campaign-{campaign_id}/contact-{contact_id}"
+
+
+def send_batch(client, params_list, idempotency_key=None):
+    """
+    Send up to RESEND_BATCH_SIZE emails in a single request with a sender's ResendClient.
+
+    Returns a list of (resend_id, error) tuples aligned with params_list, so the
+    caller can map every result back to the contact it was built for. The batch
+    is sent in permissive mode: invalid messages are reported per index while
+    the rest of the batch is still delivered.
+    """
+    if len(params_list) > RESEND_BATCH_SIZE:
+        raise ValueError(f"Batch size {len(params_list)} exceeds Resend limit of {RESEND_BATCH_SIZE}")
+
+    options = {'batch_validation': 'permissive'}
+    if idempotency_key:
+        options['idempotency_key'] = idempotency_key
+
+    try:
+        response = client.send_batch(params_list, options)
+    except Exception as e:
+        # The whole request failed (network, auth, rate limit) - nothing was sent
+        logger.error(f"Resend batch request failed for {len(params_list)} emails: {str(e)}")
+        return [(None, str(e)) for _ in params_list]
+
+    data = (response or {}).get('data') or []
+    errors = {
+        error.get('index'): error.get('message', 'Rejected by Resend')
+        for error in (response or {}).get('errors') or []
+    }
+
+    # Accepted emails are returned in request order with rejected indexes left out
+    accepted_ids = iter(item.get('id') for item in data)
+    results = []
+    for index in range(len(params_list)):
+        if index in errors:
+            results.append((None, errors[index]))
+            continue
+        resend_id = next(accepted_ids, None)
+        if resend_id:
+            results.append((resend_id, None))
+        else:
+            results.append((None, 'No response ID from Resend'))
+    return results
+
+
+def _get_send_loop():
+    """Start (once per process) the event loop that dispatches concurrent sends"""
+    global _send_loop, _send_executor
+    with _send_loop_lock:
+        if _send_loop is None:
+            _send_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EMAIL_SEND_MAX_WORKERS', 32),
+                thread_name_prefix='email-send'
+            )
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='email-send-loop', daemon=True).start()
+            _send_loop = loop
+        return _send_loop
+
+
+def run_in_send_loop(coro):
+    """Schedule a coroutine on the process-wide send loop, returns a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_send_loop())
+
+
+def call_later_in_send_loop(delay, callback):
+    """Run a plain callback on the process-wide send loop after `delay` seconds"""
+    loop = _get_send_loop()
+    loop.call_soon_threadsafe(loop.call_later, delay, callback)
+
+
+def get_sender_bucket(sender_key, rate):
+    """Get the token bucket of a sender, creating it or applying a new rate as needed"""
+    with _sender_buckets_lock:
+        bucket = _sender_buckets.get(sender_key)
+        if bucket is None:
+            bucket = _sender_buckets[sender_key] = TokenBucket(rate)
+        elif bucket.rate != rate:
+            bucket.set_rate(rate)
+        return bucket
+
+
+def chunk_rate(rate, local_chunks, running_chunks):
+    """
+    Part of a campaign's send rate for its chunks running in this process.
+
+    Those chunks all take tokens from the sender's one bucket, so the rate is
+    only split with the chunks running in other processes.
+    """
+    local_chunks = max(local_chunks, 1)
+    return rate * local_chunks / max(running_chunks, local_chunks)
+
+
+def set_sender_rate(sender_key, campaign_id, rate, running_chunks):
+    """Change the send rate of a campaign's chunks running in this process"""
+    with _sender_buckets_lock:
+        bucket = _sender_buckets.get(sender_key)
+        local_chunks = _campaign_chunks.get(campaign_id, 0)
+    if bucket is None or not local_chunks:
+        return False
+    rate = chunk_rate(rate, local_chunks, running_chunks)
+    if bucket.rate != rate:
+        bucket.set_rate(rate)
+        logger.info(f"Send rate for sender {sender_key} set to {rate}/s")
+        return True
+    return False
+
+
+class ConcurrentCampaignSender:
+    """
+    Sends a campaign's emails with up to `concurrency` requests in flight,
+    paced by the sender's token bucket instead of a fixed sleep.
+
+    The bucket is shared with the sender's other campaigns in this process, so
+    they split its rate; the in-flight limit belongs to this campaign alone.
+
+    submit() is called from the synchronous campaign thread. Results come back
+    through completed() and drain() so that counters and broadcasts stay in
+    that thread, where the ORM is safe to use.
+    """
+
+    def __init__(self, client, sender_key, campaign_id, rate, running_chunks, concurrency):
+        self.client = client
+        self.sender_key = sender_key
+        self.campaign_id = campaign_id
+        with _sender_buckets_lock:
+            local_chunks = _campaign_chunks[campaign_id] = _campaign_chunks.get(campaign_id, 0) + 1
+        self.bucket = get_sender_bucket(sender_key, chunk_rate(rate, local_chunks, running_chunks))
+        self.loop = _get_send_loop()
+        self.results = queue.Queue()
+        self.pending = 0
+        # Caps this campaign's requests in flight; submit() blocks while it is full
+        self._window = threading.BoundedSemaphore(concurrency)
+
+    def set_rate(self, rate, running_chunks):
+        """Apply the campaign's send rate, split with its chunks in other processes"""
+        return set_sender_rate(self.sender_key, self.campaign_id, rate, running_chunks)
+
+    def close(self):
+        """Stop counting this chunk in the campaign's share of the sender's rate"""
+        with _sender_buckets_lock:
+            local_chunks = _campaign_chunks.get(self.campaign_id, 0) - 1
+            if local_chunks > 0:
+                _campaign_chunks[self.campaign_id] = local_chunks
+            else:
+                _campaign_chunks.pop(self.campaign_id, None)
+
+    def submit(self, params, context, options=None):
+        """Queue one email; blocks while the in-flight window is full"""
+        self._window.acquire()
+        self.pending += 1
+        asyncio.run_coroutine_threadsafe(self._send(params, context, options), self.loop)
+
+    async def _send(self, params, context, options=None):
+        result = (context, None, 'Send was not attempted')
+        try:
+            await self.bucket.acquire()
+            response = await self.loop.run_in_executor(
+                _send_executor, functools.partial(self.client.send_email, params, options)
+            )
+            if response and 'id' in response:
+                result = (context, response['id'], None)
+            else:
+                result = (context, None, 'No response ID from Resend')
+        except Exception as e:
+            result = (context, None, str(e))
+        finally:
+            self._window.release()
+            self.results.put(result)
+
+    def completed(self):
+        """Yield (context, resend_id, error) for sends that finished so far"""
+        while self.pending:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self.pending -= 1
+            yield item
+
+    def drain(self):
+        """Wait for every outstanding send and yield its result"""
+        while self.pending:
+            item = self.results.get()
+            self.pending -= 1
+            yield item
@@ -0,0 +1,245 @@
+"""
+Contact status histograms for the stats endpoints, contact list and exports.
+
+A histogram counts contacts by their latest email status from one sender, per
+category and in total, with a single grouped query. Each contact's status is
+one lookup on the ContactSenderStatus unique index, evaluated once per contact
+and grouped on, instead of once per status count.
+
+Histograms over all contacts are cached per sender. Webhooks bump the sender's
+version and contact changes bump the version shared by all senders, so a cached
+payload is never served after the data under it changed in this cache; the TTL
+bounds how stale it gets when a change happens elsewhere (another process with
+the local memory cache, a management command).
+"""
+
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.http import JsonResponse
+
+from .db_routing import read_from_replica
+from .models import Contact, ContactSenderStatus, sender_address
+from .senders import sender_registry
+
+# Latest event type -> histogram key
+STATUS_KEYS = {
+    'email.sent': 'sent',
+    'email.delivered': 'delivered',
+    'email.opened': 'opened',
+    'email.clicked': 'clicked',
+    'email.bounced': 'bounced',
+    'email.complained': 'complained',
+    'email.failed': 'failed',
+}
+
+HISTOGRAM_KEYS = ('total_contacts', 'total_email_events', 'not_sent', *STATUS_KEYS.values())
+
+
+def empty_histogram():
+    return dict.fromkeys(HISTOGRAM_KEYS, 0)
+
+
+def _count(histogram, latest_event_type, count):
+    histogram['total_contacts'] += count
+    if latest_event_type is None:
+        histogram['not_sent'] += count
+        return
+    # Contacts with any event from the sender, including statuses without a key
+    # of their own (scheduled, delivery delayed)
+    histogram['total_email_events'] += count
+    key = STATUS_KEYS.get(latest_event_type)
+    if key:
+        histogram[key] += count
+
+
+def status_histogram(contacts, sender_email):
+    """
+    Count `contacts` by latest status from `sender_email`.
+
+    Returns the totals with a 'categories' breakdown, keyed by category ID:
+    {'total_contacts': ..., 'not_sent': ..., 'sent': ..., ...,
+     'categories': {'1': {'category_name': ..., 'total_contacts': ..., ...}}}
+    `contacts` may already carry a `latest_event_type` annotation for this sender.
+    """
+    return _fold_histogram(_histogram_rows(contacts, sender_email))
+
+
+async def astatus_histogram(contacts, sender_email):
+    """status_histogram() for async views"""
+    return _fold_histogram([row async for row in _histogram_rows(contacts, sender_email)])
+
+
+def _histogram_rows(contacts, sender_email):
+    contacts = contacts.order_by()
+    if 'latest_event_type' not in contacts.query.annotations:
+        contacts = ContactSenderStatus.annotate_contacts(contacts, sender_email, latest_event_type='latest_event_type')
+    return contacts.values('category_id', 'category_name', 'latest_event_type').annotate(count=Count('id'))
+
+
+def _fold_histogram(rows):
+    totals = empty_histogram()
+    categories = {}
+    for row in rows:
+        category = categories.get(row['category_id'])
+        if category is None:
+            category = categories[row['category_id']] = {'category_name': row['category_name'], **empty_histogram()}
+        _count(category, row['latest_event_type'], row['count'])
+        _count(totals, row['latest_event_type'], row['count'])
+
+    totals['categories'] = dict(sorted(categories.items()))
+    return totals
+
+
+def category_histogram(histogram, category_id):
+    """The part of a sender histogram for one category, in the same shape"""
+    category = histogram['categories'].get(str(category_id))
+    if category is None:
+        return {**empty_histogram(), 'categories': {}}
+    counts = {key: category[key] for key in HISTOGRAM_KEYS}
+    return {**counts, 'categories': {str(category_id): category}}
+
+
+# Hit/miss counters of this process
+_cache_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_cache_counters_lock = threading.Lock()
+
+ALL_SENDERS = '*'
+
+
+def _count_cache(counter):
+    with _cache_counters_lock:
+        _cache_counters[counter] += 1
+
+
+def _version_key(sender):
+    return f'contact_stats:version:{sender}'
+
+
+def _new_version():
+    # Unique even when a version key was evicted and starts over
+    return time.time_ns()
+
+
+def invalidate_contact_stats(sender_email=None):
+    """
+    Drop the cached histograms of one sender (after one of its events) or of all
+    senders (after contacts were added, changed or deleted).
+    """
+    key = _version_key(sender_address(sender_email) if sender_email else ALL_SENDERS)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+    _count_cache('invalidations')
+
+
+def _versions(sender):
+    keys = [_version_key(ALL_SENDERS), _version_key(sender)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = _new_version()
+            if not cache.add(key, versions[key], None):
+                versions[key] = cache.get(key, versions[key])
+    return [versions[key] for key in keys]
+
+
+def sender_status_histogram(sender_email):
+    """status_histogram() of all contacts for one sender, cached until an event or contact change"""
+    key = _histogram_key(sender_email)
+    histogram = _cached_histogram(key)
+    if histogram is None:
+        histogram = status_histogram(Contact.objects.all(), sender_email)
+        cache.set(key, histogram, getattr(settings, 'STATS_CACHE_TTL', 300))
+    return histogram
+
+
+async def asender_status_histogram(sender_email):
+    """
+    sender_status_histogram() for async views. The stats cache is local memory
+    or local files, read on the event loop; only a miss queries the database.
+    """
+    key = _histogram_key(sender_email)
+    histogram = _cached_histogram(key)
+    if histogram is None:
+        histogram = await astatus_histogram(Contact.objects.all(), sender_email)
+        cache.set(key, histogram, getattr(settings, 'STATS_CACHE_TTL', 300))
+    return histogram
+
+
+def _histogram_key(sender_email):
+    sender = sender_address(sender_email)
+    contacts_version, sender_version = _versions(sender)
+    return f'contact_stats:histogram:{sender}:{contacts_version}:{sender_version}'
+
+
+def _cached_histogram(key):
+    histogram = cache.get(key)
+    _count_cache('misses' if histogram is None else 'hits')
+    return histogram
+
+
+def stats_cache_info():
+    """Hit/miss counters of this process's stats cache"""
+    with _cache_counters_lock:
+        counters = dict(_cache_counters)
+    lookups = counters['hits'] + counters['misses']
+    return {
+        **counters,
+        'hit_rate': round(counters['hits'] / lookups, 3) if lookups else None,
+        'ttl_seconds': getattr(settings, 'STATS_CACHE_TTL', 300),
+        'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'pid': os.getpid(),
+    }
+
+
+def contact_stats_response(histogram, sender, sender_email, category_filter):
+    """JSON response of the contact stats endpoints for one sender's histogram"""
+    # Apply category filter if specified
+    if category_filter == 'all':
+        category_filter = None
+    if category_filter:
+        histogram = category_histogram(histogram, category_filter)
+    
+    # Prepare category text for explanations
+    category_text = f' in category "{category_filter}"' if category_filter else ''
+    
+    return JsonResponse({
+        **histogram,
+        'sender': sender,
+        'sender_email': sender_email,
+        'category_filter': category_filter,
+        'stats_explanation': {
+            'total_contacts': f'Total number of contact records{category_text} (shared across all senders)',
+            'total_email_events': f'Number of contacts{category_text} with email events from this sender',
+            'status_counts': f'Contact counts{category_text} based on their latest email status from this sender only'
+        }
+    })
+
+
+@read_from_replica
+async def async_contact_stats_api(request):
+    """Contact stats endpoint on the event loop; the debug payload is left to the sync view"""
+    if request.GET.get('debug', 'false').lower() == 'true':
+        from .views import contact_stats_api
+        return await sync_to_async(contact_stats_api)(request)
+    
+    try:
+        sender = request.GET.get('sender')
+        if not sender:
+            return JsonResponse({'error': 'Sender parameter is required'}, status=400)
+        
+        sender_obj = await sender_registry.aget(sender)
+        if not sender_obj:
+            return JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
+        
+        histogram = await asender_status_histogram(sender_obj.email)
+        return contact_stats_response(histogram, sender, sender_obj.email, request.GET.get('category'))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
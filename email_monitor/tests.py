@@ -1,3 +1,635 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import ingest, sending
+from .campaign_runner import CheckpointTracker
+from .consumers import EmailProgressConsumer
+from .db_routing import STICKY_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, read_from_replica
+from .models import CampaignJob, Category, Contact, ContactSenderStatus, EmailCampaign, EmailEvent, EmailSender, WebhookDelivery
+from .pagination import keyset_page, sort_contacts
+from .provider import AsyncResendClient
+from .rate_limit import TokenBucket
+from .templating import CONTACT_PLACEHOLDERS, compile_template
+from .senders import sender_registry
+from .sending import ConcurrentCampaignSender
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MonitorTestCase(TestCase):
+    """Starts each test without the cached stats and senders of the previous one (rolled back underneath them)"""
+
+    def setUp(self):
+        cache.clear()
+        sender_registry.invalidate()
+
+
+def make_sender(key='s1', email='team@example.com', **fields):
+    return EmailSender.objects.create(
+        key=key, email=email, name='Team', domain='example.com', api_key=f're_{key}',
+        webhook_url=f'https://example.com/webhook{key}/', webhook_secret='whsec_MDEyMzQ1Njc4OWFiY2RlZg==',
+        **fields
+    )
+
+
+def webhook_payload(event_type='email.delivered', email_id='em_1', to='lead@example.com', frm='Team <team@example.com>'):
+    return {
+        'type': event_type, 'created_at': '2026-01-01T10:00:00.000Z',
+        'data': {'email_id': email_id, 'from': frm, 'to': [to], 'subject': 'Hello'},
+    }
+
+
+class IngestTests(MonitorTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(ingest, 'recent_deliveries', ingest.RecentDeliveries(100))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_a_retried_delivery_is_queued_once(self):
+        self.assertTrue(ingest.queue_delivery('s1', 'msg_1', webhook_payload()))
+        self.assertFalse(ingest.queue_delivery('s1', 'msg_1', webhook_payload()))
+
+        # Another process (or a forgotten key) still hits the queue's unique index
+        ingest.recent_deliveries = ingest.RecentDeliveries(100)
+        ingest.queue_delivery('s1', 'msg_1', webhook_payload())
+        self.assertEqual(WebhookDelivery.objects.count(), 1)
+
+    def test_new_deliveries_skips_stored_and_repeated_events(self):
+        ingest.queue_delivery('s1', 'msg_1', webhook_payload())
+        ingest.drain_all()
+
+        deliveries = [
+            WebhookDelivery(delivery_id='msg_1', event_type='email.delivered', payload=webhook_payload()),
+            WebhookDelivery(delivery_id='msg_1', event_type='email.opened', payload=webhook_payload('email.opened')),
+            WebhookDelivery(delivery_id='msg_2', event_type='email.delivered', payload=webhook_payload(email_id='em_2')),
+            WebhookDelivery(delivery_id='msg_2', event_type='email.delivered', payload=webhook_payload(email_id='em_2')),
+            WebhookDelivery(delivery_id=None, event_type='email.sent', payload=webhook_payload('email.sent')),
+        ]
+
+        new = ingest.new_deliveries(deliveries)
+        self.assertEqual(new, [deliveries[1], deliveries[2], deliveries[4]])
+
+    def test_a_retry_after_the_event_was_stored_adds_no_event(self):
+        ingest.queue_delivery('s1', 'msg_1', webhook_payload())
+        ingest.drain_all()
+        ingest.recent_deliveries = ingest.RecentDeliveries(100)
+
+        ingest.queue_delivery('s1', 'msg_1', webhook_payload())
+        ingest.drain_all()
+
+        self.assertEqual(EmailEvent.objects.count(), 1)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    def test_events_are_dated_when_the_webhook_arrived(self):
+        received_at = timezone.now() - timedelta(hours=3)
+        WebhookDelivery.objects.create(
+            sender_key='s1', delivery_id='msg_1', event_type='email.delivered',
+            payload=webhook_payload(), received_at=received_at
+        )
+
+        ingest.drain_all()
+
+        event = EmailEvent.objects.get()
+        self.assertEqual(event.created_at, received_at)
+        self.assertEqual(event.received_at, received_at)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+
+class ContactSenderStatusTests(MonitorTestCase):
+    def events(self, *specs):
+        start = timezone.now() - timedelta(days=1)
+        return [
+            EmailEvent(event_type=event_type, created_at=start + timedelta(minutes=minute), email_id=email_id,
+                       from_email='Team <team@example.com>', to_email='lead@example.com')
+            for event_type, email_id, minute in specs
+        ]
+
+    def test_status_only_moves_forward_for_the_same_email(self):
+        ContactSenderStatus.record_events(self.events(
+            ('email.opened', 'em_1', 3), ('email.sent', 'em_1', 0), ('email.clicked', 'em_1', 4),
+        ))
+        # Arrives late but happened before the click
+        ContactSenderStatus.record_events(self.events(('email.delivered', 'em_1', 1)))
+
+        status = ContactSenderStatus.objects.get()
+        self.assertEqual(status.latest_event_type, 'email.clicked')
+        self.assertEqual((status.sent_count, status.delivered_count, status.opened_count, status.clicked_count), (1, 1, 1, 1))
+
+    def test_a_newer_email_starts_over(self):
+        ContactSenderStatus.record_events(self.events(
+            ('email.sent', 'em_1', 0), ('email.bounced', 'em_1', 1), ('email.sent', 'em_2', 10),
+        ))
+        status = ContactSenderStatus.objects.get()
+        self.assertEqual((status.latest_event_type, status.latest_email_id), ('email.sent', 'em_2'))
+
+        # An open of the older email doesn't take the status back to it
+        ContactSenderStatus.record_events(self.events(('email.opened', 'em_1', 12)))
+        status.refresh_from_db()
+        self.assertEqual((status.latest_event_type, status.latest_email_id), ('email.sent', 'em_2'))
+        self.assertEqual(status.opened_count, 1)
+
+    def test_events_of_a_batch_apply_in_the_order_they_happened(self):
+        ContactSenderStatus.record_events(self.events(('email.sent', 'em_2', 10), ('email.sent', 'em_1', 0)))
+
+        self.assertEqual(ContactSenderStatus.objects.get().latest_email_id, 'em_2')
+
+    def test_status_matches_contacts_regardless_of_case(self):
+        Contact.objects.create(category_id='1', category_name='Leads', contact_id=1, email='Lead@Example.com')
+        ContactSenderStatus.record_events([
+            EmailEvent(event_type='email.delivered', created_at=timezone.now(), email_id='em_1',
+                       from_email='Team <Team@Example.com>', to_email='LEAD@example.com')
+        ])
+
+        status = ContactSenderStatus.objects.get()
+        self.assertEqual((status.email, status.sender_email), ('lead@example.com', 'team@example.com'))
+        contact = ContactSenderStatus.annotate_contacts(
+            Contact.objects.all(), 'team@example.com', latest_event_type='latest_event_type'
+        ).get()
+        self.assertEqual(contact.latest_event_type, 'email.delivered')
+
+
+class CategoryTests(MonitorTestCase):
+    def test_for_name_returns_the_existing_category_or_the_next_free_id(self):
+        leads = Category.objects.create(id=3, name='Leads')
+        # Contacts of a category missing from the directory keep their ID
+        Contact.objects.create(category_id='4', category_name='Lost', contact_id=1, email='lost@example.com')
+
+        self.assertEqual(Category.for_name('Leads'), leads)
+        partners = Category.for_name('Partners')
+        self.assertEqual((partners.id, partners.category_id, partners.contact_count), (5, '5', 0))
+        self.assertEqual(Category.for_name('Partners'), partners)
+
+    def test_for_name_adopts_contacts_from_before_the_directory(self):
+        for contact_id in (2, 7):
+            Contact.objects.create(category_id='9', category_name='Legacy', contact_id=contact_id,
+                                   email=f'c{contact_id}@example.com')
+
+        legacy = Category.for_name('Legacy')
+
+        self.assertEqual((legacy.id, legacy.contact_count, legacy.last_contact_id), (9, 2, 7))
+        self.assertEqual(legacy.allocate_contact_id(), 8)
+
+    def test_allocate_contact_id_hands_out_each_id_once(self):
+        leads = Category.objects.create(id=1, name='Leads', last_contact_id=41)
+        other = Category.objects.get(id=1)
+
+        self.assertEqual([leads.allocate_contact_id(), other.allocate_contact_id(), leads.allocate_contact_id()], [42, 43, 44])
+        self.assertEqual(Category.objects.get(id=1).last_contact_id, 44)
+
+    def test_moving_a_contact_moves_its_count(self):
+        leads = Category.objects.create(id=1, name='Leads', contact_count=1, last_contact_id=1)
+        partners = Category.objects.create(id=2, name='Partners')
+        Contact.objects.create(category_id='1', category_name='Leads', contact_id=1, email='lead@example.com')
+
+        contact = Contact.objects.get()
+        contact.category_id = '2'
+        contact.save()
+        contact.first_name = 'Lea'
+        contact.save()
+
+        leads.refresh_from_db()
+        partners.refresh_from_db()
+        self.assertEqual((leads.contact_count, partners.contact_count), (0, 1))
+
+
+    def test_merging_duplicates_takes_them_off_their_category_counts(self):
+        leads = Category.objects.create(id=1, name='Leads', contact_count=2, last_contact_id=2)
+        partners = Category.objects.create(id=2, name='Partners', contact_count=1, last_contact_id=1)
+        Contact.objects.create(category_id='1', category_name='Leads', contact_id=1, email='Dup@example.com')
+        Contact.objects.create(category_id='1', category_name='Leads', contact_id=2, email='other@example.com')
+        Contact.objects.create(category_id='2', category_name='Partners', contact_id=1, email='dup@example.com')
+
+        with mock.patch('email_monitor.management.commands.fix_duplicate_contacts.invalidate_contact_stats') as invalidate:
+            call_command('fix_duplicate_contacts', auto_merge=True, stdout=StringIO())
+
+        leads.refresh_from_db()
+        partners.refresh_from_db()
+        self.assertEqual(Contact.objects.count(), 2)
+        self.assertEqual(leads.contact_count + partners.contact_count, 2)
+        invalidate.assert_called_once_with()
+
+class AsyncEmailContentViewTests(MonitorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sender = make_sender()
+        Contact.objects.create(category_id='1', category_name='Leads', contact_id=1, email='lead@example.com')
+        EmailEvent.objects.create(
+            event_id='ev1', event_type='email.delivered', created_at='2026-01-01T10:00:00',
+            email_id='em_1', from_email='Team <team@example.com>', to_email='lead@example.com',
+            sender=self.sender, raw_data={}
+        )
+
+    async def test_content_is_read_through_the_async_client(self):
+        response = mock.Mock(status_code=200, text='')
+        response.json.return_value = {'subject': 'Hello', 'html': '<p>Hi</p>', 'text': 'Hi', 'created_at': '2026-01-01'}
+        with mock.patch.object(AsyncResendClient, 'get_email', mock.AsyncMock(return_value=response)) as get_email:
+            result = await self.async_client.get(
+                '/monitor/api/contact_email_content/', {'sender': 's1', 'email': 'lead@example.com'}
+            )
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()['subject'], 'Hello')
+        get_email.assert_awaited_once_with('em_1')
+
+    async def test_resend_error_is_reported(self):
+        response = mock.Mock(status_code=404, text='not found')
+        with mock.patch.object(AsyncResendClient, 'get_email', mock.AsyncMock(return_value=response)):
+            result = await self.async_client.get(
+                '/monitor/api/contact_email_content/', {'sender': 's1', 'email': 'lead@example.com'}
+            )
+
+        self.assertEqual(result.status_code, 500)
+        self.assertIn('404', result.json()['error'])
+
+
+@override_settings(EMAIL_SEND_MAX_RATE=10)
+class EmailTimeoutUpdateTests(TransactionTestCase):
+    # database_sync_to_async closes the connection of a TestCase transaction
+
+    def setUp(self):
+        self.campaign = EmailCampaign.objects.create(
+            session_id='c1', sender_key='s1', subject='Hi', template='Hi', send_mode='concurrent', send_rate=5.0
+        )
+        self.consumer = EmailProgressConsumer()
+        self.consumer.session_id = 'c1'
+
+    async def test_timeout_alone_keeps_the_send_rate(self):
+        timeout, rate = await self.consumer.update_email_timeout('10')
+
+        await self.campaign.arefresh_from_db()
+        self.assertEqual((timeout, rate), (10, None))
+        self.assertEqual((self.campaign.email_timeout, self.campaign.send_rate), (10, 5.0))
+
+    async def test_timeout_and_rate_are_clamped(self):
+        timeout, rate = await self.consumer.update_email_timeout('1', '1000')
+
+        await self.campaign.arefresh_from_db()
+        self.assertEqual((timeout, rate), (5, 10))
+        self.assertEqual((self.campaign.email_timeout, self.campaign.send_rate), (5, 10))
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch('email_monitor.rate_limit.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_paces_sends_to_the_rate(self):
+        bucket = TokenBucket(rate=2)
+
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        self.now += 0.5
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        bucket.try_acquire()
+
+        self.now += 60
+        for _ in range(3):
+            self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+
+    def test_rate_change_applies_to_the_next_token(self):
+        bucket = TokenBucket(rate=1)
+        bucket.try_acquire()
+
+        bucket.set_rate(4)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.25)
+        self.now += 0.25
+        self.assertEqual(bucket.try_acquire(), 0.0)
+
+
+class ConcurrentCampaignSenderTests(SimpleTestCase):
+    def setUp(self):
+        for name in ('_sender_buckets', '_campaign_chunks'):
+            patcher = mock.patch.object(sending, name, {})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_chunk(self, sender_key='s1', campaign_id=1, rate=2, running_chunks=1, concurrency=4, client=None):
+        sender = ConcurrentCampaignSender(client or mock.Mock(), sender_key, campaign_id, rate, running_chunks, concurrency)
+        self.addCleanup(sender.close)
+        return sender
+
+    def test_campaigns_of_a_sender_share_its_bucket_whatever_their_concurrency(self):
+        first = self.start_chunk(campaign_id=1, concurrency=4)
+        second = self.start_chunk(campaign_id=2, concurrency=8)
+        other = self.start_chunk(sender_key='s2', campaign_id=3)
+
+        self.assertIs(first.bucket, second.bucket)
+        self.assertIsNot(first.bucket, other.bucket)
+
+    def test_chunks_in_one_process_share_the_campaign_rate_instead_of_splitting_it(self):
+        first = self.start_chunk(rate=6, running_chunks=1)
+        self.start_chunk(rate=6, running_chunks=2)
+        self.assertEqual(first.bucket.rate, 6)
+
+        # A third chunk started on another worker takes its part of the rate
+        first.set_rate(6, running_chunks=3)
+        self.assertEqual(first.bucket.rate, 4)
+
+    def test_rate_change_from_the_consumer_applies_the_same_split(self):
+        first = self.start_chunk(rate=6, running_chunks=2)
+
+        self.assertTrue(sending.set_sender_rate('s1', 1, 8, running_chunks=2))
+        self.assertEqual(first.bucket.rate, 4)
+        self.assertFalse(sending.set_sender_rate('s1', 2, 1, running_chunks=1))
+        self.assertEqual(first.bucket.rate, 4)
+
+    def test_a_finished_chunk_no_longer_counts_for_the_process(self):
+        first = self.start_chunk(rate=6, running_chunks=2)
+        second = self.start_chunk(rate=6, running_chunks=2)
+
+        second.close()
+        first.set_rate(6, running_chunks=2)
+        self.assertEqual(first.bucket.rate, 3)
+
+    def test_sends_complete_through_the_bucket(self):
+        client = mock.Mock()
+        client.send_email.side_effect = lambda params, options: {'id': f"re_{params['to'][0]}"}
+        sender = self.start_chunk(rate=100, concurrency=2, client=client)
+
+        for recipient in ('a@example.com', 'b@example.com', 'c@example.com'):
+            sender.submit({'to': [recipient]}, recipient)
+
+        self.assertEqual(
+            sorted((context, resend_id) for context, resend_id, _ in sender.drain()),
+            [('a@example.com', 're_a@example.com'), ('b@example.com', 're_b@example.com'), ('c@example.com', 're_c@example.com')]
+        )
+
+
+class CheckpointTrackerTests(SimpleTestCase):
+    def test_position_only_passes_contiguous_finished_positions(self):
+        tracker = CheckpointTracker(start=10)
+
+        self.assertEqual(tracker.finish(11), 10)
+        self.assertEqual(tracker.finish(12), 10)
+        self.assertEqual(tracker.finish(10), 13)
+        self.assertEqual(tracker.finish(14), 13)
+
+
+class CampaignJobTests(MonitorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.campaign = EmailCampaign.objects.create(session_id='c1', sender_key='s1', subject='Hi', template='Hi')
+
+    def test_claims_the_oldest_queued_job(self):
+        CampaignJob.create_chunks(self.campaign, list(range(1, 6)), chunk_size=2)
+
+        job = CampaignJob.claim_next('w1')
+
+        self.assertEqual((job.start_index, job.contact_ids), (0, [1, 2]))
+        self.assertEqual((job.status, job.worker_id, job.attempts), ('running', 'w1', 1))
+        self.assertEqual(CampaignJob.objects.filter(status='queued').count(), 2)
+
+    def test_released_job_resumes_from_its_checkpoint(self):
+        CampaignJob.create_chunks(self.campaign, list(range(1, 6)), chunk_size=5)
+        job = CampaignJob.claim_next('w1')
+        self.assertTrue(job.checkpoint(3))
+        job.release()
+
+        resumed = CampaignJob.claim_next('w2')
+
+        self.assertEqual((resumed.id, resumed.next_index, resumed.attempts), (job.id, 3, 2))
+
+    def test_checkpoint_of_a_worker_that_lost_the_job_is_ignored(self):
+        CampaignJob.create_chunks(self.campaign, list(range(1, 6)), chunk_size=5)
+        stale = CampaignJob.claim_next('w1')
+        CampaignJob.objects.filter(id=stale.id).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(CampaignJob.requeue_stale(stale_after_seconds=120), 1)
+        owner = CampaignJob.claim_next('w2')
+
+        self.assertFalse(stale.checkpoint(4))
+        stale.heartbeat_at = None
+        self.assertFalse(stale.heartbeat())
+        self.assertTrue(owner.checkpoint(2))
+        self.assertEqual(CampaignJob.objects.get().next_index, 2)
+
+    @override_settings(CAMPAIGN_MAX_PARALLEL_CHUNKS=1)
+    def test_parallel_chunks_of_a_campaign_are_limited(self):
+        other = EmailCampaign.objects.create(session_id='c2', sender_key='s1', subject='Hi', template='Hi')
+        CampaignJob.create_chunks(self.campaign, list(range(1, 5)), chunk_size=2)
+        CampaignJob.create_chunks(other, [9])
+
+        first = CampaignJob.claim_next('w1')
+        second = CampaignJob.claim_next('w2')
+
+        self.assertEqual(first.campaign_id, self.campaign.id)
+        self.assertEqual(second.campaign_id, other.id)
+        self.assertIsNone(CampaignJob.claim_next('w3'))
+        first.finish('done')
+        self.assertEqual(CampaignJob.claim_next('w3').start_index, 2)
+
+
+def legacy_render(template, contact):
+    """The per-contact findall/replace loop that compiled templates replaced"""
+    contact_data = {name: getattr(contact, field) or '' for name, field in CONTACT_PLACEHOLDERS.items()}
+    contact_data['full_name'] = contact.full_name
+    html = template
+    for placeholder in re.findall(r'\{(.*?)\}', template):
+        html = html.replace(f'{{{placeholder}}}', str(contact_data.get(placeholder, f'[{placeholder} not found]')))
+    text = re.sub(r'<[^>]+>', '', html)
+    text = re.sub(r'\n\s*\n', '\n\n', text.strip())
+    return html, text
+
+
+class CompiledTemplateTests(SimpleTestCase):
+    TEMPLATE = """<html><body>
+<p>Hi {prospect_first_name} ({full_name}),</p>
+
+   
+<p>{tailored_tone_first_line}</p>
+<p>{company_name} in {prospect_location_city}: <a href="{company_website}">site</a> {unknown_field}</p>
+
+
+<p>P.S. {tailored_tone_ps_statement} - {company_name}</p>
+</body></html>"""
+
+    CONTACTS = [
+        {'first_name': 'Ana', 'last_name': 'Lopez', 'company_name': 'Acme', 'location_city': 'Lyon',
+         'company_website': 'https://acme.test', 'tailored_tone_first_line': 'Loved your talk.',
+         'tailored_tone_ps_statement': 'See you soon'},
+        {'first_name': '', 'last_name': None, 'company_name': None},
+        {'first_name': '  Ana ', 'tailored_tone_first_line': 'Line one\n\n\nLine two'},
+        {'first_name': 'Ana', 'tailored_tone_first_line': '<b>bold</b> and a > sign', 'company_name': 'A<B'},
+    ]
+
+    def test_output_matches_the_old_renderer(self):
+        compiled = compile_template(self.TEMPLATE)
+        for fields in self.CONTACTS:
+            contact = Contact(**fields)
+            with self.subTest(fields=fields):
+                self.assertEqual(compiled.render(contact), legacy_render(self.TEMPLATE, contact))
+
+    def test_reports_unknown_placeholders_and_used_fields(self):
+        compiled = compile_template(self.TEMPLATE)
+
+        self.assertEqual(compiled.unknown_placeholders, ['unknown_field'])
+        self.assertEqual(compiled.contact_fields, [
+            'first_name', 'last_name', 'tailored_tone_first_line', 'company_name', 'location_city',
+            'company_website', 'tailored_tone_ps_statement',
+        ])
+        self.assertIs(compile_template(self.TEMPLATE), compiled)
+
+
+class KeysetPageTests(MonitorTestCase):
+    def setUp(self):
+        super().setUp()
+        created_at = timezone.now()
+        names = [('Bo', 'Z'), (None, 'A'), ('Al', None), ('Bo', 'Z'), ('Al', 'B'), ('Cy', 'C'), ('Bo', 'Z')]
+        for number, (first_name, last_name) in enumerate(names, 1):
+            Contact.objects.create(
+                category_id='1', contact_id=number, email=f'c{number}@example.com',
+                first_name=first_name, last_name=last_name, created_at=created_at
+            )
+
+    def walk(self, contacts, ordering, per_page=3):
+        pages = [keyset_page(contacts, ordering, per_page=per_page)]
+        while pages[-1].has_next:
+            pages.append(keyset_page(contacts, ordering, after=pages[-1].next_cursor, per_page=per_page))
+        return pages
+
+    def test_cursors_visit_every_row_once_in_order(self):
+        for sort_by in ('name_asc', 'name_desc', 'date_desc', 'email_asc'):
+            contacts, ordering = sort_contacts(Contact.objects.all(), sort_by)
+            with self.subTest(sort_by=sort_by):
+                pages = self.walk(contacts, ordering)
+                self.assertEqual([contact.id for page in pages for contact in page], [contact.id for contact in contacts])
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor_returns_the_page_before(self):
+        contacts, ordering = sort_contacts(Contact.objects.all(), 'name_asc')
+        pages = self.walk(contacts, ordering)
+
+        previous = keyset_page(contacts, ordering, before=pages[2].previous_cursor, per_page=3)
+
+        self.assertEqual([contact.id for contact in previous], [contact.id for contact in pages[1]])
+        self.assertTrue(previous.has_previous)
+        self.assertTrue(previous.has_next)
+
+    def test_malformed_cursor_is_rejected(self):
+        contacts, ordering = sort_contacts(Contact.objects.all(), 'id_asc')
+
+        with self.assertRaises(ValueError):
+            keyset_page(contacts, ordering, after='not-a-cursor')
+
+
+@override_settings(REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('email_monitor.db_routing.replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+    def read_alias(self, request):
+        @read_from_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Contact) or 'default')
+        return view(request).content.decode()
+
+    def test_safe_requests_of_wrapped_views_read_the_replica(self):
+        self.assertEqual(self.read_alias(RequestFactory().get('/')), 'replica')
+        self.assertIsNone(self.router.db_for_read(Contact))
+        self.assertEqual(self.router.db_for_write(Contact), 'default')
+
+    def test_async_views_read_the_replica(self):
+        @read_from_replica
+        async def view(request):
+            return HttpResponse(self.router.db_for_read(Contact) or 'default')
+
+        response = async_to_sync(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'replica')
+
+    def test_writes_and_transactions_stay_on_the_primary(self):
+        self.assertEqual(self.read_alias(RequestFactory().post('/')), 'default')
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.read_alias(RequestFactory().get('/')), 'default')
+
+    def test_a_write_pins_the_user_to_the_primary(self):
+        middleware = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 10)
+        self.assertNotIn(STICKY_COOKIE, middleware(RequestFactory().get('/')).cookies)
+
+        request = RequestFactory().get('/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.assertEqual(self.read_alias(request), 'default')
+
+
+class AnalyzeLogsCommandTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'email_monitor.log')
+
+    def write(self, path, records, extra_lines=()):
+        now = timezone.now()
+        with open(path, 'w', encoding='utf-8') as log_file:
+            for line in extra_lines:
+                log_file.write(line + '\n')
+            for record in records:
+                log_file.write(json.dumps({'ts': now.isoformat(), 'level': 'INFO', 'logger': 'email_monitor.requests',
+                                           'message': 'request', **record}) + '\n')
+
+    def analyze(self, *args):
+        out = StringIO()
+        call_command('analyze_logs', '--file', self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def route_row(self, output, category, route):
+        for line in output.splitlines():
+            if line.startswith(f'{category:<14} {route:<42}'):
+                return line.split()[2:]
+        self.fail(f'No row for {category} {route} in:\n{output}')
+
+    def test_counts_are_scaled_by_the_sample_rate_across_rotated_files(self):
+        webhook = {'category': 'webhook', 'route': '/webhook<str:endpoint>/', 'sample_rate': 0.1}
+        self.write(self.path + '.1', [{**webhook, 'status': 200, 'duration_ms': 10}], extra_lines=['plain text line'])
+        self.write(self.path, [
+            {**webhook, 'status': 200, 'duration_ms': 30},
+            {**webhook, 'status': 403, 'duration_ms': 20},
+            {**webhook, 'status': 500, 'duration_ms': 90, 'level': 'ERROR', 'sample_rate': 1.0, 'message': 'boom'},
+        ])
+
+        output = self.analyze()
+
+        self.assertIn('5 log lines in 2 files, 1 unstructured lines skipped', output)
+        count, errors, client_errors, p50, p95, p99, longest = self.route_row(output, 'webhook', '/webhook<str:endpoint>/')
+        self.assertEqual(count, '31')
+        self.assertEqual((errors, client_errors), ('3.23', '32.26'))
+        self.assertEqual((p50, longest), ('20.0', '90.0'))
+        self.assertIn('email_monitor.requests: boom', output)
+
+    def test_category_filter(self):
+        self.write(self.path, [
+            {'category': 'api', 'route': '/monitor/api/contact_stats/', 'status': 200, 'duration_ms': 5},
+            {'category': 'resend_api', 'route': '/emails/{id}', 'status': 200, 'duration_ms': 80, 'sample_rate': 0.5},
+        ])
+
+        output = self.analyze('--category', 'resend_api')
+
+        self.assertEqual(self.route_row(output, 'resend_api', '/emails/{id}')[0], '2')
+        self.assertNotIn('/monitor/api/contact_stats/', output)
+
+    def test_missing_file(self):
+        self.assertIn('No log file', self.analyze())
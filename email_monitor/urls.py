@@ -1,15 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from . import views
+from .stats import async_contact_stats_api
+
+# Async views run on the event loop under ASGI; the sync ones stay for ASYNC_VIEWS=False
+if settings.ASYNC_VIEWS:
+    contact_email_content_api = views.async_contact_email_content_api
+    contact_stats_api = async_contact_stats_api
+    event_timeseries_api = views.async_event_timeseries_api
+else:
+    contact_email_content_api = views.contact_email_content_api
+    contact_stats_api = views.contact_stats_api
+    event_timeseries_api = views.event_timeseries_api
 
 urlpatterns = [
     path('', views.contacts_list, name='contacts_list'),
     path('contacts/', views.contacts_list, name='contacts_list_alt'),
     path('contacts/upload/', views.upload_csv, name='upload_csv'),
     path('contacts/delete/<int:contact_id>/', views.delete_contact, name='delete_contact'),
-    path('api/contact_email_content/', views.contact_email_content_api, name='contact_email_content_api'),
+    path('api/contact_email_content/', contact_email_content_api, name='contact_email_content_api'),
     path('api/email_content_by_id/', views.email_content_by_id_api, name='email_content_by_id_api'),
-    path('api/contact_stats/', views.contact_stats_api, name='contact_stats_api'),
+    path('api/contact_stats/', contact_stats_api, name='contact_stats_api'),
+    path('api/stats_cache/', views.stats_cache_api, name='stats_cache_api'),
+    path('api/event_timeseries/', event_timeseries_api, name='event_timeseries_api'),
     path('api/contacts/', views.contacts_api, name='contacts_api'),
+    path('api/contacts/autocomplete/', views.contacts_autocomplete_api, name='contacts_autocomplete_api'),
     path('api/categories/', views.get_categories_api, name='get_categories_api'),
     path('api/add-contact/', views.add_contact_api, name='add_contact_api'),
     path('api/update_contact_field/', views.update_contact_field_api, name='update_contact_field_api'),
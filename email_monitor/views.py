@@ -6,14 +6,23 @@ from django.utils.decorators import method_decorator
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Count, Q, Max
-from django.db import models
-from django.core.paginator import Paginator
+from django.db import connection, models
 from django.contrib import messages
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.core.exceptions import RequestDataTooBig
-from .models import EmailEvent, EmailCampaign, Contact, EmailSender
+from .models import Category, EmailEvent, EmailEventRollup, EmailCampaign, Contact, ContactSenderStatus, EmailSender, WebhookDelivery
 from .forms import ContactForm, ContactSearchForm, CSVUploadForm
+from .archive import delete_archives
+from .db_routing import read_from_replica
+from .ingest import aqueue_delivery, queue_delivery, schedule_inline_drain
+from .pagination import estimated_count, keyset_page, sort_contacts
+from .search import autocomplete_contacts, search_contacts
+from .senders import decode_webhook_secret, sender_registry
+from .stats import (
+    category_histogram, contact_stats_response, invalidate_contact_stats, sender_status_histogram,
+    stats_cache_info, status_histogram
+)
 import json
 import csv
 import io
@@ -56,15 +65,11 @@ def extract_email_from_sender_string(sender_string):
 def get_sender_from_email(email):
     """Get sender key from email address"""
     try:
-        from .models import EmailSender
-        
-        # Get from database
-        try:
-            sender = EmailSender.objects.get(email=email, is_active=True)
+        sender = sender_registry.by_email(email)
+        if sender:
             return sender.key
-        except EmailSender.DoesNotExist:
-            logger.warning(f"No active sender found for email: {email}")
-            return None
+        logger.warning(f"No active sender found for email: {email}")
+        return None
         
     except Exception as e:
         logger.error(f"Error getting sender from email {email}: {str(e)}")
@@ -72,18 +77,14 @@ def get_sender_from_email(email):
 
 
 def get_sender_email(sender_key):
-    """Get sender email from database"""
+    """Get sender email from the active senders"""
     try:
-        from .models import EmailSender
-        
-        # Get from database
-        try:
-            sender = EmailSender.objects.get(key=sender_key, is_active=True)
+        sender = sender_registry.get(sender_key)
+        if sender:
             return sender.email
-        except EmailSender.DoesNotExist:
-            # No fallback, return None if not found
-            logger.warning(f"No active sender found for key: {sender_key}")
-            return None
+        # No fallback, return None if not found
+        logger.warning(f"No active sender found for key: {sender_key}")
+        return None
         
     except Exception as e:
         logger.error(f"Error getting sender email for {sender_key}: {str(e)}")
@@ -91,19 +92,16 @@ def get_sender_email(sender_key):
 
 
 def get_sender_email_map():
-    """Get a mapping of sender keys to emails from database"""
+    """Get a mapping of sender keys to emails of the active senders"""
     try:
-        from .models import EmailSender
-        
-        # Get from database only
-        db_senders = EmailSender.objects.filter(is_active=True)
-        return {sender.key: sender.email for sender in db_senders}
+        return {sender.key: sender.email for sender in sender_registry.active()}
         
     except Exception as e:
         logger.error(f"Error getting sender email map: {str(e)}")
         return {}
 
 
+@read_from_replica
 def contacts_list(request):
     """View to display all contacts from CSV with their email status"""
     
@@ -182,24 +180,19 @@ def contacts_list(request):
             sender_email = first_sender.email
     
     # Import needed Django query tools
-    from django.db.models import OuterRef, Subquery, Case, When, Value, CharField
+    from django.db.models import Case, When, Value, CharField
     
-    # Subquery to get the most recent email event for each contact FROM THIS SENDER
-    latest_event_subquery = EmailEvent.objects.filter(
-        to_email=OuterRef('email'),
-        from_email__icontains=sender_email  # Use icontains to match sender format like "Name <email@domain.com>"
-    ).order_by('-created_at').values('event_type')[:1]
-    
-    # Subquery to get the latest event timestamp for activity tracking
-    latest_event_time_subquery = EmailEvent.objects.filter(
-        to_email=OuterRef('email'),
-        from_email__icontains=sender_email
-    ).order_by('-created_at').values('created_at')[:1]
+    # Status and activity of each contact FROM THIS SENDER, from the per-sender status table
+    contacts = ContactSenderStatus.annotate_contacts(
+        Contact.objects.all(), sender_email,
+        latest_event_type='latest_event_type',
+        last_email_sent='last_event_at',
+        last_opened='last_opened',
+        last_clicked='last_clicked'
+    )
     
     # Base queryset with annotations for email status
-    contacts = Contact.objects.annotate(
-        latest_event_type=Subquery(latest_event_subquery),
-        last_email_sent=Subquery(latest_event_time_subquery),
+    contacts = contacts.annotate(
         # Map event types to display status
         email_status=Case(
             When(latest_event_type='email.clicked', then=Value('clicked')),
@@ -226,24 +219,6 @@ def contacts_list(request):
         )
     )
     
-    # Add activity tracking annotations
-    contacts = contacts.annotate(
-        last_opened=Subquery(
-            EmailEvent.objects.filter(
-                to_email=OuterRef('email'),
-                from_email__icontains=sender_email,
-                event_type='email.opened'
-            ).order_by('-created_at').values('created_at')[:1]
-        ),
-        last_clicked=Subquery(
-            EmailEvent.objects.filter(
-                to_email=OuterRef('email'),
-                from_email__icontains=sender_email,
-                event_type='email.clicked'
-            ).order_by('-created_at').values('created_at')[:1]
-        )
-    )
-    
     # Filter by status if specified
     status_filter = request.GET.get('status')
     if status_filter and status_filter != 'all':
@@ -270,67 +245,48 @@ def contacts_list(request):
     if category_filter and category_filter != 'all':
         contacts = contacts.filter(category_id=category_filter)
     
-    # Search by name or email
+    # Search by name, email or company, on the full-text and trigram indexes
     search = request.GET.get('search')
     if search:
-        contacts = contacts.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search) |
-            Q(company_name__icontains=search)
-        )
+        contacts = search_contacts(contacts, search)
     
-    # Sorting
+    # Sorting, by the sort key and the ID for keyset pagination; searches
+    # show the best matches first unless sorted otherwise
     sort_by = request.GET.get('sort_by')
-    if sort_by == 'name_asc':
-        contacts = contacts.order_by('first_name', 'last_name')
-    elif sort_by == 'name_desc':
-        contacts = contacts.order_by('-first_name', '-last_name')
-    elif sort_by == 'id_asc':
-        contacts = contacts.order_by('id')
-    elif sort_by == 'id_desc':
-        contacts = contacts.order_by('-id')
-    elif sort_by == 'date_asc':
-        contacts = contacts.order_by('created_at')
-    elif sort_by == 'date_desc':
-        contacts = contacts.order_by('-created_at')
-    elif sort_by == 'email_asc':
-        contacts = contacts.order_by('email')
-    elif sort_by == 'email_desc':
-        contacts = contacts.order_by('-email')
-    else:
-        # Default ordering by creation date (newest first)
-        contacts = contacts.order_by('-created_at')
+    contacts, ordering = sort_contacts(contacts, sort_by or ('relevance' if search else None))
     
-    # Pagination
-    paginator = Paginator(contacts, 50)  # Show 50 contacts per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get status counts for the filter buttons based on actual email events FROM THIS SENDER
-    from django.db.models import OuterRef, Subquery, Count, Case, When, Value, CharField
+    # Pagination: 50 contacts after (or before) the cursor of the page we came from
+    try:
+        page_obj = keyset_page(
+            contacts, ordering, after=request.GET.get('after'), before=request.GET.get('before'), per_page=50
+        )
+    except ValueError:
+        page_obj = keyset_page(contacts, ordering, per_page=50)
     
-    # Subquery to get the most recent email event for each contact FROM THIS SENDER
-    latest_event_subquery = EmailEvent.objects.filter(
-        to_email=OuterRef('email'),
-        from_email__icontains=sender_email  # Use icontains to match sender format like "Name <email@domain.com>"
-    ).order_by('-created_at').values('event_type')[:1]
+    # Status counts for the filter buttons and category counts, FROM THIS SENDER,
+    # in one grouped query (cached until the next event or contact change)
+    histogram = sender_status_histogram(sender_email)
+    status_counts = {status: histogram[status] for status in [
+        'not_sent', 'sent', 'delivered', 'opened', 'clicked', 'bounced', 'complained', 'failed'
+    ]}
     
-    # Annotate all contacts with their latest event type from this sender
-    contacts_with_events = Contact.objects.annotate(
-        latest_event_type=Subquery(latest_event_subquery)
-    )
+    # Number of matching contacts from the cached counts, or the planner's estimate for searches
+    total_is_estimate = bool(search)
+    if search:
+        total_count = estimated_count(contacts)
+    else:
+        filtered_counts = histogram
+        if category_filter and category_filter != 'all':
+            filtered_counts = category_histogram(histogram, category_filter)
+        if status_filter in status_counts:
+            total_count = filtered_counts[status_filter]
+        else:
+            total_count = filtered_counts['total_contacts']
     
-    # Count contacts by their latest email event status from this sender
-    status_counts = {}
-    status_counts['not_sent'] = contacts_with_events.filter(latest_event_type__isnull=True).count()
-    status_counts['sent'] = contacts_with_events.filter(latest_event_type='email.sent').count()
-    status_counts['delivered'] = contacts_with_events.filter(latest_event_type='email.delivered').count()
-    status_counts['opened'] = contacts_with_events.filter(latest_event_type='email.opened').count()
-    status_counts['clicked'] = contacts_with_events.filter(latest_event_type='email.clicked').count()
-    status_counts['bounced'] = contacts_with_events.filter(latest_event_type='email.bounced').count()
-    status_counts['complained'] = contacts_with_events.filter(latest_event_type='email.complained').count()
-    status_counts['failed'] = contacts_with_events.filter(latest_event_type='email.failed').count()
+    # Current filters for the page links
+    page_query = request.GET.copy()
+    for param in ('after', 'before', 'page'):
+        page_query.pop(param, None)
     
     # Status choices for the filter buttons
     status_choices = [
@@ -344,20 +300,21 @@ def contacts_list(request):
         ('failed', 'Failed'),
     ]
     
-    # Get all distinct categories for filtering with counts
-    categories = []
-    distinct_categories = Contact.objects.values('category_id', 'category_name').distinct().order_by('category_id')
-    for category in distinct_categories:
-        cat_id = category['category_id']
-        count = Contact.objects.filter(category_id=cat_id).count()
-        categories.append({
+    # All categories for filtering with counts
+    categories = [
+        {
             'category_id': cat_id,
             'category_name': category['category_name'],
-            'count': count
-        })
-    
+            'count': category['total_contacts']
+        }
+        for cat_id, category in histogram['categories'].items()
+    ]
+
     context = {
         'page_obj': page_obj,
+        'total_count': total_count,
+        'total_is_estimate': total_is_estimate,
+        'page_query': page_query.urlencode(),
         'status_counts': status_counts,
         'status_choices': status_choices,
         'categories': categories,
@@ -388,161 +345,169 @@ def contact_email_content_api(request):
         if not sender_email:
             return JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
         
-        # Import needed Django query tools
-        from django.db.models import OuterRef, Subquery, Case, When, Value, CharField
-        
-        # Subquery to get the most recent email event for this contact FROM THIS SENDER
-        latest_event_subquery = EmailEvent.objects.filter(
-            to_email=OuterRef('email'),
-            from_email__icontains=sender_email
-        ).order_by('-created_at').values('event_type')[:1]
-        
-        # Get the contact with proper annotations
-        contact = Contact.objects.annotate(
-            latest_event_type=Subquery(latest_event_subquery),
-            # Human-readable display status
-            display_status=Case(
-                When(latest_event_type='email.clicked', then=Value('Clicked')),
-                When(latest_event_type='email.opened', then=Value('Opened')),
-                When(latest_event_type='email.delivered', then=Value('Delivered')),
-                When(latest_event_type='email.sent', then=Value('Sent')),
-                When(latest_event_type='email.bounced', then=Value('Bounced')),
-                When(latest_event_type='email.complained', then=Value('Complained')),
-                When(latest_event_type='email.failed', then=Value('Failed')),
-                default=Value('Not Sent'),
-                output_field=CharField()
-            )
-        ).filter(email=email).first()
-        
+        # Get the contact with its latest status FROM THIS SENDER
+        contact = _contact_with_display_status(email, sender_email).first()
         if not contact:
             return JsonResponse({'error': 'Contact not found'}, status=404)
         
         # Find the last 3 email events for this contact FROM THIS SENDER (all event types)
-        recent_events = EmailEvent.objects.filter(
-            to_email=email,
-            from_email__icontains=sender_email
-        ).order_by('-created_at')[:3]
-        
+        recent_events = list(_recent_contact_events(email, sender_email))
         if not recent_events:
             return JsonResponse({'error': 'No email events found for this contact from this sender'}, status=404)
         
-        # Get the most recent event for the main email content (prioritize events with email_id)
-        most_recent_event = None
-        for event in recent_events:
-            if event.email_id:  # Prioritize events that have email content
-                most_recent_event = event
-                break
-        
-        # If no event has email_id, use the most recent one anyway
-        if not most_recent_event:
-            most_recent_event = recent_events[0]
-        email_id = most_recent_event.email_id
-        if not email_id:
+        most_recent_event = _content_event(recent_events)
+        if not most_recent_event.email_id:
             # If no email_id, we can still show the events history without email content
-            response_data = {
-                'to_email': email,
-                'subject': 'No email content available',
-                'sent_date': most_recent_event.created_at.isoformat(),
-                'status': contact.display_status,
-                'html_content': None,
-                'text_content': None,
-                'event_type': most_recent_event.event_type,
-                'email_id': None,
-                'recent_events': [
-                    {
-                        'event_type': event.event_type,
-                        'created_at': event.created_at.isoformat(),
-                        'email_id': event.email_id,
-                        'event_id': event.event_id,
-                        'to_email': event.to_email,
-                        'click_url': getattr(event, 'click_url', None),
-                        'bounce_reason': getattr(event, 'bounce_reason', None),
-                        'complaint_feedback_type': getattr(event, 'complaint_feedback_type', None)
-                    } for event in recent_events
-                ]
-            }
-            return JsonResponse(response_data)
+            return _email_content_response(email, contact, recent_events, most_recent_event)
         
-        # Fetch email content from Resend API
-        import requests
-        import os
+        # Use the API key of the sender the event was linked to when it was received
+        sender_obj, error = _content_sender(most_recent_event)
+        if error:
+            return error
         
-        # Determine which API key to use based on the sender
-        # First try to get the sender from the recent event
-        from_email_raw = most_recent_event.from_email if most_recent_event.from_email else ''
+        # Use Resend's emails API to get email details, over the sender's pooled connection
+        from .provider import get_resend_client
+        response = get_resend_client(sender_obj.key, sender_obj.api_key).get_email(most_recent_event.email_id)
+        return _email_content_response(email, contact, recent_events, most_recent_event, response)
         
-        # Extract just the email address from the sender string
-        from_email = extract_email_from_sender_string(from_email_raw)
+    except Exception as e:
+        return JsonResponse({'error': f'Failed to retrieve email content: {str(e)}'}, status=500)
+
+
+async def async_contact_email_content_api(request):
+    """contact_email_content_api() on the event loop, fetching the content with the async Resend client"""
+    email = request.GET.get('email')
+    if not email:
+        return JsonResponse({'error': 'Email parameter is required'}, status=400)
+    
+    try:
+        sender = request.GET.get('sender')
+        if not sender:
+            return JsonResponse({'error': 'Sender parameter is required'}, status=400)
         
-        # Get the appropriate API key from database
-        resend_api_key = None
-        sender_obj = None
+        sender_obj = await sender_registry.aget(sender)
+        if not sender_obj:
+            return JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
+        sender_email = sender_obj.email
         
-        if from_email:
-            try:
-                sender_obj = EmailSender.objects.get(email=from_email, is_active=True)
-                resend_api_key = sender_obj.api_key
-            except EmailSender.DoesNotExist:
-                pass
+        contact = await _contact_with_display_status(email, sender_email).afirst()
+        if not contact:
+            return JsonResponse({'error': 'Contact not found'}, status=404)
         
-        if not resend_api_key:
-            return JsonResponse({'error': f'Resend API key not configured for sender: {from_email}'}, status=500)
+        recent_events = [event async for event in _recent_contact_events(email, sender_email)]
+        if not recent_events:
+            return JsonResponse({'error': 'No email events found for this contact from this sender'}, status=404)
         
-        # Make request to Resend API to get email content
-        headers = {
-            'Authorization': f'Bearer {resend_api_key}',
-            'Content-Type': 'application/json'
-        }
+        most_recent_event = _content_event(recent_events)
+        if not most_recent_event.email_id:
+            return _email_content_response(email, contact, recent_events, most_recent_event)
         
-        # Use Resend's emails API to get email details
-        resend_url = f'https://api.resend.com/emails/{email_id}'
-        response = requests.get(resend_url, headers=headers)
+        sender_obj, error = _content_sender(most_recent_event)
+        if error:
+            return error
         
-        if response.status_code == 200:
-            email_data = response.json()
-            
-            # Extract content from Resend API response
-            html_content = email_data.get('html')
-            text_content = email_data.get('text')
-            subject = email_data.get('subject')
-            sent_date = email_data.get('created_at')
-            
-            # Format the response
-            response_data = {
-                'to_email': email,
-                'subject': subject or 'No subject',
-                'sent_date': sent_date,
-                'status': contact.display_status,
-                'html_content': html_content,
-                'text_content': text_content,
-                'event_type': most_recent_event.event_type,
-                'email_id': email_id,
-                'recent_events': [
-                    {
-                        'event_type': event.event_type,
-                        'created_at': event.created_at.isoformat(),
-                        'email_id': event.email_id,
-                        'event_id': event.event_id,
-                        'to_email': event.to_email,
-                        'click_url': getattr(event, 'click_url', None),
-                        'bounce_reason': getattr(event, 'bounce_reason', None),
-                        'complaint_feedback_type': getattr(event, 'complaint_feedback_type', None)
-                    } for event in recent_events
-                ]
-            }
-            
-            return JsonResponse(response_data)
-        else:
-            return JsonResponse({
-                'error': f'Failed to fetch email from Resend API: {response.status_code} - {response.text}'
-            }, status=500)
+        from .provider import get_async_resend_client
+        response = await get_async_resend_client(sender_obj.key, sender_obj.api_key).get_email(most_recent_event.email_id)
+        return _email_content_response(email, contact, recent_events, most_recent_event, response)
         
-    except Contact.DoesNotExist:
-        return JsonResponse({'error': 'Contact not found'}, status=404)
     except Exception as e:
         return JsonResponse({'error': f'Failed to retrieve email content: {str(e)}'}, status=500)
 
 
+def _contact_with_display_status(email, sender_email):
+    """Contacts with this address, annotated with their latest status from the sender"""
+    from django.db.models import Case, When, Value, CharField
+    
+    return ContactSenderStatus.annotate_contacts(
+        Contact.objects.all(), sender_email, latest_event_type='latest_event_type'
+    ).annotate(
+        # Human-readable display status
+        display_status=Case(
+            When(latest_event_type='email.clicked', then=Value('Clicked')),
+            When(latest_event_type='email.opened', then=Value('Opened')),
+            When(latest_event_type='email.delivered', then=Value('Delivered')),
+            When(latest_event_type='email.sent', then=Value('Sent')),
+            When(latest_event_type='email.bounced', then=Value('Bounced')),
+            When(latest_event_type='email.complained', then=Value('Complained')),
+            When(latest_event_type='email.failed', then=Value('Failed')),
+            default=Value('Not Sent'),
+            output_field=CharField()
+        )
+    ).filter(email=email)
+
+
+def _recent_contact_events(email, sender_email):
+    """The last 3 email events for a contact from the sender"""
+    return EmailEvent.from_sender(sender_email).filter(
+        to_email=email
+    ).select_related('sender').order_by('-created_at')[:3]
+
+
+def _content_event(recent_events):
+    """The most recent event, preferring events with email content (an email_id)"""
+    for event in recent_events:
+        if event.email_id:
+            return event
+    return recent_events[0]
+
+
+def _content_sender(event):
+    """(sender whose API key reads the event's email, None) or (None, error response)"""
+    sender_obj = event.sender
+    if sender_obj and sender_obj.is_active and sender_obj.api_key:
+        return sender_obj, None
+    from_email = extract_email_from_sender_string(event.from_email or '')
+    return None, JsonResponse({'error': f'Resend API key not configured for sender: {from_email}'}, status=500)
+
+
+def _email_content_response(email, contact, recent_events, most_recent_event, response=None):
+    """The contact email content payload, from the Resend API response when there is one"""
+    if response is not None and response.status_code != 200:
+        return JsonResponse({
+            'error': f'Failed to fetch email from Resend API: {response.status_code} - {response.text}'
+        }, status=500)
+    
+    if response is None:
+        content = {
+            'subject': 'No email content available',
+            'sent_date': most_recent_event.created_at.isoformat(),
+            'html_content': None,
+            'text_content': None,
+        }
+    else:
+        # Extract content from Resend API response
+        email_data = response.json()
+        content = {
+            'subject': email_data.get('subject') or 'No subject',
+            'sent_date': email_data.get('created_at'),
+            'html_content': email_data.get('html'),
+            'text_content': email_data.get('text'),
+        }
+    
+    return JsonResponse({
+        'to_email': email,
+        'subject': content['subject'],
+        'sent_date': content['sent_date'],
+        'status': contact.display_status,
+        'html_content': content['html_content'],
+        'text_content': content['text_content'],
+        'event_type': most_recent_event.event_type,
+        'email_id': most_recent_event.email_id,
+        'recent_events': [
+            {
+                'event_type': event.event_type,
+                'created_at': event.created_at.isoformat(),
+                'email_id': event.email_id,
+                'event_id': event.event_id,
+                'to_email': event.to_email,
+                'click_url': getattr(event, 'click_url', None),
+                'bounce_reason': getattr(event, 'bounce_reason', None),
+                'complaint_feedback_type': getattr(event, 'complaint_feedback_type', None)
+            } for event in recent_events
+        ]
+    })
+
+
 def email_content_by_id_api(request):
     """API endpoint to get email content by email_id directly"""
     email_id = request.GET.get('email_id')
@@ -562,31 +527,26 @@ def email_content_by_id_api(request):
             return JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
         
         # Find the email event with this email_id
-        email_event = EmailEvent.objects.filter(
-            email_id=email_id,
-            from_email__icontains=sender_email
-        ).first()
+        email_event = EmailEvent.from_sender(sender_email).filter(
+            email_id=email_id
+        ).select_related('sender').first()
         
         if not email_event:
             return JsonResponse({'error': 'Email event not found for this sender'}, status=404)
         
-        # Get API key from database
+        # Use the API key of the sender the event was linked to when it was received
+        from_email = extract_email_from_sender_string(email_event.from_email or '')
         resend_api_key = None
-        if email_event.from_email:
-            # Extract email address from sender string
-            from_email = extract_email_from_sender_string(email_event.from_email)
-            
-            try:
-                sender_obj = EmailSender.objects.get(email=from_email, is_active=True)
-                resend_api_key = sender_obj.api_key
-            except EmailSender.DoesNotExist:
-                pass
+        sender_obj = email_event.sender
+        if sender_obj and sender_obj.is_active:
+            resend_api_key = sender_obj.api_key
                 
         # Fallback to any active sender if no specific match
         if not resend_api_key:
             try:
-                fallback_sender = EmailSender.objects.filter(is_active=True).first()
+                fallback_sender = next(iter(sender_registry.active()), None)
                 if fallback_sender:
+                    sender_obj = fallback_sender
                     resend_api_key = fallback_sender.api_key
             except Exception as e:
                 pass
@@ -594,14 +554,9 @@ def email_content_by_id_api(request):
         if not resend_api_key:
             return JsonResponse({'error': f'Resend API key not configured for sender: {from_email}'}, status=500)
         
-        # Make request to Resend API to get email content
-        headers = {
-            'Authorization': f'Bearer {resend_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        resend_url = f'https://api.resend.com/emails/{email_id}'
-        response = requests.get(resend_url, headers=headers)
+        # Make request to Resend API to get email content, over the sender's pooled connection
+        from .provider import get_resend_client
+        response = get_resend_client(sender_obj.key, resend_api_key).get_email(email_id)
         
         if response.status_code == 200:
             email_data = response.json()
@@ -630,173 +585,144 @@ def webhook_handler_view(request, endpoint):
     Generic webhook endpoint that determines sender from webhook URL path
     URL: sender.horizoneurope.io/webhook/<endpoint>/
     """
-    from .models import EmailSender
-    
-    logger.info(f"Webhook received for endpoint: {endpoint}")
-    
     # Find sender where webhook_url ends with '/webhook<endpoint>/'
-    try:
-        sender = EmailSender.objects.get(
-            webhook_url__endswith=f'/webhook{endpoint}/',
-            is_active=True
-        )
-        logger.info(f"Found sender {sender.key} for endpoint {endpoint}")
-        return webhook_handler(request, sender.key)
-    except EmailSender.DoesNotExist:
+    senders = sender_registry.by_endpoint(endpoint)
+    sender_key, error = _endpoint_sender_key(endpoint, senders, [] if senders else sender_registry.active())
+    if error:
+        return error
+    return webhook_handler(request, sender_key)
+
+
+async def async_webhook_handler_view(request, endpoint):
+    """webhook_handler_view() served on the event loop under ASGI"""
+    senders = await sender_registry.aby_endpoint(endpoint)
+    sender_key, error = _endpoint_sender_key(endpoint, senders, [] if senders else await sender_registry.aactive())
+    if error:
+        return error
+    return await async_webhook_handler(request, sender_key)
+
+
+def _endpoint_sender_key(endpoint, senders, active_senders):
+    """(key of the one sender of an endpoint, None) or (None, error response)"""
+    if not senders:
         logger.error(f"No active sender found for webhook endpoint: {endpoint}")
         # Log all webhook URLs for debugging
-        all_senders = EmailSender.objects.filter(is_active=True)
-        for s in all_senders:
+        for s in active_senders:
             logger.error(f"Sender {s.key}: webhook_url = {s.webhook_url}")
-        return HttpResponse("Invalid endpoint", status=400)
-    except EmailSender.MultipleObjectsReturned:
+        return None, HttpResponse("Invalid endpoint", status=400)
+    if len(senders) > 1:
         logger.error(f"Multiple senders found for webhook endpoint: {endpoint}")
-        return HttpResponse("Ambiguous endpoint", status=400)
+        return None, HttpResponse("Ambiguous endpoint", status=400)
+    return senders[0].key, None
+
 
 def webhook_handler(request, sender_key):
     """
     Common webhook handler for all sender configurations
     """
     try:
-        # Get sender configuration from database
-        try:
-            from .models import EmailSender
-            sender_obj = EmailSender.objects.get(key=sender_key, is_active=True)
-            webhook_secret = sender_obj.webhook_secret
-        except EmailSender.DoesNotExist:
+        # Get the sender's decoded signing key from the active senders
+        if sender_registry.get(sender_key):
+            webhook_key = sender_registry.webhook_key(sender_key)
+        else:
             # Fallback to settings if not in database
-            email_senders = getattr(settings, 'EMAIL_SENDERS', {})
-            if sender_key not in email_senders:
-                logger.error(f"Invalid sender key: {sender_key}")
-                return HttpResponse("Invalid sender key", status=400)
-            
-            sender_config = email_senders[sender_key]
-            webhook_secret = sender_config.get('webhook_secret')
-        
-        if not webhook_secret:
-            logger.error(f"No webhook secret configured for sender: {sender_key}")
-            return HttpResponse("No webhook secret configured", status=400)
-        
-        # Verify webhook signature
-        if not verify_webhook_signature(request, webhook_secret):
-            logger.error(f"Invalid webhook signature for sender: {sender_key}")
-            return HttpResponse("Invalid signature", status=403)
-        
-        # Parse webhook payload
-        raw_body = request.body.decode('utf-8')
-        payload = json.loads(raw_body)
-        
-        # Log the full payload for debugging
-        logger.info(f"✅ WEBHOOK: Received payload for {sender_key}: {payload}")
-        print(f"✅ WEBHOOK: Received payload for {sender_key}: {payload}")
-        
-        event_type = payload.get('type')
-        data = payload.get('data', {})
-        
-        # Extract event_id - Resend sends email_id in data object, not top-level id
-        event_id = data.get('email_id', '') or payload.get('id', '')
-        
-        # Extract common fields
-        event_data = {
-            'event_id': event_id,
-            'event_type': event_type,
-            'created_at': timezone.now(),  # Use current time if not provided
-            'raw_data': payload,
-        }
-        
-        # Extract event-specific data based on type
-        if event_type and event_type.startswith('email.'):
-            email_data = data
-            event_data.update({
-                'email_id': email_data.get('email_id'),
-                'from_email': email_data.get('from'),
-                'to_email': None,  # Will extract safely below
-                'subject': email_data.get('subject'),
-            })
-            
-            # Safely extract to_email
-            to_field = email_data.get('to')
-            if to_field:
-                if isinstance(to_field, list) and len(to_field) > 0:
-                    # Handle array format: ["email@example.com"] or [{"email": "email@example.com"}]
-                    first_recipient = to_field[0]
-                    if isinstance(first_recipient, dict):
-                        event_data['to_email'] = first_recipient.get('email')
-                    else:
-                        event_data['to_email'] = str(first_recipient)
-                elif isinstance(to_field, str):
-                    event_data['to_email'] = to_field
-            
-            # Event-specific fields based on Resend webhook documentation
-            if event_type == 'email.clicked':
-                click_data = email_data.get('click', {})
-                if isinstance(click_data, dict):
-                    event_data['click_url'] = click_data.get('link')  # Resend uses 'link' not 'url'
-                    
-            elif event_type == 'email.bounced':
-                bounce_data = email_data.get('bounce', {})
-                if isinstance(bounce_data, dict):
-                    # Combine bounce type, subType and message for full context
-                    bounce_parts = []
-                    if bounce_data.get('type'):
-                        bounce_parts.append(f"Type: {bounce_data['type']}")
-                    if bounce_data.get('subType'):
-                        bounce_parts.append(f"SubType: {bounce_data['subType']}")
-                    if bounce_data.get('message'):
-                        bounce_parts.append(f"Message: {bounce_data['message']}")
-                    event_data['bounce_reason'] = ' | '.join(bounce_parts) if bounce_parts else None
-                    
-            elif event_type == 'email.complained':
-                # For complaints, Resend doesn't seem to provide specific feedback_type in their docs
-                # So we'll just mark it as a complaint
-                event_data['complaint_feedback_type'] = 'spam'
-                
-            elif event_type == 'email.failed':
-                failed_data = email_data.get('failed', {})
-                if isinstance(failed_data, dict):
-                    event_data['bounce_reason'] = failed_data.get('reason')  # Reuse bounce_reason field for failed reason
+            webhook_key = _static_webhook_key(sender_key)
         
-        # Create event record (allow duplicates)
-        event = EmailEvent.objects.create(**event_data)
+        payload, error = _verified_webhook_payload(request, sender_key, webhook_key)
+        if error:
+            return error
         
-        print(f"✅ EMAIL EVENT: Created {event_type} event for {event_data.get('to_email')} with ID {event_id}")
+        # Queue it and answer right away; the drainer stores the event and
+        # updates statuses, rollups and stats in batches. Retries are only acknowledged.
+        delivery_id = request.headers.get('svix-id')
+        queued = queue_delivery(sender_key, delivery_id, payload)
+        return _webhook_ack(request, sender_key, delivery_id, payload, queued)
         
-        # Update contact status based on email event
-        if event_data.get('to_email'):
-            try:
-                contact = Contact.objects.filter(email=event_data['to_email']).first()
-                if contact:
-                    print(f"✅ CONTACT: Found contact {contact.full_name} ({contact.email})")
-                else:
-                    print(f"⚠️ CONTACT: No contact found for email {event_data.get('to_email')}")
-                
-                # Note: We no longer update contact status since contacts are independent entities
-                # Email status is tracked through EmailEvent objects, not on the contact itself
-                # This allows one contact to have multiple email statuses from different senders
-                
-            except Exception as e:
-                # Handle any other database issues
-                print(f"❌ CONTACT ERROR: {str(e)} for email {event_data.get('to_email')}")
-                pass
+    except Exception as e:
+        logger.error(f"Webhook processing error: {str(e)}")
+        return HttpResponse(f"Error processing webhook: {str(e)}", status=500)
+
+
+async def async_webhook_handler(request, sender_key):
+    """webhook_handler() served on the event loop; only the queue insert leaves it"""
+    try:
+        if await sender_registry.aget(sender_key):
+            webhook_key = await sender_registry.awebhook_key(sender_key)
+        else:
+            webhook_key = _static_webhook_key(sender_key)
         
-        logger.info(f"New webhook event: {event_type} for {event_data.get('to_email')}")
+        payload, error = _verified_webhook_payload(request, sender_key, webhook_key)
+        if error:
+            return error
         
-        return JsonResponse({
-            'status': 'success',
-            'event_id': event_data['event_id'],
-            'created': True
-        })
+        delivery_id = request.headers.get('svix-id')
+        queued = await aqueue_delivery(sender_key, delivery_id, payload)
+        return _webhook_ack(request, sender_key, delivery_id, payload, queued)
         
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in webhook payload")
-        return HttpResponse("Invalid JSON", status=400)
     except Exception as e:
         logger.error(f"Webhook processing error: {str(e)}")
         return HttpResponse(f"Error processing webhook: {str(e)}", status=500)
 
 
-def verify_webhook_signature(request, signing_secret):
-    """Verify Resend webhook signature using Svix format"""
+def _static_webhook_key(sender_key):
+    """Decoded signing key of a sender in settings.EMAIL_SENDERS, False for an unknown sender"""
+    email_senders = getattr(settings, 'EMAIL_SENDERS', {})
+    if sender_key not in email_senders:
+        return False
+    return decode_webhook_secret(email_senders[sender_key].get('webhook_secret'))
+
+
+def _verified_webhook_payload(request, sender_key, webhook_key):
+    """(payload, None) of a correctly signed webhook, or (None, error response)"""
+    if webhook_key is False:
+        logger.error(f"Invalid sender key: {sender_key}")
+        return None, HttpResponse("Invalid sender key", status=400)
+    
+    if not webhook_key:
+        logger.error(f"No webhook secret configured for sender: {sender_key}")
+        return None, HttpResponse("No webhook secret configured", status=400)
+    
+    # Verify webhook signature
+    if not verify_webhook_signature(request, webhook_key):
+        logger.error(f"Invalid webhook signature for sender: {sender_key}")
+        return None, HttpResponse("Invalid signature", status=403)
+    
+    # Parse webhook payload
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in webhook payload")
+        return None, HttpResponse("Invalid JSON", status=400)
+    if not isinstance(payload, dict) or not payload.get('type'):
+        return None, HttpResponse("Invalid payload", status=400)
+    return payload, None
+
+
+def _webhook_ack(request, sender_key, delivery_id, payload, queued):
+    if queued and getattr(settings, 'WEBHOOK_INLINE_DRAIN', True):
+        schedule_inline_drain()
+    
+    # Fields of the request's sampled log record (see RequestLogMiddleware); the
+    # payload is only written with LOG_PAYLOADS on
+    if hasattr(request, 'log_extra'):
+        request.log_extra.update({
+            'sender': sender_key,
+            'event_type': payload.get('type'),
+            'delivery_id': delivery_id,
+            'duplicate': not queued,
+            'payload': payload,
+        })
+    
+    return JsonResponse({
+        'status': 'success',
+        'event_id': payload.get('data', {}).get('email_id', '') or payload.get('id', ''),
+        'queued': queued,
+        'duplicate': not queued
+    })
+
+
+def verify_webhook_signature(request, signing_key):
+    """Verify Resend webhook signature using Svix format, signing_key is the decoded secret (see decode_webhook_secret)"""
     try:
         # Resend uses Svix for webhooks, so check for svix headers
         svix_id = request.headers.get('svix-id')
@@ -804,63 +730,40 @@ def verify_webhook_signature(request, signing_secret):
         svix_signature = request.headers.get('svix-signature')
         
         if not all([svix_id, svix_timestamp, svix_signature]):
-            logger.error("Missing svix headers - found headers: " + str(dict(request.headers)))
+            logger.error("Missing svix headers", extra={'payload': dict(request.headers)})
             return False
         
-        # Log signature details for debugging (minimal logging)
-        logger.debug(f"Svix ID: {svix_id}")
-        logger.debug(f"Svix Timestamp: {svix_timestamp}")
-        logger.debug(f"Webhook secret: {signing_secret[:10]}...") # Only log first 10 chars for security
-        
-        # Remove the whsec_ prefix from the signing secret if present
-        if signing_secret.startswith('whsec_'):
-            secret_key = signing_secret[6:]  # Remove 'whsec_' prefix
-        else:
-            secret_key = signing_secret
-        
-        logger.debug(f"Secret key after prefix removal: {secret_key[:10]}...") # Only log first 10 chars
-        
         # Create the signed payload using Svix format
         # Format: {id}.{timestamp}.{payload}
         payload = request.body.decode('utf-8')
         signed_payload = f"{svix_id}.{svix_timestamp}.{payload}"
         
-        logger.debug(f"Signed payload length: {len(signed_payload)} chars")
-        
         # Create expected signature using base64 encoding (Svix standard)
-        import base64
         expected_signature = base64.b64encode(
             hmac.new(
-                base64.b64decode(secret_key.encode('utf-8')),
+                signing_key,
                 signed_payload.encode('utf-8'),
                 hashlib.sha256
             ).digest()
         ).decode('utf-8')
         
-        logger.debug(f"Expected signature: v1,{expected_signature[:10]}...") # Only log first 10 chars
-        
         # Extract the signature from the svix-signature header (format: v1,signature)
         if ',' in svix_signature:
             version, signature = svix_signature.split(',', 1)
             if version == 'v1':
-                result = hmac.compare_digest(signature, expected_signature)
-                logger.debug(f"Signature match: {result}")
-                return result
+                return hmac.compare_digest(signature, expected_signature)
         
         logger.error(f"Invalid signature format: {svix_signature}")
         return False
         
     except Exception as e:
-        logger.error(f"Signature verification error: {str(e)}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Signature verification error: {str(e)}")
         return False
 
 
+@read_from_replica
 def contact_stats_api(request):
     """API endpoint to get contact statistics filtered by sender and optionally by category"""
-    from django.db.models import Subquery, OuterRef
-    
     try:
         # Get sender parameter from request
         sender = request.GET.get('sender')
@@ -879,18 +782,17 @@ def contact_stats_api(request):
         # Debug: Let's see what emails have been sent by each sender
         debug_mode = request.GET.get('debug', 'false').lower() == 'true'
         if debug_mode:
-            # Get unique sender emails from EmailEvents
-            email_events_senders = EmailEvent.objects.values_list('from_email', flat=True).distinct()
-            sender_event_counts = {}
-            for event_sender in email_events_senders:
-                if event_sender:  # Skip None values
-                    count = EmailEvent.objects.filter(from_email__icontains=event_sender).count()
-                    sender_event_counts[event_sender] = count
+            # Count events per linked sender in one grouped query
+            from django.db.models import Count
+            sender_event_counts = {
+                row['sender__key'] or 'unlinked': row['count']
+                for row in EmailEvent.objects.order_by().values('sender__key').annotate(count=Count('id'))
+            }
             
             # Get contacts that have been emailed by this sender
-            contacted_emails = EmailEvent.objects.filter(
-                from_email__icontains=sender_email
-            ).values_list('to_email', flat=True).distinct()
+            contacted_emails = EmailEvent.from_sender(sender_email).order_by().values_list(
+                'to_email', flat=True
+            ).distinct()
             
             return JsonResponse({
                 'debug': True,
@@ -902,70 +804,114 @@ def contact_stats_api(request):
                 'total_email_events': EmailEvent.objects.count()
             })
         
-        # Get ALL contacts (contacts are independent of senders)
-        sender_contacts = Contact.objects.all()
-        
-        # Apply category filter if specified
-        if category_filter:
-            sender_contacts = sender_contacts.filter(category_id=category_filter)
-        
-        total_contacts = sender_contacts.count()
-        
-        # Count contacts by their LATEST email status using EmailEvent records
-        # Note: EmailEvent.from_email may contain full sender format like "Name <email@domain.com>"
-        # so we need to use icontains to match the email part
-        
-        from django.db.models import Subquery
-        
-        # Get the most recent email event for each contact from this sender
-        latest_event_subquery = EmailEvent.objects.filter(
-            to_email=OuterRef('email'),
-            from_email__icontains=sender_email
-        ).order_by('-created_at').values('event_type')[:1]
+        # Count ALL contacts (contacts are independent of senders) by their LATEST email
+        # status from this sender, in total and per category (cached until the next
+        # event from this sender or contact change)
+        histogram = sender_status_histogram(sender_email)
+        return contact_stats_response(histogram, sender, sender_email, category_filter)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def stats_cache_api(request):
+    """API endpoint with the hit/miss counters of the contact stats cache (this process)"""
+    return JsonResponse(stats_cache_info())
+
+
+@read_from_replica
+def event_timeseries_api(request):
+    """API endpoint with email event counts per hour or day for a sender, from the rollups"""
+    try:
+        sender = request.GET.get('sender')
+        params, error = _timeseries_params(request, get_sender_email(sender) if sender else None)
+        if error:
+            return error
         
-        # Annotate contacts with their latest event type from this sender
-        contacts_with_latest_event = sender_contacts.annotate(
-            latest_event_type=Subquery(latest_event_subquery)
+        series = EmailEventRollup.series(
+            params['sender_email'], params['granularity'], params['start'],
+            category_id=params['category_id'], campaign_id=params['campaign_id']
         )
-        
-        # Count contacts based on their latest email event type
-        not_sent_count = contacts_with_latest_event.filter(latest_event_type__isnull=True).count()
-        sent_count = contacts_with_latest_event.filter(latest_event_type='email.sent').count()
-        delivered_count = contacts_with_latest_event.filter(latest_event_type='email.delivered').count()
-        opened_count = contacts_with_latest_event.filter(latest_event_type='email.opened').count()
-        clicked_count = contacts_with_latest_event.filter(latest_event_type='email.clicked').count()
-        bounced_count = contacts_with_latest_event.filter(latest_event_type='email.bounced').count()
-        failed_count = contacts_with_latest_event.filter(latest_event_type='email.failed').count()
-        complained_count = contacts_with_latest_event.filter(latest_event_type='email.complained').count()
-        
-        # Prepare category text for explanations
-        category_text = f' in category "{category_filter}"' if category_filter else ''
-        
-        stats = {
-            'total_contacts': total_contacts,
-            'total_email_events': contacts_with_latest_event.exclude(latest_event_type__isnull=True).count(),
-            'not_sent': not_sent_count,
-            'sent': sent_count,
-            'delivered': delivered_count,
-            'opened': opened_count,
-            'clicked': clicked_count,
-            'bounced': bounced_count,
-            'complained': complained_count,
-            'failed': failed_count,
-            'sender': sender,
-            'sender_email': sender_email,
-            'category_filter': category_filter,
-            'stats_explanation': {
-                'total_contacts': f'Total number of contact records{category_text} (shared across all senders)',
-                'total_email_events': f'Number of contacts{category_text} with email events from this sender',
-                'status_counts': f'Contact counts{category_text} based on their latest email status from this sender only'
-            }
-        }
-        return JsonResponse(stats)
+        return _timeseries_response(params, series)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@read_from_replica
+async def async_event_timeseries_api(request):
+    """event_timeseries_api() on the event loop"""
+    try:
+        sender_obj = await sender_registry.aget(request.GET.get('sender'))
+        params, error = _timeseries_params(request, sender_obj.email if sender_obj else None)
+        if error:
+            return error
+        
+        series = await EmailEventRollup.aseries(
+            params['sender_email'], params['granularity'], params['start'],
+            category_id=params['category_id'], campaign_id=params['campaign_id']
+        )
+        return _timeseries_response(params, series)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _timeseries_params(request, sender_email):
+    """(validated query parameters, None) of a time series request, or (None, error response)"""
+    sender = request.GET.get('sender')
+    if not sender:
+        return None, JsonResponse({'error': 'Sender parameter is required'}, status=400)
+    
+    if not sender_email:
+        return None, JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
+    
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in dict(EmailEventRollup.GRANULARITIES):
+        return None, JsonResponse({'error': 'Granularity must be "hour" or "day"'}, status=400)
+    
+    # Up to 90 days of days, or 7 days of hours
+    max_days = 90 if granularity == 'day' else 7
+    try:
+        days = max(1, min(max_days, int(request.GET.get('days', 30 if granularity == 'day' else 2))))
+    except ValueError:
+        return None, JsonResponse({'error': 'Days must be a number'}, status=400)
+    
+    category_filter = request.GET.get('category')
+    campaign_filter = request.GET.get('campaign')
+    if campaign_filter and not campaign_filter.isdigit():
+        return None, JsonResponse({'error': 'Campaign must be a campaign ID'}, status=400)
+    
+    from datetime import timedelta
+    return {
+        'sender': sender,
+        'sender_email': sender_email,
+        'granularity': granularity,
+        'days': days,
+        'start': timezone.now() - timedelta(days=days),
+        'category_filter': category_filter,
+        'campaign_filter': campaign_filter,
+        'category_id': category_filter or None,
+        'campaign_id': int(campaign_filter) if campaign_filter else None,
+    }, None
+
+
+def _timeseries_response(params, series):
+    return JsonResponse({
+        'sender': params['sender'],
+        'sender_email': params['sender_email'],
+        'granularity': params['granularity'],
+        'days': params['days'],
+        'category_filter': params['category_filter'],
+        'campaign_filter': params['campaign_filter'],
+        'series': [
+            {
+                'bucket': point.pop('bucket').isoformat(),
+                **{event_type.replace('email.', ''): count for event_type, count in point.items()}
+            }
+            for point in series
+        ]
+    })
+
+
+@read_from_replica
 def contacts_api(request):
     """API endpoint to get contacts list for custom selection filtered by sender"""
     try:
@@ -982,17 +928,12 @@ def contacts_api(request):
             return JsonResponse({'error': f'Sender "{sender}" not found or not active'}, status=400)
         
         # Import needed Django query tools
-        from django.db.models import OuterRef, Subquery, Case, When, Value, CharField
-        
-        # Subquery to get the most recent email event for each contact FROM THIS SENDER
-        latest_event_subquery = EmailEvent.objects.filter(
-            to_email=OuterRef('email'),
-            from_email__icontains=sender_email  # Use icontains to match sender format like "Name <email@domain.com>"
-        ).order_by('-created_at').values('event_type')[:1]
+        from django.db.models import Case, When, Value, CharField
         
-        # Get contacts with email status annotations based on latest email events
-        contacts = Contact.objects.annotate(
-            latest_event_type=Subquery(latest_event_subquery),
+        # Get contacts with email status annotations from their latest status FROM THIS SENDER
+        contacts = ContactSenderStatus.annotate_contacts(
+            Contact.objects.all(), sender_email, latest_event_type='latest_event_type'
+        ).annotate(
             # Map event types to display status
             email_status=Case(
                 When(latest_event_type='email.clicked', then=Value('clicked')),
@@ -1005,19 +946,55 @@ def contacts_api(request):
                 default=Value('not_sent'),
                 output_field=CharField()
             )
-        ).values(
-            'id', 'first_name', 'last_name', 'email',
-            'company_name', 'job_title', 'location_country', 'email_status'
-        ).order_by('first_name', 'last_name')
+        )
+        
+        # One page at a time, after the cursor of the previous page (by name unless sorted otherwise)
+        contacts, ordering = sort_contacts(contacts, request.GET.get('sort_by') or 'name_asc')
+        fields = ['id', 'first_name', 'last_name', 'email', 'company_name', 'job_title', 'location_country', 'email_status']
+        key_fields = [field.lstrip('-') for field in ordering if field.lstrip('-') not in fields]
+        try:
+            limit = max(1, min(1000, int(request.GET.get('limit', 500))))
+            page = keyset_page(
+                contacts.values(*fields, *key_fields), ordering,
+                after=request.GET.get('after'), before=request.GET.get('before'), per_page=limit
+            )
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        
+        contact_list = list(page)
+        for contact in contact_list:
+            for field in key_fields:
+                del contact[field]
         
         return JsonResponse({
-            'contacts': list(contacts)
+            'contacts': contact_list,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+            'has_next': page.has_next,
+            # Exact, from the cached stats of this sender
+            'total_count': sender_status_histogram(sender_email)['total_contacts']
         })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@read_from_replica
+def contacts_autocomplete_api(request):
+    """API endpoint to suggest contacts for a partial name, email or company, best match first"""
+    try:
+        query = request.GET.get('q', '')
+        try:
+            limit = max(1, min(50, int(request.GET.get('limit', 10))))
+        except ValueError:
+            return JsonResponse({'error': 'limit must be a number'}, status=400)
+        
+        return JsonResponse({'query': query, 'results': autocomplete_contacts(query, limit)})
+        
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 def delete_contact(request, contact_id):
     """View to delete a contact"""
     if request.method == 'POST':
@@ -1025,6 +1002,8 @@ def delete_contact(request, contact_id):
         contact_name = contact.full_name or contact.email
         try:
             contact.delete()
+            Category.adjust_count(contact.category_id, -1)
+            invalidate_contact_stats()
             return JsonResponse({
                 'success': True,
                 'message': f'Contact {contact_name} deleted successfully!'
@@ -1350,22 +1329,9 @@ def upload_csv(request):
                         from datetime import datetime
                         category_name = f"Import_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                     
-                    # Check if this category already exists, if not, generate new category_id
-                    existing_category = Contact.objects.filter(category_name=category_name).first()
-                    if existing_category:
-                        category_id = existing_category.category_id
-                    else:
-                        # Generate next available category_id
-                        max_category_id = Contact.objects.aggregate(
-                            max_id=models.Max('category_id')
-                        )['max_id'] or 0
-                        # Handle both string and integer category_id values
-                        if isinstance(max_category_id, str):
-                            try:
-                                max_category_id = int(max_category_id)
-                            except (ValueError, TypeError):
-                                max_category_id = 0
-                        category_id = str(max_category_id + 1)  # Keep as string for now
+                    # Look up the category, or create it with the next free category_id
+                    category = Category.for_name(category_name)
+                    category_id = category.category_id
                     
                     created_count = 0
                     updated_count = 0
@@ -1418,16 +1384,8 @@ def upload_csv(request):
                                     existing_contact.save()
                                     updated_count += 1
                             else:
-                                # Create new contact - find the next available contact_id within this category
-                                used_contact_ids = set(
-                                    Contact.objects.filter(category_id=str(category_id))
-                                    .values_list('contact_id', flat=True)
-                                )
-                                
-                                # Find the lowest unused contact_id for this category
-                                contact_id = 1
-                                while contact_id in used_contact_ids:
-                                    contact_id += 1
+                                # Create new contact with the next contact_id of this category
+                                contact_id = category.allocate_contact_id()
                                 
                                 # Create the contact (keep category_id as string for now)
                                 contact = Contact.objects.create(
@@ -1448,6 +1406,10 @@ def upload_csv(request):
                             error_msg = f"Error with {contact_data.get('email', 'unknown')}: {str(e)}"
                             errors.append(error_msg)
                     
+                    Category.adjust_count(category_id, created_count)
+                    if created_count or updated_count:
+                        invalidate_contact_stats()
+                    
                     # Clear session data
                     if 'csv_contacts_preview' in request.session:
                         del request.session['csv_contacts_preview']
@@ -1537,21 +1499,9 @@ def add_contact_api(request):
         except ValidationError:
             return JsonResponse({'success': False, 'error': 'Invalid email format'}, status=400)
         
-        # Check if this category already exists, if not, generate new category_id
-        existing_category = Contact.objects.filter(category_name=category_name).first()
-        if existing_category:
-            category_id = existing_category.category_id
-        else:
-            # Generate next available category_id
-            from django.db.models import Max
-            max_category_id = Contact.objects.aggregate(max_id=Max('category_id'))['max_id'] or 0
-            # Handle both string and integer category_id values
-            if isinstance(max_category_id, str):
-                try:
-                    max_category_id = int(max_category_id)
-                except (ValueError, TypeError):
-                    max_category_id = 0
-            category_id = str(max_category_id + 1)  # Keep as string for now
+        # Look up the category, or create it with the next free category_id
+        category = Category.for_name(category_name)
+        category_id = category.category_id
         
         # Check for duplicate email within the same category (use string comparison for now)
         if Contact.objects.filter(category_id=str(category_id), email=email).exists():
@@ -1564,12 +1514,8 @@ def add_contact_api(request):
         location_country = data.get('location_country', '').strip()
         linkedin_url = data.get('linkedin_url', '').strip()
         
-        # Find the next contact_id for this category (use string comparison for now)
-        from django.db.models import Max
-        max_contact_id = Contact.objects.filter(category_id=str(category_id)).aggregate(
-            max_id=Max('contact_id')
-        )['max_id'] or 0
-        next_contact_id = max_contact_id + 1
+        # Next contact_id of this category
+        next_contact_id = category.allocate_contact_id()
         
         # Create new contact
         contact = Contact(
@@ -1586,6 +1532,8 @@ def add_contact_api(request):
             linkedin_url=linkedin_url
         )
         contact.save()
+        Category.adjust_count(category_id, 1)
+        invalidate_contact_stats()
         
         return JsonResponse({
             'success': True,
@@ -1607,23 +1555,17 @@ def get_categories_api(request):
         return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
     
     try:
-        # Get all unique categories with their IDs and contact counts
-        categories_data = Contact.objects.values('category_id', 'category_name').annotate(
-            contact_count=Count('id')
-        ).exclude(
-            category_name__isnull=True
-        ).exclude(
-            category_name=''
-        ).order_by('category_name')
-        
-        # Convert to list and ensure all fields are present
-        categories_list = []
-        for category in categories_data:
-            categories_list.append({
-                'category_id': category['category_id'] or 'undefined',
-                'category_name': category['category_name'] or 'undefined',
-                'contact_count': category['contact_count']
-            })
+        # Categories that have contacts, with their maintained counts
+        categories_data = Category.objects.filter(contact_count__gt=0).exclude(name='').order_by('name')
+        
+        categories_list = [
+            {
+                'category_id': category.category_id,
+                'category_name': category.name,
+                'contact_count': category.contact_count
+            }
+            for category in categories_data
+        ]
         
         return JsonResponse({
             'success': True,
@@ -1707,6 +1649,8 @@ def update_contact_field_api(request):
         # Update the field
         setattr(contact, model_field, value if value else None)
         contact.save()
+        if model_field == 'email':
+            invalidate_contact_stats()
         
         return JsonResponse({
             'success': True,
@@ -1797,6 +1741,7 @@ def update_contact_batch_api(request):
         # Save all changes at once
         if updated_fields:
             contact.save()
+            invalidate_contact_stats()
         
         return JsonResponse({
             'success': True,
@@ -1831,7 +1776,18 @@ def reset_database_api(request):
         
         # Delete all data
         Contact.objects.all().delete()
-        EmailEvent.objects.all().delete()
+        if connection.vendor == 'postgresql':
+            # Empties the table at once instead of deleting it row by row
+            with connection.cursor() as cursor:
+                cursor.execute(f'TRUNCATE {EmailEvent._meta.db_table}')
+        else:
+            EmailEvent.objects.all().delete()
+        delete_archives()
+        WebhookDelivery.objects.all().delete()
+        ContactSenderStatus.objects.all().delete()
+        EmailEventRollup.objects.all().delete()
+        Category.objects.all().delete()
+        invalidate_contact_stats()
         
         logger.info(f"Database reset completed - Deleted {contacts_count} contacts and {events_count} email events")
         
@@ -2190,6 +2146,8 @@ def import_email_senders_json(request):
             # If replace_existing is True, deactivate all existing senders
             if replace_existing:
                 EmailSender.objects.all().update(is_active=False)
+                # update() sends no post_save, so reload the sender registry here
+                sender_registry.invalidate()
             
             # Process each sender
             for key, sender_data in senders_data.items():
@@ -2263,6 +2221,7 @@ def import_email_senders_json(request):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@read_from_replica
 def export_contacts_xls(request):
     """Export contacts list to Excel file with current filters applied"""
     try:
@@ -2295,17 +2254,19 @@ def export_contacts_xls(request):
         contacts_ws = wb.create_sheet("Contacts Export")
         
         # Get filtered contacts (same logic as contacts_list view)
-        from django.db.models import OuterRef, Subquery, Case, When, Value, CharField, Count
-        
-        # Subquery to get the most recent email event for each contact FROM THIS SENDER
-        latest_event_subquery = EmailEvent.objects.filter(
-            to_email=OuterRef('email'),
-            from_email__icontains=sender_email
-        ).order_by('-created_at').values('event_type')[:1]
+        from django.db.models import Case, When, Value, CharField
+        
+        # Status and activity of each contact FROM THIS SENDER
+        contacts = ContactSenderStatus.annotate_contacts(
+            Contact.objects.all(), sender_email,
+            latest_event_type='latest_event_type',
+            last_email_sent='last_sent',
+            last_opened='last_opened',
+            last_clicked='last_clicked'
+        )
         
         # Base queryset with annotations for email status
-        contacts = Contact.objects.annotate(
-            latest_event_type=Subquery(latest_event_subquery),
+        contacts = contacts.annotate(
             # Map event types to display status
             email_status=Case(
                 When(latest_event_type='email.clicked', then=Value('Clicked')),
@@ -2317,28 +2278,6 @@ def export_contacts_xls(request):
                 When(latest_event_type='email.failed', then=Value('Failed')),
                 default=Value('Not Sent'),
                 output_field=CharField()
-            ),
-            # Activity tracking annotations
-            last_email_sent=Subquery(
-                EmailEvent.objects.filter(
-                    to_email=OuterRef('email'),
-                    from_email__icontains=sender_email,
-                    event_type='email.sent'
-                ).order_by('-created_at').values('created_at')[:1]
-            ),
-            last_opened=Subquery(
-                EmailEvent.objects.filter(
-                    to_email=OuterRef('email'),
-                    from_email__icontains=sender_email,
-                    event_type='email.opened'
-                ).order_by('-created_at').values('created_at')[:1]
-            ),
-            last_clicked=Subquery(
-                EmailEvent.objects.filter(
-                    to_email=OuterRef('email'),
-                    from_email__icontains=sender_email,
-                    event_type='email.clicked'
-                ).order_by('-created_at').values('created_at')[:1]
             )
         )
         
@@ -2367,16 +2306,13 @@ def export_contacts_xls(request):
         
         search = request.GET.get('search')
         if search:
-            contacts = contacts.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(company_name__icontains=search)
-            )
+            contacts = search_contacts(contacts, search)
         
         # Apply sorting (same as contacts_list view)
-        sort_by = request.GET.get('sort_by')
-        if sort_by == 'name_asc':
+        sort_by = request.GET.get('sort_by') or ('relevance' if search else None)
+        if sort_by == 'relevance' and search:
+            contacts = contacts.order_by('-search_rank', 'id')
+        elif sort_by == 'name_asc':
             contacts = contacts.order_by('first_name', 'last_name')
         elif sort_by == 'name_desc':
             contacts = contacts.order_by('-first_name', '-last_name')
@@ -2396,18 +2332,9 @@ def export_contacts_xls(request):
             contacts = contacts.order_by('-created_at')
         
         # Calculate statistics for overview
-        total_contacts = contacts.count()
-        
-        # Count contacts by status
-        status_counts = {}
-        status_counts['not_sent'] = contacts.filter(latest_event_type__isnull=True).count()
-        status_counts['sent'] = contacts.filter(latest_event_type='email.sent').count()
-        status_counts['delivered'] = contacts.filter(latest_event_type='email.delivered').count()
-        status_counts['opened'] = contacts.filter(latest_event_type='email.opened').count()
-        status_counts['clicked'] = contacts.filter(latest_event_type='email.clicked').count()
-        status_counts['bounced'] = contacts.filter(latest_event_type='email.bounced').count()
-        status_counts['complained'] = contacts.filter(latest_event_type='email.complained').count()
-        status_counts['failed'] = contacts.filter(latest_event_type='email.failed').count()
+        # Total and counts by status in one grouped query
+        status_counts = status_histogram(contacts, sender_email)
+        total_contacts = status_counts['total_contacts']
         
         # Create Overview Sheet
         # Title
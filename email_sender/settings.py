@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Full-text and trigram contact search
     'channels',
     'email_app',
     'email_monitor',
@@ -71,10 +72,12 @@ INSTALLED_APPS = [
 
 # MINIMAL MIDDLEWARE FOR ADMIN TO WORK - NO SECURITY AT ALL
 MIDDLEWARE = [
+    'email_monitor.logs.RequestLogMiddleware',  # One sampled, structured record per request with its duration
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'email_monitor.permissive_middleware.AllowAllMiddleware',  # Allow everything through
+    'email_monitor.db_routing.ReplicaStickinessMiddleware',  # Read-your-writes for the replica views
 ]
 
 ROOT_URLCONF = 'email_sender.urls'
@@ -112,6 +115,19 @@ DATABASES = {
     }
 }
 
+# Read replica for the analytics and export views (email_monitor.db_routing); without
+# POSTGRES_REPLICA_HOST every read goes to the primary
+READ_REPLICA_ALIAS = 'replica'
+if os.getenv('POSTGRES_REPLICA_HOST'):
+    DATABASES[READ_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('POSTGRES_REPLICA_HOST'),
+        'PORT': os.getenv('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},  # Tests read the replica through the primary's connection
+    }
+DATABASE_ROUTERS = ['email_monitor.db_routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))  # Reads stay on the primary this long after a user writes
+
 
 # File upload settings for large CSV files - MAXIMUM PERMISSIVE
 # Allow HUGE file sizes (1 GB)
@@ -155,18 +171,56 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # Logging configuration
+# Logs are written from a background thread (see email_monitor/logs.py): JSON lines
+# to a size-rotated file, plain messages to the console
+LOG_FILE = os.getenv('LOG_FILE', str(BASE_DIR / 'logs' / 'email_monitor.log'))
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))  # Size at which the log file is rotated
+LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))  # Rotated files kept (email_monitor.log.1 ...)
+LOG_PAYLOADS = os.getenv('LOG_PAYLOADS', 'False') == 'True'  # Write webhook payloads and headers into the log records
+# Share of the info records kept per category, as "category=rate,..."; warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    'request': 1.0,
+    'api': 1.0,
+    'webhook': 0.1,
+    'webhook_drain': 0.1,
+    'resend_api': 0.1,
+    'email_send': 0.1,
+    'campaign': 1.0,
+    **{
+        category.strip(): float(rate)
+        for category, rate in (item.split('=') for item in os.getenv('LOG_SAMPLE_RATES', '').split(',') if '=' in item)
+    },
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'email_monitor.logs.JsonFormatter',
+            'include_payloads': LOG_PAYLOADS,
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'email_monitor.logs.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'email_monitor.log',
+            'class': 'email_monitor.logs.AsyncRotatingFileHandler',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_FILE_MAX_BYTES,
+            'backupCount': LOG_FILE_BACKUP_COUNT,
+            'formatter': 'json',
+            'filters': ['sampling'],
         },
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            'class': 'email_monitor.logs.AsyncStreamHandler',
+            'filters': ['sampling'],
         },
     },
     'loggers': {
@@ -175,6 +229,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'email_app': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     },
 }
 
@@ -196,6 +255,7 @@ FEATURE_POLICY = None
 
 # WebSocket and Channels Configuration
 ASGI_APPLICATION = 'email_sender.asgi.application'
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'True') == 'True'  # Serve the webhook, stats and email content views as async views (False: the sync ones, e.g. under WSGI)
 
 # Channel Layer Configuration for WebSockets (In-Memory - No Redis)
 CHANNEL_LAYERS = {
@@ -208,9 +268,72 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Campaign workers run in their own process, so progress has to go through Redis to reach the WebSockets
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+                'capacity': 300,
+                'expiry': 60,
+            },
+        },
+    }
+
 # WebSocket timeout settings
 WEBSOCKET_TIMEOUT = 30  # Connection timeout in seconds
 WEBSOCKET_HEARTBEAT_INTERVAL = 25  # Heartbeat interval in seconds
 
 # Email sending configuration
 EMAIL_SENDING_TIMEOUT = 30  # Default timeout in seconds (adjustable via UI)
+EMAIL_SEND_CONCURRENCY = int(os.getenv('EMAIL_SEND_CONCURRENCY', '4'))  # Requests in flight per sender (concurrent mode)
+EMAIL_SEND_MAX_RATE = float(os.getenv('EMAIL_SEND_MAX_RATE', '10'))  # Upper bound for sends per second per sender
+EMAIL_SEND_MAX_WORKERS = int(os.getenv('EMAIL_SEND_MAX_WORKERS', '32'))  # Threads shared by all concurrent sends
+RESEND_API_URL = os.getenv('RESEND_API_URL', 'https://api.resend.com')
+RESEND_CONNECT_TIMEOUT = float(os.getenv('RESEND_CONNECT_TIMEOUT', '5'))  # Seconds to open a connection to the Resend API
+RESEND_READ_TIMEOUT = float(os.getenv('RESEND_READ_TIMEOUT', '30'))  # Seconds to wait for a Resend API response
+RESEND_POOL_SIZE = int(os.getenv('RESEND_POOL_SIZE', '32'))  # Keep-alive connections per sender (at least EMAIL_SEND_MAX_WORKERS avoids reconnects)
+
+# Campaign job queue
+CAMPAIGN_INLINE_WORKER = os.getenv('CAMPAIGN_INLINE_WORKER', 'True') == 'True'  # Send from the web process when no run_campaign_workers process is deployed
+CAMPAIGN_JOB_STALE_SECONDS = int(os.getenv('CAMPAIGN_JOB_STALE_SECONDS', '120'))  # Requeue running jobs without a heartbeat for this long
+CAMPAIGN_WORKER_POLL_INTERVAL = float(os.getenv('CAMPAIGN_WORKER_POLL_INTERVAL', '2'))  # Seconds between queue polls when idle
+CAMPAIGN_CHUNK_SIZE = int(os.getenv('CAMPAIGN_CHUNK_SIZE', '1000'))  # Contacts per job; chunks are claimed independently by workers on any node
+CAMPAIGN_MAX_PARALLEL_CHUNKS = int(os.getenv('CAMPAIGN_MAX_PARALLEL_CHUNKS', '2'))  # Chunks of one campaign sent at the same time (they share its send rate)
+CAMPAIGN_PROGRESS_FLUSH_EVERY = int(os.getenv('CAMPAIGN_PROGRESS_FLUSH_EVERY', '25'))  # Write campaign/sender counters after this many emails...
+CAMPAIGN_PROGRESS_FLUSH_MS = int(os.getenv('CAMPAIGN_PROGRESS_FLUSH_MS', '1000'))  # ...or after this many milliseconds, whichever comes first
+CAMPAIGN_STATE_POLL_MS = int(os.getenv('CAMPAIGN_STATE_POLL_MS', '5000'))  # Fallback re-read of status, timeout and rate (changes are normally pushed over the channel layer)
+CAMPAIGN_PROGRESS_BROADCAST_HZ = float(os.getenv('CAMPAIGN_PROGRESS_BROADCAST_HZ', '4'))  # Batched per-email progress messages per second per campaign chunk
+CAMPAIGN_PROGRESS_MAX_EVENTS = int(os.getenv('CAMPAIGN_PROGRESS_MAX_EVENTS', '50'))  # Per-email events kept in one batch (older ones are only counted)
+
+# Webhook ingestion: the endpoint queues verified deliveries, a drainer stores them in batches
+WEBHOOK_INLINE_DRAIN = os.getenv('WEBHOOK_INLINE_DRAIN', 'True') == 'True'  # Drain from the web process when no drain_webhooks process is deployed
+WEBHOOK_DRAIN_BATCH_SIZE = int(os.getenv('WEBHOOK_DRAIN_BATCH_SIZE', '500'))  # Deliveries stored per bulk insert
+WEBHOOK_DRAIN_POLL_INTERVAL = float(os.getenv('WEBHOOK_DRAIN_POLL_INTERVAL', '0.5'))  # Seconds between queue polls when idle
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '5'))  # Deliveries that fail this often stay queued for inspection
+WEBHOOK_DEDUP_CACHE_SIZE = int(os.getenv('WEBHOOK_DEDUP_CACHE_SIZE', '10000'))  # Recent svix-ids each process remembers to acknowledge retries without a query
+
+# Cache for the contact stats payloads. Local memory is per process; set STATS_CACHE_DIR to share
+# one file cache between processes so a webhook handled by one of them invalidates it for all
+STATS_CACHE_DIR = os.getenv('STATS_CACHE_DIR')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+if STATS_CACHE_DIR:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': STATS_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))  # Seconds a stats payload is served at most, if no invalidation reaches it
+SENDER_REGISTRY_TTL = int(os.getenv('SENDER_REGISTRY_TTL', '60'))  # Seconds a process keeps its active senders, if no sender change reaches it
+
+# Email event retention (archive_email_events): whole months older than this move from the
+# events table into gzipped JSON lines files; their counts stay in the event rollups
+EVENT_RETENTION_DAYS = int(os.getenv('EVENT_RETENTION_DAYS', '180'))
+EVENT_ARCHIVE_DIR = os.getenv('EVENT_ARCHIVE_DIR', str(BASE_DIR / 'data' / 'event_archives'))  # On the ./data volume in docker-compose
@@ -6,14 +6,14 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.static import serve
-from email_monitor.views import webhook_handler_view
+from email_monitor.views import async_webhook_handler_view, webhook_handler_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('email_app.urls')),
     path('monitor/', include('email_monitor.urls')),
     # Direct webhook endpoints (no /monitor/ prefix)
-    path('webhook<str:endpoint>/', webhook_handler_view, name='webhook_handler'),
+    path('webhook<str:endpoint>/', async_webhook_handler_view if settings.ASYNC_VIEWS else webhook_handler_view, name='webhook_handler'),
 ]
 
 # Serve static files in all environments (including production)
@@ -14,6 +14,10 @@ python manage.py makemigrations
 echo "Running database migrations..."
 python manage.py migrate
 
+# Keep the category directory in step with the contacts
+echo "Syncing contact categories..."
+python manage.py sync_categories
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput